@@ -0,0 +1,168 @@
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+import requests
+
+
+class AlertDispatcher:
+    """
+    Bounded queue and worker pool for the side effects of an alert: POST /alerts to the
+    catalogue, then (optionally) POST /webhooks/alert, so rule evaluation never waits
+    on the catalogue.
+    - Each worker keeps its own requests.Session (pooled keep-alive connections).
+    - Connection errors, timeouts and 5xx answers are retried up to `retries` times with
+      exponential backoff; a webhook is sent only once its alert was stored, and a failed
+      webhook is retried on its own without storing the alert twice.
+    - When the queue is full the policy decides: "drop_oldest" (default, the newest
+      alerts are the most useful), "drop_newest" or "block" (for up to block_timeout,
+      then drop the new alert).
+    - stop() delivers what is still queued before returning.
+    """
+    POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, catalogue_url: str, workers: int = 4, max_queue: int = 1000, policy: str = "drop_oldest",
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 5.0, block_timeout: float = 1.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}, expected one of {self.POLICIES}")
+        self.alerts_url = f"{catalogue_url}/alerts"
+        self.webhook_url = f"{catalogue_url}/webhooks/alert"
+        self.policy = policy
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.timeout = float(timeout)
+        self.block_timeout = float(block_timeout)
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # metrics
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.webhooks_sent = 0
+        self.webhooks_failed = 0
+        self.last_latency_s = 0.0
+        self.max_latency_s = 0.0
+        self._last_drop_log = 0.0
+        self._threads = [threading.Thread(target=self._run, name=f"alert-worker-{i}", daemon=True)
+                         for i in range(max(1, int(workers)))]
+        for thread in self._threads:
+            thread.start()
+
+    # --- producer side (rule evaluation, silence detector) ---
+    def submit(self, alert: dict, webhook: Optional[dict] = None) -> bool:
+        """Queue an alert (and the webhook to send once it is stored); False if it was dropped."""
+        job = (time.monotonic(), alert, webhook)
+        accepted = True
+        dropped = 0
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            if self.policy == "block":
+                try:
+                    self._queue.put(job, timeout=self.block_timeout)
+                except queue.Full:
+                    accepted, dropped = False, 1
+            elif self.policy == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                    dropped += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(job)
+                except queue.Full:
+                    accepted = False
+                    dropped += 1
+            else:  # drop_newest
+                accepted, dropped = False, 1
+        with self._lock:
+            self.submitted += accepted
+            self.dropped += dropped
+        if dropped and time.monotonic() - self._last_drop_log > 10:
+            # Rate-limited: while the catalogue is down this would otherwise log per alert
+            self._last_drop_log = time.monotonic()
+            logging.warning(f"Alert queue full ({self.policy}), {self.dropped} alerts dropped so far")
+        return accepted
+
+    # --- consumer side (worker threads) ---
+    def _run(self):
+        session = requests.Session()
+        while True:
+            try:
+                queued_at, alert, webhook = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    session.close()
+                    return
+                continue
+            stored = self._post(session, self.alerts_url, alert, "log alert")
+            with self._lock:
+                if stored:
+                    self.delivered += 1
+                else:
+                    self.failed += 1
+            if stored and webhook is not None:
+                sent = self._post(session, self.webhook_url, webhook, "send webhook notification")
+                with self._lock:
+                    if sent:
+                        self.webhooks_sent += 1
+                    else:
+                        self.webhooks_failed += 1
+                if sent:
+                    logging.info(f"Sent webhook notification for plant {webhook.get('plant_id')}")
+            latency = time.monotonic() - queued_at
+            with self._lock:
+                self.last_latency_s = latency
+                self.max_latency_s = max(self.max_latency_s, latency)
+
+    def _post(self, session, url: str, data: dict, what: str) -> bool:
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self.retried += 1
+                # Shorter waits while shutting down, the queue still has to drain
+                time.sleep(self.backoff * 2 ** (attempt - 1) / (10 if self._stopping.is_set() else 1))
+            try:
+                res = session.post(url, json=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = str(e)
+                continue
+            if res.status_code in (200, 201):
+                return True
+            error = f"HTTP {res.status_code}"
+            if res.status_code < 500:
+                break  # rejected: retrying will not help
+        logging.warning(f"Failed to {what} after {attempt + 1} attempts: {error}")
+        return False
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Stop the workers once the queue is drained (up to timeout seconds)."""
+        self._stopping.set()
+        deadline = time.monotonic() + (timeout or 0)
+        for thread in self._threads:
+            thread.join(None if timeout is None else max(0.0, deadline - time.monotonic()))
+        if self._queue.qsize():
+            logging.warning(f"Alert workers did not drain in time, {self._queue.qsize()} alerts left")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "policy": self.policy,
+                "workers": len(self._threads),
+                "submitted": self.submitted,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "retried": self.retried,
+                "webhooks_sent": self.webhooks_sent,
+                "webhooks_failed": self.webhooks_failed,
+                "last_latency_ms": round(self.last_latency_s * 1000, 1),
+                "max_latency_ms": round(self.max_latency_s * 1000, 1),
+            }
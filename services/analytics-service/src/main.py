@@ -1,69 +1,104 @@
-import os, json, time, signal, logging, uuid
+import os, json, time, signal, logging, uuid, threading
+import numpy as np
 import paho.mqtt.client as mqtt
 import requests
-from influxdb_client import InfluxDBClient, QueryApi
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
-class RulesEngine:
-    def __init__(self):
-        # Track alert state per (plant_id, sensor) for hysteresis
-        self.states = {}
-
-    def evaluate(self, plant_id: str, sensor: str, value: float, thresholds: list[dict]):
-        # Ensure state record exists
-        key = (plant_id, sensor)
-        if key not in self.states:
-            self.states[key] = {"low": False, "high": False}
-        state = self.states[key]
-        for t in thresholds:
-            min_val = t.get("min_val")
-            max_val = t.get("max_val")
-            hyst = t.get("hysteresis") or 0.0
-            # Low threshold check
-            if min_val is not None:
-                if value < min_val and not state["low"]:
-                    state["low"] = True
-                    state["high"] = False
-                    return True, "warning"
-                # Reset low alert state when value rises above min + hysteresis
-                if state["low"] and value > (min_val + hyst):
-                    state["low"] = False
-            # High threshold check
-            if max_val is not None:
-                if value > max_val and not state["high"]:
-                    state["high"] = True
-                    state["low"] = False
-                    return True, "warning"
-                if state["high"] and value < (max_val - hyst):
-                    state["high"] = False
-        return False, "warning"
+from alerts import AlertDispatcher
+from registry import SensorRegistry
+from rules import RulesEngine
+from silence import SilenceDetector
+from telemetry_store import open_store
+from thresholds import ThresholdCache
+
+def iter_readings(payload: dict):
+    """
+    Yield (plant_id, sensor, value, ts) for both telemetry payload shapes:
+    - legacy: {"plant_id", "sensor", "value", "ts"}
+    - frame:  {"plant_id", "ts", "readings": {sensor: value}}
+    """
+    plant_id = str(payload.get("plant_id", ""))
+    ts = payload.get("ts")
+    readings = payload.get("readings")
+    if isinstance(readings, dict):
+        for sensor, value in readings.items():
+            yield plant_id, str(sensor), value, ts
+    else:
+        yield plant_id, str(payload.get("sensor", "")), payload.get("value", None), ts
+
+def in_range(bounds, value) -> bool:
+    # bounds is a SensorRegistry (min, max) entry; None means unknown sensor
+    if bounds is None:
+        return False
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value <= high)
 
 class AnalyticsService:
     def __init__(self):
         self.broker_host = os.getenv("MQTT_HOST", "mqtt-broker")
         self.broker_port = int(os.getenv("MQTT_PORT", "1883"))
         self.topic_in = os.getenv("TOPIC_TELEMETRY", "smartplant/+/telemetry")
+        # Decisions taken locally by sensor-service edge rules (e.g. autonomous watering)
+        self.topic_events = os.getenv("TOPIC_EVENTS", "smartplant/+/events")
+        # Catalogue change notifications (threshold / sensor type edits) invalidate local caches
+        self.topic_changes = os.getenv("TOPIC_CATALOGUE_CHANGES", "smartplant/catalogue/changes")
+        self.edge_window = float(os.getenv("EDGE_RECONCILE_WINDOW", "300"))
+        self.edge_waterings = {}  # plant_id -> time of the last edge watering
         self.catalogue_url = os.getenv("CATALOGUE_URL", "http://catalogue-service:8000")
         
-        # InfluxDB configuration
-        influx_url = os.getenv("INFLUX_URL", "http://influxdb:8086")
-        self.influx_token = os.getenv("INFLUX_TOKEN", "my-token")
-        self.influx_org = os.getenv("INFLUX_ORG", "smartplant")
-        self.influx_bucket = os.getenv("INFLUX_BUCKET", "telemetry")
-        
-        # Initialize InfluxDB client
-        self.influx_client = InfluxDBClient(url=influx_url, token=self.influx_token, org=self.influx_org)
-        self.query_api = self.influx_client.query_api()
+        # Telemetry reads: InfluxDB, or the SQLite file written by sensor-data-service (STORAGE_BACKEND)
+        self.store = open_store()
         
         self.mqtt_client = mqtt.Client()
         self.mqtt_client.on_connect = self._on_connect
         self.mqtt_client.on_message = self._on_message
         self.mqtt_client.connect(self.broker_host, self.broker_port, 60)
+        # Thresholds compiled per (plant, sensor) slot; readings are evaluated in micro-batches
+        # collected over RULES_BATCH_INTERVAL seconds (0: one batch per message, on the MQTT thread)
         self.rules_engine = RulesEngine()
+        self.batch_interval = float(os.getenv("RULES_BATCH_INTERVAL", "0.05"))
+        self.batch_max = int(os.getenv("RULES_BATCH_MAX", "10000"))
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        # Thresholds per plant, prefetched and kept current off the MQTT thread
+        self.thresholds = ThresholdCache(
+            self.catalogue_url,
+            ttl=float(os.getenv("THRESHOLD_CACHE_TTL", "300")),
+            full_refresh=float(os.getenv("THRESHOLD_FULL_REFRESH", "240")),
+        )
+        # Sensor types and physical ranges from the catalogue, refreshed in the background
+        self.registry = SensorRegistry(self.catalogue_url, refresh=float(os.getenv("SENSOR_TYPES_REFRESH", "60")))
+        # Alerts for (plant, sensor) series that stop reporting, and when they come back
+        self.silence = None
+        if os.getenv("SILENCE_DETECTION", "1").lower() in ("1", "true", "yes"):
+            self.silence = SilenceDetector(
+                self._on_silent, self._on_resumed,
+                factor=float(os.getenv("SILENCE_FACTOR", "3")),
+                min_timeout=float(os.getenv("SILENCE_MIN_TIMEOUT", "60")),
+                max_timeout=float(os.getenv("SILENCE_MAX_TIMEOUT", "3600")),
+            )
+        # Alert logging and webhooks are sent by a worker pool, never on the MQTT or rules thread
+        self.alerts = AlertDispatcher(
+            self.catalogue_url,
+            workers=int(os.getenv("ALERT_WORKERS", "4")),
+            max_queue=int(os.getenv("ALERT_QUEUE_SIZE", "1000")),
+            policy=os.getenv("ALERT_QUEUE_POLICY", "drop_oldest"),
+            retries=int(os.getenv("ALERT_RETRIES", "3")),
+        )
+        # HTTP surface (health and metrics)
+        self.http_port = int(os.getenv("HTTP_PORT", "8003"))
+        self.http_app = FastAPI()
+        self._setup_routes()
+        threading.Thread(target=self._run_http_server, daemon=True).start()
         self.instance_id = str(uuid.uuid4())
         self.running = True
         self._register_service()
-        import threading
         threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        if self.batch_interval > 0:
+            threading.Thread(target=self._rules_loop, name="rules-batch", daemon=True).start()
         signal.signal(signal.SIGINT, self._handle_signal)
         signal.signal(signal.SIGTERM, self._handle_signal)
 
@@ -73,11 +108,11 @@ class AnalyticsService:
             "version": "1.0.0",
             "instance_id": self.instance_id,
             "host": "analytics-service",
-            "port": 0,
-            "health_url": "N/A",
+            "port": self.http_port,
+            "health_url": f"http://analytics-service:{self.http_port}/health",
             "capabilities": ["rules_engine", "publishing_commands"],
             "topics_pub": ["smartplant/{plant_id}/actuators/water/set"],
-            "topics_sub": [self.topic_in]
+            "topics_sub": [self.topic_in, self.topic_events, self.topic_changes]
         }
         url = f"{self.catalogue_url}/services/register"
         for _ in range(5):
@@ -103,6 +138,8 @@ class AnalyticsService:
     def _on_connect(self, client, userdata, flags, rc):
         logging.info(f"AnalyticsService connected to MQTT (rc={rc})")
         client.subscribe(self.topic_in)
+        client.subscribe(self.topic_events)
+        client.subscribe(self.topic_changes, qos=1)
 
     def _on_message(self, client, userdata, msg):
         try:
@@ -110,122 +147,217 @@ class AnalyticsService:
         except Exception as e:
             logging.error(f"Failed to parse telemetry: {e}")
             return
+        if msg.topic.endswith("/events"):
+            self._on_event(payload)
+            return
+        if msg.topic == self.topic_changes:
+            self._on_catalogue_change(payload)
+            return
         plant_id = str(payload.get("plant_id", ""))
-        sensor = str(payload.get("sensor", ""))
-        value = payload.get("value", None)
-        try:
-            value = float(value)
-        except:
+        readings = []
+        for _plant_id, sensor, value, _ts in iter_readings(payload):
+            try:
+                readings.append((sensor, float(value)))
+            except:
+                continue
+        if not readings:
             return
-        # Fetch thresholds for this plant
-        thresholds = []
-        try:
-            res = requests.get(f"{self.catalogue_url}/thresholds?plant_id={plant_id}", timeout=5)
-            if res.status_code == 200:
-                thresholds = res.json()
-                # Filter to relevant sensor
-                thresholds = [t for t in thresholds if t.get("sensor") == sensor]
-        except Exception as e:
-            logging.warning(f"Could not fetch thresholds: {e}")
+        if self.silence is not None:
+            for sensor, _value in readings:
+                self.silence.seen(plant_id, sensor)
+        # Unknown sensors and physically impossible values (a faulty probe) never trigger rules
+        ranges = self.registry.ranges
+        readings = [(sensor, value) for sensor, value in readings if in_range(ranges.get(sensor), value)]
+        if not readings:
             return
-        if not thresholds:
-            return  # no threshold defined for this sensor
-        # Evaluate rules (hysteresis applied)
-        is_alert, severity = self.rules_engine.evaluate(plant_id, sensor, value, thresholds)
-        if is_alert:
-            thr = thresholds[0]
-            min_val = thr.get("min_val"); max_val = thr.get("max_val")
-            trigger_low = False; trigger_high = False
-            if min_val is not None and value < (min_val if min_val is not None else float('inf')):
-                trigger_low = True
-            if max_val is not None and value > (max_val if max_val is not None else float('-inf')):
-                trigger_high = True
-            # Auto-actuation: water if low soil moisture triggered
-            if trigger_low and sensor == "soil_moisture":
-                cmd_topic = f"smartplant/{plant_id}/actuators/water/set"
-                cmd_payload = {"device": "water", "amount": 200, "note": "auto"}
-                client.publish(cmd_topic, json.dumps(cmd_payload))
-                logging.info(f"Published auto water command for plant {plant_id}")
-            # Log alert to catalogue
-            alert_data = {
-                "plant_id": int(plant_id) if plant_id else None,
-                "sensor": sensor,
-                "value": value,
-                "severity": severity,
-                "note": "auto"
-            }
+        # Cached per plant and grouped by sensor: no catalogue round trip on this thread
+        by_sensor = self.thresholds.get(plant_id)
+        # (no threshold defined for a sensor: nothing to evaluate)
+        batch = [(plant_id, sensor, value, by_sensor[sensor]) for sensor, value in readings if by_sensor.get(sensor)]
+        if not batch:
+            return
+        if self.batch_interval <= 0:
+            self._evaluate_batch(client, batch)
+            return
+        with self._pending_lock:
+            self._pending.extend(batch)
+            if len(self._pending) >= self.batch_max:
+                self._batch_ready.set()
+
+    def _rules_loop(self):
+        while self.running:
+            self._batch_ready.wait(self.batch_interval)
+            self._batch_ready.clear()
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    self._evaluate_batch(self.mqtt_client, batch)
+                except Exception as e:
+                    logging.error(f"Rule evaluation failed for {len(batch)} readings: {e}")
+
+    def _evaluate_batch(self, client, batch):
+        # Evaluate rules (hysteresis applied) for all readings at once, in arrival order
+        slots = self.rules_engine.slots(batch)
+        fired = self.rules_engine.evaluate_batch(slots, [value for _plant_id, _sensor, value, _thresholds in batch])
+        for i in np.flatnonzero(fired):
+            # The rule state has already latched: a reading that fails here will not fire again,
+            # so it must not take the rest of the batch with it
             try:
-                res = requests.post(f"{self.catalogue_url}/alerts", json=alert_data, timeout=5)
-                if res.status_code in (200, 201):
-                    # Send webhook notification to telegram service
-                    self._send_webhook_notification(plant_id, sensor, value, severity, alert_data)
+                self._on_alert(client, *batch[i], "warning")
             except Exception as e:
-                logging.warning(f"Failed to log alert: {e}")
+                plant_id, sensor, value, _thresholds = batch[i]
+                logging.error(f"Alert handling failed for plant {plant_id!r} {sensor}={value}: {e}")
+
+    def _on_catalogue_change(self, payload):
+        kind = payload.get("kind")
+        if kind == "thresholds":
+            # Type-level thresholds may apply to many plants: refresh them all
+            plant_id = payload.get("plant_id")
+            self.thresholds.invalidate(None if plant_id is None else str(plant_id))
+        elif kind == "sensor_types":
+            threading.Thread(target=self.registry.load, daemon=True).start()
 
-    def _send_webhook_notification(self, plant_id, sensor, value, severity, alert_data):
-        """Send webhook notification to telegram service"""
+    def _on_event(self, payload):
+        if payload.get("type") == "edge_water":
+            plant_id = str(payload.get("plant_id", ""))
+            self.edge_waterings[plant_id] = time.time()
+            logging.info(f"Edge watering reported for plant {plant_id}: {payload}")
+
+    def _watered_at_edge(self, plant_id):
+        last = self.edge_waterings.get(plant_id)
+        return last is not None and time.time() - last < self.edge_window
+
+    def _on_alert(self, client, plant_id, sensor, value, thresholds, severity):
+        # A rule fired for this reading: auto-actuation, then log and notify
+        min_val = thresholds[0].get("min_val")
+        trigger_low = min_val is not None and value < min_val
+        # Auto-actuation: water if low soil moisture triggered
+        if trigger_low and sensor == "soil_moisture" and self._watered_at_edge(plant_id):
+            logging.info(f"Plant {plant_id} already watered by edge rule, skipping auto water command")
+        elif trigger_low and sensor == "soil_moisture":
+            cmd_topic = f"smartplant/{plant_id}/actuators/water/set"
+            cmd_payload = {"device": "water", "amount": 200, "note": "auto"}
+            client.publish(cmd_topic, json.dumps(cmd_payload))
+            logging.info(f"Published auto water command for plant {plant_id}")
+        # Log alert to catalogue, then notify the telegram service (queued, sent by the alert workers)
+        alert_data = {
+            "plant_id": int(plant_id) if plant_id else None,
+            "sensor": sensor,
+            "value": value,
+            "severity": severity,
+            "note": "auto"
+        }
+        self.alerts.submit(alert_data, self._webhook_payload(plant_id, sensor, value, severity, alert_data))
+
+    def _on_silent(self, plant_id, sensor, silent_for):
+        logging.warning(f"Plant {plant_id} {sensor} silent for {silent_for:.0f}s")
+        self._post_alert(plant_id, sensor, silent_for, "warning", f"silent: no data for {silent_for:.0f}s", notify=True)
+
+    def _on_resumed(self, plant_id, sensor, silent_for):
+        logging.info(f"Plant {plant_id} {sensor} reporting again after {silent_for:.0f}s")
+        self._post_alert(plant_id, sensor, silent_for, "info", f"resumed after {silent_for:.0f}s of silence")
+
+    def _post_alert(self, plant_id, sensor, value, severity, note, notify=False):
         try:
-            webhook_url = f"{self.catalogue_url}/webhooks/alert"
-            webhook_data = {
-                "plant_id": plant_id,
-                "sensor": sensor,
-                "value": value,
-                "severity": severity,
-                "alert_data": alert_data
+            alert_data = {"plant_id": int(plant_id), "sensor": sensor, "value": round(value, 1),
+                          "severity": severity, "note": note}
+        except ValueError:
+            return  # the catalogue only knows numeric plant ids
+        webhook = self._webhook_payload(plant_id, sensor, value, severity, alert_data) if notify else None
+        self.alerts.submit(alert_data, webhook)
+
+    def _webhook_payload(self, plant_id, sensor, value, severity, alert_data):
+        """Webhook notification for the telegram service, sent once the alert is logged"""
+        return {
+            "plant_id": plant_id,
+            "sensor": sensor,
+            "value": value,
+            "severity": severity,
+            "alert_data": alert_data
+        }
+
+    def _setup_routes(self):
+        @self.http_app.get("/health")
+        async def health():
+            return {"status": "ok"}
+
+        @self.http_app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics():
+            alerts = self.alerts.stats()
+            thresholds = self.thresholds.stats()
+            gauges = {
+                "alert_queue_depth": alerts["queue_depth"],
+                "alert_queue_capacity": alerts["queue_capacity"],
+                "alert_last_latency_ms": alerts["last_latency_ms"],
+                "alert_max_latency_ms": alerts["max_latency_ms"],
+                "rules_pending_readings": len(self._pending),
+                "rules_series": len(self.rules_engine),
+                "threshold_cache_plants": thresholds["plants"],
+            }
+            totals = {
+                "alerts_submitted": alerts["submitted"],
+                "alerts_delivered": alerts["delivered"],
+                "alerts_failed": alerts["failed"],
+                "alerts_dropped": alerts["dropped"],
+                "alert_retries": alerts["retried"],
+                "webhooks_sent": alerts["webhooks_sent"],
+                "webhooks_failed": alerts["webhooks_failed"],
+                "threshold_cache_hits": thresholds["hits"],
+                "threshold_cache_stale_hits": thresholds["stale_hits"],
+                "threshold_cache_misses": thresholds["misses"],
             }
-            requests.post(webhook_url, json=webhook_data, timeout=5)
-            logging.info(f"Sent webhook notification for plant {plant_id}")
+            if self.silence is not None:
+                silence = self.silence.stats()
+                gauges.update(silence_series=silence["series"], silence_silent=silence["silent"])
+                totals.update(silence_alerts=silence["silences"], silence_recoveries=silence["recoveries"])
+            lines = []
+            for name, value in totals.items():
+                lines.append(f"# TYPE analytics_{name}_total counter")
+                lines.append(f"analytics_{name}_total {value}")
+            for name, value in gauges.items():
+                lines.append(f"# TYPE analytics_{name} gauge")
+                lines.append(f"analytics_{name} {value}")
+            return "\n".join(lines) + "\n"
+
+    def _run_http_server(self):
+        """Run the HTTP server in a separate thread"""
+        try:
+            uvicorn.run(self.http_app, host="0.0.0.0", port=self.http_port, log_level="warning")
         except Exception as e:
-            logging.warning(f"Failed to send webhook notification: {e}")
+            logging.error(f"HTTP server error: {e}")
 
-    def query_historical_data(self, plant_id, sensor, hours=24):
-        """Query historical sensor data from InfluxDB"""
+    def query_historical_data(self, plant_id, sensor, hours=24, resolution="raw"):
+        """Query historical sensor data; resolution "1m"/"1h" reads the rollup means"""
         try:
-            query = f'''
-            from(bucket: "{self.influx_bucket}")
-            |> range(start: -{hours}h)
-            |> filter(fn: (r) => r["_measurement"] == "telemetry")
-            |> filter(fn: (r) => r["plant_id"] == "{plant_id}")
-            |> filter(fn: (r) => r["sensor"] == "{sensor}")
-            |> filter(fn: (r) => r["_field"] == "value")
-            |> sort(columns: ["_time"])
-            '''
-            
-            result = self.query_api.query(query, org=self.influx_org)
-            data_points = []
-            
-            for table in result:
-                for record in table.records:
-                    data_points.append({
-                        "time": record.get_time().isoformat(),
-                        "value": record.get_value()
-                    })
-            
-            return data_points
+            return self.store.history(plant_id, sensor, hours, resolution)
         except Exception as e:
             logging.warning(f"Failed to query historical data: {e}")
             return []
 
+    def query_rollup_statistics(self, plant_id, hours=24):
+        """
+        Summarize sensors from the telemetry_1m / telemetry_1h rollups written by sensor-data-service.
+        Only closed windows are included, so the newest minute/hour is not counted yet.
+        Returns {} when no rollups exist for the range (e.g. rollups disabled), so callers can fall back.
+        """
+        return self.store.rollup_statistics(plant_id, hours)
+
     def get_plant_statistics(self, plant_id, hours=24):
         """Get statistical summary for a plant"""
         try:
-            sensors = ["temperature", "humidity", "soil_moisture"]
-            stats = {}
-            
-            for sensor in sensors:
-                data = self.query_historical_data(plant_id, sensor, hours)
-                if data:
-                    values = [point["value"] for point in data]
-                    stats[sensor] = {
-                        "min": min(values),
-                        "max": max(values),
-                        "avg": sum(values) / len(values),
-                        "count": len(values)
-                    }
-                else:
-                    stats[sensor] = {"min": None, "max": None, "avg": None, "count": 0}
-            
-            return stats
+            sensors = sorted(self.registry.ranges)
+            empty = {"min": None, "max": None, "avg": None, "count": 0}
+
+            try:
+                # Hundreds of rollup rows instead of every raw point in the range
+                stats = self.query_rollup_statistics(plant_id, hours)
+            except Exception as e:
+                logging.warning(f"Failed to query rollups, falling back to raw data: {e}")
+                stats = {}
+            if not stats:
+                stats = self.store.raw_statistics(plant_id, sensors, hours)
+            return {sensor: stats.get(sensor, empty) for sensor in sensors}
         except Exception as e:
             logging.warning(f"Failed to get plant statistics: {e}")
             return {}
@@ -238,6 +370,13 @@ class AnalyticsService:
     def _handle_signal(self, signum, frame):
         logging.info("AnalyticsService shutting down")
         self.running = False
+        if self.silence is not None:
+            self.silence.stop()
+        self.thresholds.stop()
+        logging.info(f"Threshold cache: {self.thresholds.stats()}")
+        logging.info(f"Rules engine: {self.rules_engine.stats()}")
+        self.alerts.stop()
+        logging.info(f"Alert dispatcher: {self.alerts.stats()}")
         try:
             requests.delete(f"{self.catalogue_url}/services/{self.instance_id}", timeout=5)
         except Exception as e:
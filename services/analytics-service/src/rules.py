@@ -0,0 +1,142 @@
+import threading
+
+import numpy as np
+
+
+class RulesEngine:
+    """
+    Hysteresis rules compiled into NumPy arrays, one slot per (plant_id, sensor).
+    - slot() maps a series to its slot and (re)compiles the slot's thresholds whenever the
+      list it is given is a different object (ThresholdCache builds new lists on refetch);
+      threshold j of a slot lives in row j of min/max/hysteresis arrays, NaN when unset.
+    - evaluate_batch() runs a micro-batch of readings in one vectorized pass with the
+      semantics of the original per-reading loop: thresholds are checked in order and the
+      first one that fires ends evaluation of that reading. Readings of the same series
+      within a batch are applied in arrival order (one pass per repeat).
+    - Low/high alert state is kept per slot and survives threshold changes.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.index = {}  # (plant_id, sensor) -> slot
+        self._sources = []  # slot -> thresholds list the slot was compiled from
+        self._lock = threading.Lock()
+        self._alloc(capacity, 1)
+
+    def _alloc(self, capacity: int, depth: int):
+        # Grow (or create) every array, keeping the slots compiled so far
+        def grow(name, fill, dtype, shape):
+            new = np.full(shape, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                new[tuple(slice(0, n) for n in old.shape)] = old
+            setattr(self, name, new)
+        grow("min_val", np.nan, float, (depth, capacity))
+        grow("max_val", np.nan, float, (depth, capacity))
+        grow("hysteresis", 0.0, float, (depth, capacity))
+        grow("count", 0, np.int32, (capacity,))
+        grow("low", False, bool, (capacity,))
+        grow("high", False, bool, (capacity,))
+
+    def __len__(self):
+        return len(self.index)
+
+    def slot(self, plant_id: str, sensor: str, thresholds: list) -> int:
+        key = (plant_id, sensor)
+        slot = self.index.get(key)
+        if slot is not None and self._sources[slot] is thresholds:
+            return slot
+        with self._lock:
+            if slot is None:
+                slot = len(self._sources)
+                if slot >= self.low.shape[0]:
+                    self._alloc(2 * self.low.shape[0], self.min_val.shape[0])
+                self._sources.append(None)
+                self.index[key] = slot
+            self._compile(slot, thresholds)
+        return slot
+
+    def slots(self, readings) -> list:
+        """slot() for each (plant_id, sensor, value, thresholds), with the common case inlined."""
+        index, sources = self.index, self._sources
+        out = []
+        for plant_id, sensor, _value, thresholds in readings:
+            slot = index.get((plant_id, sensor))
+            if slot is None or sources[slot] is not thresholds:
+                slot = self.slot(plant_id, sensor, thresholds)
+            out.append(slot)
+        return out
+
+    def _compile(self, slot: int, thresholds: list):
+        if len(thresholds) > self.min_val.shape[0]:
+            self._alloc(self.low.shape[0], len(thresholds))
+        self.min_val[:, slot] = np.nan
+        self.max_val[:, slot] = np.nan
+        self.hysteresis[:, slot] = 0.0
+        for j, t in enumerate(thresholds):
+            if t.get("min_val") is not None:
+                self.min_val[j, slot] = t["min_val"]
+            if t.get("max_val") is not None:
+                self.max_val[j, slot] = t["max_val"]
+            self.hysteresis[j, slot] = t.get("hysteresis") or 0.0
+        self.count[slot] = len(thresholds)
+        self._sources[slot] = thresholds
+
+    def evaluate_batch(self, slots, values) -> np.ndarray:
+        """Evaluate readings (slot, value) in order; returns a bool array of fired alerts."""
+        slots = np.asarray(slots, dtype=np.intp)
+        values = np.asarray(values, dtype=float)
+        fired = np.zeros(len(slots), dtype=bool)
+        if not len(slots):
+            return fired
+        # Occurrence number of each reading within its series: pass r handles the r-th ones
+        order = np.argsort(slots, kind="stable")
+        ordered = slots[order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        rank = np.empty(len(slots), dtype=np.intp)
+        rank[order] = np.arange(len(slots)) - np.repeat(starts, np.diff(np.r_[starts, len(slots)]))
+        with self._lock:
+            if rank.max() == 0:
+                fired[:] = self._step(slots, values)
+            else:
+                for r in range(rank.max() + 1):
+                    sel = np.flatnonzero(rank == r)
+                    fired[sel] = self._step(slots[sel], values[sel])
+        return fired
+
+    def _step(self, slots: np.ndarray, values: np.ndarray) -> np.ndarray:
+        # Each slot appears at most once here
+        low = self.low[slots]
+        high = self.high[slots]
+        count = self.count[slots]
+        fired = np.zeros(len(slots), dtype=bool)
+        active = np.ones(len(slots), dtype=bool)  # not decided by an earlier threshold yet
+        for j in range(int(count.max())):
+            present = active & (count > j)
+            min_val = self.min_val[j, slots]
+            max_val = self.max_val[j, slots]
+            hyst = self.hysteresis[j, slots]
+            # Low threshold (comparisons with an unset NaN bound are always False)
+            fire = present & ~low & (values < min_val)
+            low |= fire
+            high &= ~fire
+            fired |= fire
+            active &= ~fire
+            low &= ~(present & active & (values > min_val + hyst))
+            # High threshold
+            present &= active
+            fire = present & ~high & (values > max_val)
+            high |= fire
+            low &= ~fire
+            fired |= fire
+            active &= ~fire
+            high &= ~(present & active & (values < max_val - hyst))
+        self.low[slots] = low
+        self.high[slots] = high
+        return fired
+
+    def evaluate(self, plant_id: str, sensor: str, value: float, thresholds: list[dict]):
+        """Single reading; same result as a batch of one."""
+        fired = self.evaluate_batch([self.slot(plant_id, sensor, thresholds)], [value])
+        return bool(fired[0]), "warning"
+
+    def stats(self) -> dict:
+        return {"series": len(self.index), "capacity": int(self.low.shape[0]), "depth": int(self.min_val.shape[0])}
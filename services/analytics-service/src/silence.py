@@ -0,0 +1,178 @@
+import logging
+import math
+import threading
+import time
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel: `levels` wheels of `slots` slots, level l covering
+    slots**(l+1) ticks. schedule()/cancel() are O(1) set operations, advance() touches
+    only the slots the clock passes; a timer cascades to a finer level once its
+    coarse slot comes up. Deadlines further out than the top level are clamped and
+    re-scheduled when the clamped slot fires.
+    """
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: float = None):
+        self.tick = float(tick)
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** l for l in range(levels + 1)]
+        self._max_delta = self._spans[levels - 1] * (slots - 1)
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._timers = {}  # key -> (deadline tick, level, slot)
+        self._current = int((time.time() if now is None else now) // self.tick)
+
+    def __len__(self):
+        return len(self._timers)
+
+    def schedule(self, key, deadline: float):
+        """(Re)arm the timer of key to fire at `deadline` (same clock as advance())."""
+        self.cancel(key)
+        self._insert(key, math.ceil(deadline / self.tick))
+
+    def cancel(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            self._wheels[timer[1]][timer[2]].discard(key)
+
+    def _insert(self, key, due: int):
+        current = self._current
+        if due <= current:
+            level, slot = 0, current % self.slots  # already due: fires with this tick
+        else:
+            placed = min(due, current + self._max_delta)
+            level = 0
+            # Finest level whose current bucket also contains the deadline
+            while level < self.levels - 1 and placed // self._spans[level + 1] != current // self._spans[level + 1]:
+                level += 1
+            slot = (placed // self._spans[level]) % self.slots
+        self._wheels[level][slot].add(key)
+        self._timers[key] = (due, level, slot)
+
+    def advance(self, now: float) -> list:
+        """Move the clock to `now` and return the keys whose deadline passed."""
+        target = int(now // self.tick)
+        expired = []
+        while self._current < target:
+            self._current += 1
+            current = self._current
+            # Cascade coarse slots that start at this tick, coarsest first
+            for level in range(self.levels - 1, 0, -1):
+                if current % self._spans[level] == 0:
+                    self._cascade(level, (current // self._spans[level]) % self.slots)
+            slot = current % self.slots
+            due, self._wheels[0][slot] = self._wheels[0][slot], set()
+            for key in due:
+                if self._timers[key][0] <= current:
+                    del self._timers[key]
+                    expired.append(key)
+                else:
+                    self._insert(key, self._timers[key][0])  # clamped far-future timer
+        return expired
+
+    def _cascade(self, level: int, slot: int):
+        keys, self._wheels[level][slot] = self._wheels[level][slot], set()
+        for key in keys:
+            self._insert(key, self._timers[key][0])
+
+
+class SilenceDetector:
+    """
+    Notices (plant_id, sensor) series that stop reporting.
+    - Each series learns its reporting interval (EWMA of arrival gaps) and gets a deadline
+      of last arrival + factor * interval, bounded by [min_timeout, max_timeout].
+    - Deadlines live in a TimerWheel, so a reading costs O(1) however many series exist.
+    - on_silent(plant_id, sensor, silent_for) fires once per silence, on_resumed(...) when
+      data comes back. If nothing at all arrived for min_timeout (broker or ingest outage,
+      not a plant problem), silences are held back and re-checked once telemetry flows.
+    """
+    # Series states
+    ACTIVE, SILENT, SUPPRESSED = 0, 1, 2
+
+    def __init__(self, on_silent, on_resumed, factor: float = 3.0, min_timeout: float = 60.0,
+                 max_timeout: float = 3600.0, tick: float = 1.0):
+        self.on_silent = on_silent
+        self.on_resumed = on_resumed
+        self.factor = float(factor)
+        self.min_timeout = float(min_timeout)
+        self.max_timeout = float(max_timeout)
+        self.wheel = TimerWheel(tick=tick)
+        # key -> [last arrival, interval estimate or None, silent state]
+        self._series = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.last_message = time.time()
+        self._outage = False
+        # metrics
+        self.silences = 0
+        self.suppressed = 0
+        self.recoveries = 0
+        threading.Thread(target=self._loop, args=(tick,), name="silence-detector", daemon=True).start()
+
+    def seen(self, plant_id: str, sensor: str, now: float = None):
+        now = time.time() if now is None else now
+        key = (plant_id, sensor)
+        resumed = None
+        with self._lock:
+            self.last_message = now
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [now, None, self.ACTIVE]
+            else:
+                # A long gap is not a new normal: clamp it before it feeds the estimate
+                gap = min(now - series[0], self.max_timeout)
+                series[1] = gap if series[1] is None else 0.8 * series[1] + 0.2 * gap
+                if series[2] == self.SILENT:
+                    resumed = now - series[0]
+                series[0] = now
+                series[2] = self.ACTIVE
+            timeout = self.min_timeout if series[1] is None else series[1] * self.factor
+            self.wheel.schedule(key, now + min(max(timeout, self.min_timeout), self.max_timeout))
+        if resumed is not None:
+            self.recoveries += 1
+            self.on_resumed(plant_id, sensor, resumed)
+
+    def _loop(self, tick: float):
+        while not self._stop.wait(tick):
+            try:
+                self.check()
+            except Exception as e:
+                logging.warning(f"Silence check failed: {e}")
+
+    def check(self, now: float = None):
+        now = time.time() if now is None else now
+        silent = []
+        with self._lock:
+            outage = now - self.last_message >= self.min_timeout
+            expired = self.wheel.advance(now)
+            for key in expired:
+                series = self._series[key]
+                if outage:
+                    # Looked at again once telemetry flows, alerting only if this series stays quiet
+                    if series[2] != self.SUPPRESSED:
+                        series[2] = self.SUPPRESSED
+                        self.suppressed += 1
+                    self.wheel.schedule(key, now + self.min_timeout)
+                else:
+                    series[2] = self.SILENT
+                    self.silences += 1
+                    silent.append((key, now - series[0]))
+            if outage and expired and not self._outage:
+                logging.warning(f"No telemetry at all for {now - self.last_message:.0f}s, holding back silence alerts")
+            self._outage = outage
+        for (plant_id, sensor), silent_for in silent:
+            self.on_silent(plant_id, sensor, silent_for)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "armed": len(self.wheel),
+                "silent": sum(1 for s in self._series.values() if s[2] != self.ACTIVE),
+                "silences": self.silences,
+                "suppressed": self.suppressed,
+                "recoveries": self.recoveries,
+            }
+
+    def stop(self):
+        self._stop.set()
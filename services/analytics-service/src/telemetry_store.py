@@ -0,0 +1,202 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+RESOLUTIONS = {"1m": 60, "1h": 3600}
+
+
+def flux_sensor_filter(sensors) -> str:
+    """
+    Flux predicate selecting raw telemetry for the given sensors in either schema:
+    - narrow: one point per reading, tag sensor=<name>, field "value"
+    - wide:   one point per tick, one field per sensor (INFLUX_SCHEMA=wide)
+    Both can coexist in the telemetry measurement (e.g. while migrating).
+    """
+    return " or ".join(
+        f'r["_field"] == "{sensor}" or (r["_field"] == "value" and r["sensor"] == "{sensor}")'
+        for sensor in sensors
+    )
+
+def record_sensor(record) -> str:
+    # narrow rows carry the sensor tag, wide rows name it in _field
+    return record.values.get("sensor") or record.get_field()
+
+def summarize(values) -> dict:
+    return {"min": min(values), "max": max(values), "avg": sum(values) / len(values), "count": len(values)}
+
+class InfluxTelemetryStore:
+    """
+    Telemetry reads from InfluxDB. SQLiteTelemetryStore offers the same methods for
+    deployments where sensor-data-service writes to an embedded SQLite file instead.
+    - history(): time-ordered [{"time", "value"}], raw or rollup means ("1m"/"1h")
+    - rollup_statistics(): {sensor: {min, max, avg, count}} from closed rollup windows
+    - raw_statistics(): the same summary computed from raw points
+    """
+    def __init__(self):
+        from influxdb_client import InfluxDBClient
+        self.influx_org = os.getenv("INFLUX_ORG", "smartplant")
+        self.influx_bucket = os.getenv("INFLUX_BUCKET", "telemetry")
+        self.influx_client = InfluxDBClient(url=os.getenv("INFLUX_URL", "http://influxdb:8086"),
+                                            token=os.getenv("INFLUX_TOKEN", "my-token"), org=self.influx_org)
+        self.query_api = self.influx_client.query_api()
+
+    def history(self, plant_id, sensor, hours=24, resolution="raw"):
+        if resolution == "raw":
+            measurement, sensor_filter = "telemetry", flux_sensor_filter([sensor])
+        else:
+            measurement = f"telemetry_{resolution}"
+            sensor_filter = f'r["sensor"] == "{sensor}" and r["_field"] == "mean"'
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+        |> range(start: -{hours}h)
+        |> filter(fn: (r) => r["_measurement"] == "{measurement}")
+        |> filter(fn: (r) => r["plant_id"] == "{plant_id}")
+        |> filter(fn: (r) => {sensor_filter})
+        |> sort(columns: ["_time"])
+        '''
+        data_points = []
+        for table in self.query_api.query(query, org=self.influx_org):
+            for record in table.records:
+                data_points.append((record.get_time(), record.get_value()))
+        # Both schemas may return a table for the same sensor
+        data_points.sort(key=lambda p: p[0])
+        return [{"time": t.isoformat(), "value": v} for t, v in data_points]
+
+    def rollup_statistics(self, plant_id, hours=24):
+        measurement = "telemetry_1h" if hours > 6 else "telemetry_1m"
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+        |> range(start: -{hours}h)
+        |> filter(fn: (r) => r["_measurement"] == "{measurement}")
+        |> filter(fn: (r) => r["plant_id"] == "{plant_id}")
+        |> filter(fn: (r) => r["_field"] == "min" or r["_field"] == "max" or r["_field"] == "mean" or r["_field"] == "count")
+        |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+        stats = {}
+        for table in self.query_api.query(query, org=self.influx_org):
+            for record in table.records:
+                count = record.values.get("count") or 0
+                if not count:
+                    continue
+                s = stats.setdefault(record.values.get("sensor"), {"min": None, "max": None, "sum": 0.0, "count": 0})
+                s["min"] = record.values["min"] if s["min"] is None else min(s["min"], record.values["min"])
+                s["max"] = record.values["max"] if s["max"] is None else max(s["max"], record.values["max"])
+                s["sum"] += record.values["mean"] * count
+                s["count"] += count
+        return {
+            sensor: {"min": s["min"], "max": s["max"], "avg": s["sum"] / s["count"], "count": s["count"]}
+            for sensor, s in stats.items()
+        }
+
+    def raw_statistics(self, plant_id, sensors, hours=24):
+        # One raw query for all sensors, whichever schema the points were written in
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+        |> range(start: -{hours}h)
+        |> filter(fn: (r) => r["_measurement"] == "telemetry")
+        |> filter(fn: (r) => r["plant_id"] == "{plant_id}")
+        |> filter(fn: (r) => {flux_sensor_filter(sensors)})
+        '''
+        by_sensor = {}
+        for table in self.query_api.query(query, org=self.influx_org):
+            for record in table.records:
+                by_sensor.setdefault(record_sensor(record), []).append(record.get_value())
+        return {sensor: summarize(values) for sensor, values in by_sensor.items() if values}
+
+    def close(self):
+        self.influx_client.close()
+
+class SQLiteTelemetryStore:
+    """
+    Read side of the SQLite file sensor-data-service writes with STORAGE_BACKEND=sqlite
+    (WAL mode, so reads never block the writer). Same methods as InfluxTelemetryStore;
+    when rollups are disabled, "1m"/"1h" history is downsampled from raw points in SQL.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.getenv("SQLITE_PATH", "/data/telemetry.db")
+        self._db = None
+
+    @property
+    def db(self):
+        # Opened on first use: the file is created by sensor-data-service, which may start later
+        if self._db is None:
+            self._db = sqlite3.connect(f"file:{self.path}?mode=rw", uri=True, check_same_thread=False)
+            self._db.execute("PRAGMA busy_timeout=5000")
+        return self._db
+
+    def _series(self, measurement, plant_id, sensor, field):
+        row = self.db.execute("SELECT id FROM series WHERE measurement=? AND plant_id=? AND sensor=? AND field=?",
+                              (measurement, str(plant_id), sensor, field)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _since(hours):
+        return int(datetime.now(timezone.utc).timestamp() - hours * 3600)
+
+    @staticmethod
+    def _points(rows):
+        return [{"time": datetime.fromtimestamp(ts, timezone.utc).isoformat(), "value": value} for ts, value in rows]
+
+    def history(self, plant_id, sensor, hours=24, resolution="raw"):
+        since = self._since(hours)
+        if resolution != "raw":
+            series = self._series(f"telemetry_{resolution}", plant_id, sensor, "mean")
+            if series is not None:
+                return self._points(self.db.execute(
+                    "SELECT ts, value FROM points WHERE series=? AND ts>=? ORDER BY ts", (series, since)))
+        series = self._series("telemetry", plant_id, sensor, "value")
+        if series is None:
+            return []
+        if resolution == "raw":
+            return self._points(self.db.execute(
+                "SELECT ts, value FROM points WHERE series=? AND ts>=? ORDER BY ts", (series, since)))
+        size = RESOLUTIONS[resolution]
+        return self._points(self.db.execute(
+            "SELECT ts - ts % ? AS start, AVG(value) FROM points WHERE series=? AND ts>=? GROUP BY start ORDER BY start",
+            (size, series, since)))
+
+    def rollup_statistics(self, plant_id, hours=24):
+        measurement = "telemetry_1h" if hours > 6 else "telemetry_1m"
+        rows = self.db.execute(
+            """SELECT s.sensor, MIN(CASE WHEN s.field='min' THEN p.value END),
+                      MAX(CASE WHEN s.field='max' THEN p.value END),
+                      SUM(CASE WHEN s.field='mean' THEN p.value * c.value END),
+                      SUM(CASE WHEN s.field='mean' THEN c.value END)
+               FROM series s JOIN points p ON p.series = s.id
+               JOIN series cs ON cs.measurement = s.measurement AND cs.plant_id = s.plant_id
+                             AND cs.sensor = s.sensor AND cs.field = 'count'
+               JOIN points c ON c.series = cs.id AND c.ts = p.ts
+               WHERE s.measurement=? AND s.plant_id=? AND s.field IN ('min', 'max', 'mean') AND p.ts>=?
+               GROUP BY s.sensor""",
+            (measurement, str(plant_id), self._since(hours)))
+        return {
+            sensor: {"min": lo, "max": hi, "avg": total / count, "count": int(count)}
+            for sensor, lo, hi, total, count in rows if count
+        }
+
+    def raw_statistics(self, plant_id, sensors, hours=24):
+        since = self._since(hours)
+        stats = {}
+        for sensor in sensors:
+            series = self._series("telemetry", plant_id, sensor, "value")
+            if series is None:
+                continue
+            lo, hi, avg, count = self.db.execute(
+                "SELECT MIN(value), MAX(value), AVG(value), COUNT(*) FROM points WHERE series=? AND ts>=?",
+                (series, since)).fetchone()
+            if count:
+                stats[sensor] = {"min": lo, "max": hi, "avg": avg, "count": count}
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+
+def open_store():
+    """Telemetry store for STORAGE_BACKEND (influx by default, or sqlite)."""
+    backend = os.getenv("STORAGE_BACKEND", "influx")
+    if backend == "sqlite":
+        return SQLiteTelemetryStore()
+    if backend != "influx":
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected influx or sqlite")
+    return InfluxTelemetryStore()
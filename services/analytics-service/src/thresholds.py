@@ -0,0 +1,135 @@
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+_FULL = object()  # refresh request for every plant
+
+
+class ThresholdCache:
+    """
+    Per-plant thresholds from the catalogue, grouped by sensor, so rule evaluation never
+    waits on an HTTP round trip.
+    - prefetch: one GET /thresholds for all plants at startup and every full_refresh seconds;
+      with full_refresh < ttl entries only expire when those refreshes fail.
+    - get() never blocks: a fresh entry is returned as is; an expired one (older than ttl)
+      is still returned, last known good, while a background worker re-fetches that plant.
+      A plant absent from a complete prefetch has no thresholds; before the first complete
+      prefetch an unknown plant returns {} and is fetched in the background.
+    - invalidate() is driven by catalogue change notifications and re-fetches right away,
+      keeping the current entry until the new one arrives.
+    """
+    def __init__(self, catalogue_url: str, ttl: float = 300.0, full_refresh: float = 240.0):
+        self.catalogue_url = catalogue_url
+        self.ttl = float(ttl)
+        self.full_refresh = float(full_refresh)
+        self._entries = {}  # plant_id -> ({sensor: [threshold, ...]}, fetched at)
+        self._complete = False
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # metrics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self._request(_FULL)
+        threading.Thread(target=self._worker, name="threshold-cache", daemon=True).start()
+
+    def get(self, plant_id: str) -> dict:
+        entry = self._entries.get(plant_id)
+        if entry is None:
+            if self._complete:
+                self.hits += 1
+                return {}
+            self.misses += 1
+            self._request(plant_id)
+            return {}
+        if time.monotonic() - entry[1] > self.ttl:
+            self.stale_hits += 1
+            self._request(plant_id)
+        else:
+            self.hits += 1
+        return entry[0]
+
+    def invalidate(self, plant_id: str = None):
+        """Re-fetch one plant's thresholds, or all of them when plant_id is None."""
+        self._request(_FULL if plant_id is None else str(plant_id))
+
+    def _request(self, key):
+        with self._lock:
+            if key in self._queued:
+                return  # already on its way
+            self._queued.add(key)
+        self._queue.put(key)
+
+    def _worker(self):
+        last_full = time.monotonic()
+        while not self._stop.is_set():
+            if time.monotonic() - last_full >= self.full_refresh:
+                last_full = time.monotonic()
+                self._request(_FULL)
+            try:
+                key = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._queued.discard(key)
+            try:
+                if key is _FULL:
+                    self._load_all()
+                else:
+                    self._load_plant(key)
+            except Exception as e:
+                self.fetch_errors += 1
+                logging.warning(f"Could not fetch thresholds ({'all plants' if key is _FULL else 'plant ' + key}): {e}")
+                if key is _FULL and not self._complete:
+                    time.sleep(2)
+                    self._request(_FULL)  # keep trying until the first prefetch succeeds
+
+    def _fetch(self, params: dict) -> list:
+        self.fetches += 1
+        res = requests.get(f"{self.catalogue_url}/thresholds", params=params, timeout=5)
+        if res.status_code != 200:
+            raise ValueError(f"HTTP {res.status_code}")
+        return res.json()
+
+    @staticmethod
+    def _group(thresholds) -> dict:
+        by_sensor = {}
+        for t in thresholds:
+            by_sensor.setdefault(t.get("sensor"), []).append(t)
+        return by_sensor
+
+    def _load_all(self):
+        by_plant = {}
+        for t in self._fetch({}):
+            if t.get("plant_id") is not None:
+                by_plant.setdefault(str(t["plant_id"]), []).append(t)
+        now = time.monotonic()
+        # One new dict swapped in: plants whose thresholds were all removed disappear too
+        self._entries = {plant_id: (self._group(thresholds), now) for plant_id, thresholds in by_plant.items()}
+        if not self._complete:
+            logging.info(f"Prefetched thresholds for {len(by_plant)} plants")
+        self._complete = True
+
+    def _load_plant(self, plant_id: str):
+        self._entries[plant_id] = (self._group(self._fetch({"plant_id": plant_id})), time.monotonic())
+
+    def stats(self) -> dict:
+        return {
+            "plants": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "pending": self._queue.qsize(),
+        }
+
+    def stop(self):
+        self._stop.set()
@@ -1,13 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .db import init_db_with_retry
+from .db import init_db_with_retry, SessionLocal
+from .repositories.sensor_type_repository import SensorTypeRepository
 from .routers import (
     health_controller as health,
     registry_controller as registry,
     plants_controller as plants,
     thresholds_controller as thresholds,
     alerts_controller as alerts,
+    sensor_types_controller as sensor_types,
     users,
     assignments,
     webhooks_controller as webhooks,
@@ -28,6 +30,8 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     def _on_startup() -> None:
         init_db_with_retry()
+        with SessionLocal() as db, db.begin():
+            SensorTypeRepository().seed_defaults(db)
 
     # API per contract
     app.include_router(health.router)        # GET /health
@@ -35,6 +39,7 @@ def create_app() -> FastAPI:
     app.include_router(plants.router)        # /plants/*
     app.include_router(thresholds.router)    # /thresholds/*
     app.include_router(alerts.router)        # /alerts/*
+    app.include_router(sensor_types.router)  # /sensor-types/*
     app.include_router(users.router)         # /users/*
     app.include_router(assignments.router)   # /assignments/*
     app.include_router(webhooks.router)      # /webhooks/*
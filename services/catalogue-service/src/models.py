@@ -49,6 +49,16 @@ class Threshold(Base):
 
 Index("ix_thresholds_sensor", Threshold.sensor)
 
+# Sensor types (units and physical ranges; ingest rejects values outside the range)
+class SensorType(Base):
+    __tablename__ = "sensor_types"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    unit = Column(String, nullable=True)
+    min_val = Column(Float, nullable=True)
+    max_val = Column(Float, nullable=True)
+    description = Column(Text, nullable=True)
+
 # Alerts
 class Alert(Base):
     __tablename__ = "alerts"
@@ -0,0 +1,40 @@
+import json
+import logging
+import os
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:  # notifications are optional, caches then rely on their TTL
+    mqtt = None
+
+CHANGES_TOPIC = os.getenv("TOPIC_CATALOGUE_CHANGES", "smartplant/catalogue/changes")
+
+class ChangeNotifier:
+    """
+    Publishes catalogue change notifications on MQTT, e.g. {"kind": "thresholds", "plant_id": 1},
+    so services caching catalogue data (analytics' threshold cache) refresh right away.
+    Best effort: a lost notification is covered by the consumers' own TTL refresh.
+    """
+    def __init__(self, host: str, port: int):
+        self.client = mqtt.Client()
+        # connect_async + loop_start: the broker may come up after us, paho keeps retrying
+        self.client.connect_async(host, port, 60)
+        self.client.loop_start()
+
+    def publish(self, kind: str, **fields):
+        try:
+            self.client.publish(CHANGES_TOPIC, json.dumps(dict(fields, kind=kind)), qos=1)
+        except Exception as e:
+            logging.warning(f"Failed to publish {kind} change notification: {e}")
+
+def _create():
+    host = os.getenv("MQTT_HOST", "")
+    if not host or mqtt is None:
+        return None
+    return ChangeNotifier(host, int(os.getenv("MQTT_PORT", "1883")))
+
+notifier = _create()
+
+def notify(kind: str, **fields):
+    if notifier is not None:
+        notifier.publish(kind, **fields)
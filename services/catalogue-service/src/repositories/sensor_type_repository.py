@@ -0,0 +1,48 @@
+from sqlalchemy.orm import Session
+from ..models import SensorType
+
+# Seeded on first start so existing deployments keep accepting their three sensors
+DEFAULT_SENSOR_TYPES = [
+    {"name": "temperature", "unit": "°C", "min_val": -40.0, "max_val": 85.0},
+    {"name": "humidity", "unit": "%", "min_val": 0.0, "max_val": 100.0},
+    {"name": "soil_moisture", "unit": "raw", "min_val": 0.0, "max_val": 1023.0},  # 10-bit ADC scale
+]
+
+class SensorTypeRepository:
+    def create(self, db: Session, **kwargs) -> SensorType:
+        s = SensorType(**kwargs)
+        db.add(s)
+        db.flush()
+        return s
+
+    def upsert(self, db: Session, **kwargs) -> SensorType:
+        s = self.get(db, kwargs["name"])
+        if s is None:
+            return self.create(db, **kwargs)
+        for k, v in kwargs.items():
+            setattr(s, k, v)
+        db.flush()
+        return s
+
+    def list(self, db: Session) -> list[SensorType]:
+        return db.query(SensorType).order_by(SensorType.name).all()
+
+    def get(self, db: Session, name: str) -> SensorType | None:
+        return db.query(SensorType).filter(SensorType.name == name).first()
+
+    def delete(self, db: Session, name: str) -> bool:
+        s = self.get(db, name)
+        if not s:
+            return False
+        db.delete(s)
+        return True
+
+    def seed_defaults(self, db: Session) -> None:
+        if db.query(SensorType).first() is None:
+            for sensor_type in DEFAULT_SENSOR_TYPES:
+                self.create(db, **sensor_type)
+            return
+        # Earlier releases seeded soil_moisture as 0-100 %, which rejects every ADC reading
+        soil = self.get(db, "soil_moisture")
+        if soil is not None and (soil.unit, soil.min_val, soil.max_val) == ("%", 0.0, 100.0):
+            self.upsert(db, **DEFAULT_SENSOR_TYPES[2])
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from ..db import get_db
+from ..repositories.sensor_type_repository import SensorTypeRepository
+from ..schemas import SensorTypeCreate, SensorTypeRead
+from ..notifier import notify
+
+router = APIRouter(prefix="/sensor-types", tags=["sensor-types"])
+repo = SensorTypeRepository()
+
+@router.post("", response_model=SensorTypeRead)
+def create_sensor_type(payload: SensorTypeCreate, db: Session = Depends(get_db)):
+    with db.begin():
+        if repo.get(db, payload.name):
+            raise HTTPException(status_code=409, detail="Sensor type already exists")
+        s = repo.create(db, **payload.model_dump())
+    notify("sensor_types", name=payload.name)
+    return s
+
+@router.get("", response_model=list[SensorTypeRead])
+def list_sensor_types(db: Session = Depends(get_db)):
+    return repo.list(db)
+
+@router.get("/{name}", response_model=SensorTypeRead)
+def get_sensor_type(name: str, db: Session = Depends(get_db)):
+    s = repo.get(db, name)
+    if not s:
+        raise HTTPException(status_code=404, detail="Sensor type not found")
+    return s
+
+@router.put("/{name}", response_model=SensorTypeRead)
+def put_sensor_type(name: str, payload: SensorTypeCreate, db: Session = Depends(get_db)):
+    with db.begin():
+        s = repo.upsert(db, **dict(payload.model_dump(), name=name))
+    notify("sensor_types", name=name)
+    return s
+
+@router.delete("/{name}")
+def delete_sensor_type(name: str, db: Session = Depends(get_db)):
+    with db.begin():
+        if not repo.delete(db, name):
+            raise HTTPException(status_code=404, detail="Sensor type not found")
+    notify("sensor_types", name=name)
+    return {"deleted": True}
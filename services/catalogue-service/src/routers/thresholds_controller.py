@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from ..db import get_db
 from ..repositories.threshold_repository import ThresholdRepository
 from ..schemas import ThresholdCreate, ThresholdRead
+from ..notifier import notify
 
 router = APIRouter(prefix="/thresholds", tags=["thresholds"])
 repo = ThresholdRepository()
@@ -11,7 +12,10 @@ repo = ThresholdRepository()
 @router.post("", response_model=ThresholdRead)
 def create_threshold(payload: ThresholdCreate, db: Session = Depends(get_db)):
     with db.begin():
-        return repo.create(db, **payload.model_dump())
+        t = repo.create(db, **payload.model_dump())
+    # After the commit, so a consumer re-fetching right away sees the new threshold
+    notify("thresholds", plant_id=payload.plant_id, plant_type=payload.plant_type)
+    return t
 
 @router.get("", response_model=list[ThresholdRead])
 def list_thresholds(
@@ -32,6 +32,22 @@ class ThresholdRead(_Config):
     max_val: Optional[float] = None
     hysteresis: Optional[float] = 0.0
 
+# Sensor types
+class SensorTypeCreate(BaseModel):
+    name: str
+    unit: Optional[str] = None
+    min_val: Optional[float] = None
+    max_val: Optional[float] = None
+    description: Optional[str] = None
+
+class SensorTypeRead(_Config):
+    id: int
+    name: str
+    unit: Optional[str] = None
+    min_val: Optional[float] = None
+    max_val: Optional[float] = None
+    description: Optional[str] = None
+
 # Alerts
 class AlertCreate(BaseModel):
     plant_id: int
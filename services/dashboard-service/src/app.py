@@ -7,6 +7,8 @@ import time
 from datetime import datetime, timedelta
 import os
 
+from telemetry_store import open_store
+
 app = Flask(__name__)
 app.secret_key = 'smart-plant-dashboard-secret'
 
@@ -18,6 +20,12 @@ INFLUX_ORG = os.getenv("INFLUX_ORG", "smartplant")
 INFLUX_BUCKET = os.getenv("INFLUX_BUCKET", "telemetry")
 MQTT_HOST = os.getenv("MQTT_HOST", "mqtt-broker")
 MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+# Poll sensor-data-service /latest (one URL per ingest worker) instead of subscribing to all telemetry
+LATEST_URLS = [u.strip().rstrip('/') for u in os.getenv("LATEST_URLS", "").split(",") if u.strip()]
+LATEST_POLL_INTERVAL = float(os.getenv("LATEST_POLL_INTERVAL", "2"))
+
+# Telemetry history: InfluxDB, or the SQLite file written by sensor-data-service (STORAGE_BACKEND)
+telemetry_store = open_store()
 
 # Global data storage
 latest_sensor_data = {}
@@ -35,28 +43,71 @@ def on_mqtt_connect(client, userdata, flags, rc):
     if rc == 0:
         mqtt_connected = True
         print("Dashboard connected to MQTT")
+        if LATEST_URLS:
+            return  # latest values come from latest_poll_loop
         client.subscribe("smartplant/+/telemetry")
+        # Retained last-value snapshots seed the fleet view right after (re)start
+        client.subscribe("smartplant/+/snapshot")
     else:
         print(f"Failed to connect to MQTT: {rc}")
 
+def iter_readings(data):
+    """Yield (sensor, value) for legacy per-sensor messages and combined frames"""
+    readings = data.get('readings')
+    if isinstance(readings, dict):
+        yield from readings.items()
+    else:
+        yield data.get('sensor', ''), data.get('value', 0)
+
 def on_mqtt_message(client, userdata, msg):
     try:
         data = json.loads(msg.payload.decode('utf-8'))
         plant_id = str(data.get('plant_id', ''))
-        sensor = data.get('sensor', '')
-        value = data.get('value', 0)
         timestamp = data.get('ts', datetime.now().isoformat())
         
         if plant_id not in latest_sensor_data:
             latest_sensor_data[plant_id] = {}
         
-        latest_sensor_data[plant_id][sensor] = {
-            'value': value,
-            'timestamp': timestamp
-        }
+        if msg.topic.endswith('/snapshot'):
+            # Never let a snapshot override a live reading already received
+            timestamps = data.get('timestamps') or {}
+            for sensor, value in iter_readings(data):
+                latest_sensor_data[plant_id].setdefault(sensor, {
+                    'value': value,
+                    'timestamp': timestamps.get(sensor, timestamp)
+                })
+            return
+        
+        for sensor, value in iter_readings(data):
+            latest_sensor_data[plant_id][sensor] = {
+                'value': value,
+                'timestamp': timestamp
+            }
     except Exception as e:
         print(f"Error processing MQTT message: {e}")
 
+def latest_poll_loop(url):
+    """Keep latest_sensor_data current from one sensor-data-service, fetching only changes"""
+    epoch, revision = None, 0
+    while True:
+        try:
+            response = requests.get(f"{url}/latest", params={"since": revision}, timeout=5)
+            if response.status_code == 200:
+                data = response.json()
+                if data['epoch'] != epoch and not data['full']:
+                    # Restarted service: its revisions started over, take a full copy
+                    epoch, revision = data['epoch'], 0
+                    continue
+                epoch = data['epoch']
+                for plant_id, sensors in data['plants'].items():
+                    plant = latest_sensor_data.setdefault(plant_id, {})
+                    for sensor, latest in sensors.items():
+                        plant[sensor] = {'value': latest['value'], 'timestamp': latest['ts']}
+                revision = data['revision']
+        except Exception as e:
+            print(f"Error polling latest values from {url}: {e}")
+        time.sleep(LATEST_POLL_INTERVAL)
+
 def setup_mqtt():
     mqtt_client.on_connect = on_mqtt_connect
     mqtt_client.on_message = on_mqtt_message
@@ -172,6 +223,18 @@ def api_sensor_data(plant_id):
     """API endpoint for real-time sensor data"""
     return jsonify(latest_sensor_data.get(plant_id, {}))
 
+@app.route('/api/history/<plant_id>/<sensor>')
+def api_history(plant_id, sensor):
+    """API endpoint for historical sensor data (resolution raw, 1m or 1h)"""
+    hours = request.args.get('hours', 24, type=int)
+    resolution = request.args.get('resolution', 'raw')
+    if resolution not in ('raw', '1m', '1h'):
+        return jsonify({"status": "error", "message": "resolution must be raw, 1m or 1h"}), 400
+    try:
+        return jsonify(telemetry_store.history(plant_id, sensor, hours, resolution))
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route('/api/water_plant', methods=['POST'])
 def api_water_plant():
     """API endpoint to water a plant"""
@@ -210,6 +273,8 @@ def api_assign_user():
 if __name__ == '__main__':
     # Start background threads
     setup_mqtt()
+    for url in LATEST_URLS:
+        threading.Thread(target=latest_poll_loop, args=(url,), daemon=True).start()
     threading.Thread(target=data_refresh_loop, daemon=True).start()
     
     # Initial data refresh
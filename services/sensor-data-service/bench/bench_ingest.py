@@ -0,0 +1,107 @@
+"""
+Benchmark: telemetry messages decoded and encoded per second.
+
+Compares the previous ingest path (json.loads + fromisoformat + Point per reading,
+serialized the way write_api does) with the LineEncoder fast path, and checks that
+both produce byte-identical line protocol.
+
+    python bench/bench_ingest.py [--plants 1000] [--messages 50000] [--format frame|legacy]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from influxdb_client import Point, WritePrecision
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from lineproto import LineEncoder  # noqa: E402
+from telemetry import iter_readings  # noqa: E402
+
+SENSORS = ["temperature", "humidity", "soil_moisture"]
+
+
+def make_messages(plants: int, count: int, fmt: str):
+    start = datetime(2024, 1, 1)
+    messages = []
+    for i in range(count):
+        plant = i % plants
+        ts = (start + timedelta(seconds=5 * (i // plants))).strftime('%Y-%m-%dT%H:%M:%SZ')
+        values = {"temperature": 20 + (i % 70) / 10, "humidity": 55.0 + (i % 3), "soil_moisture": 40 + (i % 997) / 7}
+        if fmt == "frame":
+            messages.append(json.dumps({"plant_id": str(plant), "ts": ts, "readings": values}).encode())
+        else:
+            sensor = SENSORS[i % 3]
+            messages.append(json.dumps({"plant_id": str(plant), "sensor": sensor, "value": values[sensor], "ts": ts}).encode())
+    return messages
+
+
+def _valid(iterable):
+    for plant_id, sensor, value, ts_str in iterable:
+        if sensor not in SENSORS:
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(value):
+            yield plant_id, sensor, value, ts_str
+
+
+def point_path(raw: bytes):
+    payload = json.loads(raw.decode('utf-8'))
+    points = []
+    dt = None
+    for plant_id, sensor, value, ts_str in _valid(iter_readings(payload)):
+        if dt is None:
+            dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00")).replace(tzinfo=None)
+        points.append(Point("telemetry").tag("plant_id", plant_id).tag("sensor", sensor)
+                      .field("value", value).time(dt, WritePrecision.S))
+        dt.strftime('%Y-%m-%dT%H:%M:%SZ')  # snapshot ts
+    return [p.to_line_protocol() for p in points]
+
+
+def encoder_path(encoder: LineEncoder):
+    def encode(raw: bytes):
+        payload = json.loads(raw)
+        lines = []
+        ts = None
+        for plant_id, sensor, value, ts_str in _valid(iter_readings(payload)):
+            if ts is None:
+                seconds, ts = encoder.timestamp(ts_str)
+            lines.append(encoder.encode(plant_id, sensor, value, seconds))
+        return lines
+    return encode
+
+
+def _rate(fn, messages) -> float:
+    start = time.perf_counter()
+    for raw in messages:
+        fn(raw)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plants", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--format", choices=["frame", "legacy"], default="frame")
+    args = parser.parse_args()
+    messages = make_messages(args.plants, args.messages, args.format)
+
+    fast = encoder_path(LineEncoder("telemetry"))
+    for raw in messages[:5000]:
+        assert fast(raw) == point_path(raw), raw
+
+    before = _rate(point_path, messages)
+    after = _rate(fast, messages)
+    print(f"{'format':>8} {'Point msgs/s':>14} {'encoder msgs/s':>16} {'speedup':>8}")
+    print(f"{args.format:>8} {before:>14,.0f} {after:>16,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import json
+import math
+import zlib
+from typing import Callable, List, Optional
+
+from lineproto import LineEncoder, parse_line
+from rollups import RollupAggregator
+from registry import DEFAULT_RANGES
+from telemetry import iter_readings, check_reading
+
+MAX_LINE_BYTES = 1024 * 1024
+# Decompressed bytes produced per step, so a small gzip body cannot expand in one go
+_INFLATE_STEP = 1024 * 1024
+
+
+class BackfillSession:
+    """
+    Streams one backfill upload (NDJSON telemetry payloads or line protocol, optionally
+    gzip-compressed) into InfluxDB in constant memory.
+    - The body is fed chunk by chunk; gzip is detected from the magic bytes and inflated
+      in bounded steps, complete lines are processed and only the partial tail is kept.
+    - Readings go through the same checks as MQTT ingest (known sensor, finite value)
+      plus a mandatory ts, and are written in batches of batch_size points.
+    - Rollups for the uploaded range are aggregated per upload and written with the batches
+      as their windows close (the rest at the end). With rollup_lookup, a window that was
+      already written (live ingest, an earlier upload) is read back and merged first
+      instead of being overwritten by the uploaded readings alone.
+    """
+    def __init__(self, encoder: LineEncoder, write: Callable[[List[str]], None], fmt: str = "ndjson",
+                 precision: str = "s", schema: str = "narrow", batch_size: int = 5000,
+                 dedup=None, rollups: bool = True, max_errors: int = 20, registry=None, rollup_lookup=None):
+        self.encoder = encoder
+        self.registry = registry
+        self._write = write
+        self.fmt = fmt
+        self.precision = precision
+        self.schema = schema
+        self.batch_size = int(batch_size)
+        self.dedup = dedup
+        self.rollups = RollupAggregator(self._batch_extend, tick=0, lookup=rollup_lookup) if rollups else None
+        self.max_errors = max_errors
+        self._inflater: Optional[zlib.Decompress] = None
+        self._started = False
+        self._tail = b""
+        self._batch: List[str] = []
+        self.line_no = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.written = 0
+        self.errors = []
+
+    # --- input ---
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        if not self._started:
+            self._started = True
+            if chunk[:2] == b"\x1f\x8b":
+                self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._inflater is None:
+            self._consume(chunk)
+            return
+        data = self._inflater.decompress(chunk, _INFLATE_STEP)
+        while True:
+            self._consume(data)
+            if not self._inflater.unconsumed_tail:
+                break
+            data = self._inflater.decompress(self._inflater.unconsumed_tail, _INFLATE_STEP)
+
+    def _consume(self, data: bytes):
+        data = self._tail + data
+        lines = data.split(b"\n")
+        self._tail = lines.pop()
+        if len(self._tail) > MAX_LINE_BYTES:
+            raise ValueError(f"line {self.line_no + 1} exceeds {MAX_LINE_BYTES} bytes")
+        for line in lines:
+            self._line(line)
+
+    def _line(self, raw: bytes):
+        self.line_no += 1
+        raw = raw.strip()
+        if not raw or raw.startswith(b"#"):
+            return
+        try:
+            if self.fmt == "lp":
+                self._lp(raw.decode("utf-8"))
+            else:
+                self._ndjson(raw)
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            # One malformed line is rejected, it never aborts the upload
+            self._reject(str(e))
+
+    def _reject(self, error: str, count: int = 1):
+        self.rejected += count
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": self.line_no, "error": error})
+
+    def _ndjson(self, raw: bytes):
+        payload = json.loads(raw)
+        if not isinstance(payload, dict):
+            raise ValueError("expected a JSON object")
+        readings = list(iter_readings(payload))
+        ts = payload.get("ts")
+        if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+            if not math.isfinite(ts):  # json.loads accepts Infinity/NaN
+                self._reject(f"invalid ts {ts!r}", len(readings))
+                return
+            seconds = int(ts)
+        else:
+            try:
+                seconds, _ = self.encoder.timestamp(ts, strict=True)
+            except ValueError as e:
+                self._reject(str(e), len(readings))
+                return
+        self._accept(str(payload.get("plant_id", "")), [(sensor, value) for _, sensor, value, _ in readings], seconds)
+
+    def _lp(self, line: str):
+        measurement, tags, fields, seconds = parse_line(line, self.precision)
+        if measurement != "telemetry":
+            raise ValueError(f"unexpected measurement {measurement!r}")
+        if seconds is None:
+            raise ValueError("missing timestamp")
+        if "sensor" in tags:  # narrow: sensor tag + value field
+            values = [(tags["sensor"], fields.get("value"))]
+        else:  # wide: one field per sensor
+            values = list(fields.items())
+        self._accept(tags.get("plant_id", ""), values, seconds)
+
+    # --- processing ---
+    def _accept(self, plant_id: str, values, seconds: int):
+        if not plant_id:
+            self._reject("missing plant_id", len(values))
+            return
+        fields = []
+        ranges = self.registry.ranges if self.registry is not None else DEFAULT_RANGES
+        for sensor, value in values:
+            value, rejected = check_reading(sensor, value, ranges)
+            if rejected is not None:
+                self._reject(f"invalid {rejected} for {sensor!r}")
+                continue
+            if self.dedup is not None and self.dedup.seen(plant_id, sensor, seconds):
+                self.duplicates += 1
+                continue
+            self.accepted += 1
+            if self.schema == "wide":
+                fields.append((sensor, value))
+            else:
+                self._batch.append(self.encoder.encode(plant_id, sensor, value, seconds))
+            if self.rollups is not None:
+                self.rollups.add(plant_id, sensor, value, seconds)
+        if fields:
+            self._batch.append(self.encoder.encode_wide(plant_id, fields, seconds))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _batch_extend(self, lines: List[str]):
+        self._batch.extend(lines)
+
+    def _flush(self):
+        if self.rollups is not None:
+            self.rollups.flush()  # emits closed windows and forgets old ones, keeping memory flat
+        if self._batch:
+            self._write(self._batch)
+            self.written += len(self._batch)
+            self._batch = []
+
+    def finish(self) -> dict:
+        if self._inflater is not None:
+            self._consume(self._inflater.flush())
+        if self._tail:
+            tail, self._tail = self._tail, b""
+            self._line(tail)
+        if self.rollups is not None:
+            self.rollups.flush(force=True)
+        self._flush()
+        return self.result()
+
+    def result(self) -> dict:
+        return {
+            "lines": self.line_no,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "points_written": self.written,
+            "errors": self.errors,
+        }
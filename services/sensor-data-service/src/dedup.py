@@ -0,0 +1,69 @@
+import sys
+import threading
+import time
+from collections import deque
+
+
+class DedupWindow:
+    """
+    Drops exact repeats of (plant_id, sensor, ts) seen within the last `window` seconds
+    of arrival time (QoS 1 redeliveries, republished spool batches).
+    - Keys are kept in one set per `bucket` seconds; the oldest set is discarded as the
+      window slides, so memory follows the recent message rate only. The sets hold the
+      keys themselves, not their hashes: two readings whose hashes collide are still
+      told apart, so a reading is never dropped as a false duplicate.
+    - Never more than max_keys are held: when full, the oldest bucket is dropped early.
+    - Thread-safe: the MQTT thread and /backfill requests (FastAPI threadpool) share one window.
+    """
+    # Per-key estimate: the tuple, its timestamp and a short plant id (sensor names are interned)
+    _KEY_BYTES = sys.getsizeof((None, None, None)) + sys.getsizeof(2 ** 31) + sys.getsizeof("1000")
+
+    def __init__(self, window: float = 300.0, bucket: float = 30.0, max_keys: int = 1000000):
+        self.bucket = float(bucket)
+        self.buckets = max(1, int(round(window / bucket)))
+        self.max_keys = int(max_keys)
+        self._sets = deque()  # (bucket number, set of (plant_id, sensor, ts)), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+        # metrics
+        self.checked = 0
+        self.hits = 0
+        self.early_evictions = 0
+
+    def seen(self, plant_id: str, sensor: str, ts: int) -> bool:
+        """Record the key and return True when it was already seen inside the window."""
+        key = (plant_id, sys.intern(sensor), ts)
+        with self._lock:
+            self.checked += 1
+            for _, keys in self._sets:
+                if key in keys:
+                    self.hits += 1
+                    return True
+            self._current().add(key)
+            self._size += 1
+            if self._size > self.max_keys and len(self._sets) > 1:
+                self._size -= len(self._sets.popleft()[1])
+                self.early_evictions += 1
+            return False
+
+    def _current(self) -> set:
+        # Called with the lock held
+        number = int(time.monotonic() // self.bucket)
+        if not self._sets or self._sets[-1][0] != number:
+            self._sets.append((number, set()))
+            # Slide: forget buckets that left the window
+            while self._sets[0][0] <= number - self.buckets:
+                self._size -= len(self._sets.popleft()[1])
+        return self._sets[-1][1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            memory = sum(sys.getsizeof(keys) + len(keys) * self._KEY_BYTES for _, keys in self._sets)
+            return {
+                "keys": self._size,
+                "checked": self.checked,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.checked, 4) if self.checked else 0.0,
+                "memory_bytes": memory,
+                "early_evictions": self.early_evictions,
+            }
@@ -0,0 +1,89 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+def _iso(seconds: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+class LatestTable:
+    """
+    Latest value per (plant_id, sensor), served over HTTP so consumers can poll instead of
+    subscribing to all telemetry.
+    - Every change bumps a global revision; each entry remembers the revision it changed at.
+      Plants are kept in change order, so "changed since revision R" walks only the plants
+      that changed after R instead of the whole table.
+    - epoch identifies this process: a client seeing a new epoch (restart) or a revision
+      lower than the one it holds must drop its copy and re-read everything.
+    - Entries are (value, epoch seconds, revision) tuples; timestamps are formatted on read.
+    """
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.revision = 0
+        # plant_id -> {sensor: (value, seconds, revision)}, least recently changed plant first
+        self._plants: "OrderedDict[str, Dict[str, Tuple[float, int, int]]]" = OrderedDict()
+        self._plant_revision: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def update(self, plant_id: str, sensor: str, value: float, seconds: int):
+        with self._lock:
+            sensors = self._plants.get(plant_id)
+            if sensors is None:
+                sensors = self._plants[plant_id] = {}
+            else:
+                prev = sensors.get(sensor)
+                if prev is not None and (seconds < prev[1] or (seconds == prev[1] and value == prev[0])):
+                    return  # out-of-order or repeated reading: nothing changed
+                self._plants.move_to_end(plant_id)
+            self.revision += 1
+            sensors[sensor] = (value, seconds, self.revision)
+            self._plant_revision[plant_id] = self.revision
+
+    def get(self, plant_id: str) -> Optional[dict]:
+        with self._lock:
+            sensors = self._plants.get(plant_id)
+            return None if sensors is None else self._render(sensors, 0)
+
+    def query(self, plant_ids: Optional[Iterable[str]] = None, since: int = 0) -> dict:
+        """
+        Latest values of the given plants (all plants when None). With since > 0 only
+        sensors that changed after that revision are returned; a since this table cannot
+        answer (ahead of the current revision, i.e. from before a restart) returns
+        everything with full=True.
+        """
+        wanted = set(plant_ids) if plant_ids is not None else None
+        with self._lock:
+            full = since <= 0 or since > self.revision
+            if full:
+                since = 0
+            plants = {}
+            if wanted is not None and (full or len(wanted) < len(self._plants) // 8):
+                # Small bulk lookups go straight to the plants asked for
+                for plant_id in wanted:
+                    sensors = self._plants.get(plant_id)
+                    if sensors is not None and self._plant_revision[plant_id] > since:
+                        plants[plant_id] = self._render(sensors, since)
+            else:
+                # Newest changes first; stop at the first plant unchanged since the revision
+                for plant_id in reversed(self._plants):
+                    if self._plant_revision[plant_id] <= since:
+                        break
+                    if wanted is None or plant_id in wanted:
+                        plants[plant_id] = self._render(self._plants[plant_id], since)
+            return {"epoch": self.epoch, "revision": self.revision, "full": full, "plants": plants}
+
+    @staticmethod
+    def _render(sensors: Dict[str, Tuple[float, int, int]], since: int) -> dict:
+        return {sensor: {"value": value, "ts": _iso(seconds)}
+                for sensor, (value, seconds, revision) in sensors.items() if revision > since}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "plants": len(self._plants),
+                "series": sum(len(sensors) for sensors in self._plants.values()),
+                "revision": self.revision,
+            }
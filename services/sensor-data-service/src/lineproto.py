@@ -0,0 +1,137 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Same escaping tables as influxdb_client.client.write.point, so lines are byte-identical
+_ESCAPE_MEASUREMENT = str.maketrans({",": r"\,", " ": r"\ ", "\n": r"\n", "\t": r"\t", "\r": r"\r"})
+_ESCAPE_KEY = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ ", "\n": r"\n", "\t": r"\t", "\r": r"\r"})
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def escape_tag_value(value: str) -> str:
+    escaped = value.translate(_ESCAPE_KEY)
+    if escaped.endswith("\\"):
+        escaped += " "
+    return escaped
+
+
+def format_float(value: float) -> str:
+    # Point drops the trailing ".0" of whole numbers
+    s = str(value)
+    return s[:-2] if s.endswith(".0") else s
+
+
+_UNESCAPE = re.compile(r"\\(.)")
+_PRECISION = {"s": 1, "ms": 10 ** 3, "us": 10 ** 6, "ns": 10 ** 9}
+
+
+def _split(text: str, sep: str) -> List[str]:
+    # Split on separators that are not backslash-escaped
+    return re.split(r"(?<!\\)" + re.escape(sep), text)
+
+
+def parse_line(line: str, precision: str = "s") -> Tuple[str, Dict[str, str], Dict[str, float], Optional[int]]:
+    """
+    Parse one line of line protocol with numeric fields into
+    (measurement, tags, fields, epoch seconds or None). Raises ValueError when malformed.
+    String and boolean fields are rejected: telemetry values are numbers.
+    """
+    parts = _split(line.strip(), " ")
+    if len(parts) not in (2, 3):
+        raise ValueError("expected 'measurement[,tags] fields [timestamp]'")
+    key = _split(parts[0], ",")
+    tags = {}
+    for tag in key[1:]:
+        name, sep, value = tag.partition("=")
+        if not sep:
+            raise ValueError(f"malformed tag {tag!r}")
+        tags[_UNESCAPE.sub(r"\1", name)] = _UNESCAPE.sub(r"\1", value)
+    fields = {}
+    for field in _split(parts[1], ","):
+        name, sep, value = field.partition("=")
+        if not sep or not value:
+            raise ValueError(f"malformed field {field!r}")
+        if value[-1] in "iu" and value[:-1].lstrip("-").isdigit():
+            value = value[:-1]
+        fields[_UNESCAPE.sub(r"\1", name)] = float(value)
+    seconds = None
+    if len(parts) == 3:
+        seconds = int(parts[2]) // _PRECISION[precision]
+    return _UNESCAPE.sub(r"\1", key[0]), tags, fields, seconds
+
+
+class LineEncoder:
+    """
+    Encodes telemetry readings straight to InfluxDB line protocol (second precision),
+    byte-identical to Point(measurement).tag("plant_id").tag("sensor").field("value").time(dt, S).
+    - The "measurement,plant_id=..,sensor=.. value=" prefix is cached per (plant_id, sensor).
+    - Parsed timestamps are cached per ts string; readings of one tick share the same ts.
+    - encode_wide() emits the wide-row schema instead: one point per (plant_id, tick)
+      with one field per sensor, matching Point(measurement).tag("plant_id").field(sensor, ..).
+    Both caches are bounded and simply cleared when full.
+    """
+    def __init__(self, measurement: str = "telemetry", max_series: int = 100000, max_timestamps: int = 4096):
+        self.measurement = measurement.translate(_ESCAPE_MEASUREMENT)
+        self.max_series = max_series
+        self.max_timestamps = max_timestamps
+        self._prefixes: Dict[Tuple[str, str], str] = {}
+        self._timestamps: Dict[str, Tuple[int, str]] = {}
+
+    def timestamp(self, ts_str: Optional[str], strict: bool = False) -> Tuple[int, str]:
+        """
+        Return (epoch seconds, normalized 'YYYY-MM-DDTHH:MM:SSZ') for a reading's ts.
+        A missing/bad ts (including one that is not a string) means "now", or raises
+        ValueError when strict (backfill).
+        """
+        # Only strings are cache keys: a JSON list/dict ts is unhashable
+        cached = self._timestamps.get(ts_str) if isinstance(ts_str, str) and ts_str else None
+        if cached is None:
+            try:
+                dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00")).replace(tzinfo=None)
+            except Exception:
+                if strict:
+                    raise ValueError(f"invalid ts {ts_str!r}")
+                return self._convert(datetime.utcnow())  # not cacheable
+            if len(self._timestamps) >= self.max_timestamps:
+                self._timestamps.clear()
+            cached = self._timestamps[ts_str] = self._convert(dt)
+        return cached
+
+    @staticmethod
+    def _convert(dt: datetime) -> Tuple[int, str]:
+        delta = dt - _EPOCH
+        # Same arithmetic as the client (nanoseconds / 1e9, truncated)
+        ns = (delta.days * 86400 + delta.seconds) * 10 ** 9 + delta.microseconds * 1000
+        return int(ns / 1e9), dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _prefix(self, plant_id: str, sensor: str) -> str:
+        tags = []
+        for key, value in (("plant_id", plant_id), ("sensor", sensor)):
+            value = escape_tag_value(value)
+            if value:  # Point omits empty tags
+                tags.append(f"{key}={value}")
+        tags = "," + ",".join(tags) if tags else ""
+        return f"{self.measurement}{tags} value="
+
+    def encode(self, plant_id: str, sensor: str, value: float, seconds: int) -> str:
+        key = (plant_id, sensor)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            if len(self._prefixes) >= self.max_series:
+                self._prefixes.clear()
+            prefix = self._prefixes[key] = self._prefix(plant_id, sensor)
+        return f"{prefix}{format_float(value)} {seconds}"
+
+    def encode_wide(self, plant_id: str, fields: List[Tuple[str, float]], seconds: int) -> str:
+        key = (plant_id, "")
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            if len(self._prefixes) >= self.max_series:
+                self._prefixes.clear()
+            tag = escape_tag_value(plant_id)
+            prefix = self._prefixes[key] = f"{self.measurement},plant_id={tag} " if tag else f"{self.measurement} "
+        # Point sorts fields by key; a repeated sensor keeps its last value
+        values = dict(fields)
+        body = ",".join(f"{sensor.translate(_ESCAPE_KEY)}={format_float(values[sensor])}" for sensor in sorted(values))
+        return f"{prefix}{body} {seconds}"
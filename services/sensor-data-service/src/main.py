@@ -1,37 +1,154 @@
-import os, json, math, signal, logging, uuid, time   # add time
+import os, json, signal, logging, uuid, time, threading
 import paho.mqtt.client as mqtt
-from influxdb_client import InfluxDBClient, Point, WritePrecision
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
 import requests
-from datetime import datetime
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+import uvicorn
+from telemetry import iter_readings, check_reading
+from snapshots import SnapshotPublisher
+from lineproto import LineEncoder
+from writer import BatchWriter
+from wal import WriteAheadLog, WalReplayer
+from rollups import RollupAggregator
+from dedup import DedupWindow
+from metrics import IngestMetrics
+from backfill import BackfillSession
+from latest import LatestTable
+from store import SQLiteStore
+from registry import SensorRegistry
+from partition import partition_of, shared_topic, topic_plant_id
 
 class SensorDataService:
-    def __init__(self):
+    def __init__(self, partition=None, partitions=None, share_group=None, stats_queue=None):
         self.broker_host = os.getenv("MQTT_HOST", "mqtt-broker")
         self.broker_port = int(os.getenv("MQTT_PORT", "1883"))
         self.topic = os.getenv("TOPIC", "smartplant/+/telemetry")
 
+        # Scale-out: either hash plants onto partitions (each plant written by exactly one
+        # worker, but every worker still receives the full topic and filters it) or join an
+        # MQTT v5 shared subscription group (broker load-balances messages, use for throughput)
+        self.partitions = int(partitions if partitions is not None else os.getenv("INGEST_PARTITIONS", "1"))
+        self.partition = int(partition if partition is not None else os.getenv("INGEST_PARTITION", "0"))
+        self.share_group = share_group if share_group is not None else os.getenv("INGEST_SHARE_GROUP", "")
+        self.stats_queue = stats_queue
+        self.metrics = IngestMetrics()
+        self.messages = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
         influx_url = os.getenv("INFLUX_URL", "http://influxdb:8086")
         self.influx_token = os.getenv("INFLUX_TOKEN", "my-token")
         self.influx_org = os.getenv("INFLUX_ORG", "smartplant")
         self.influx_bucket = os.getenv("INFLUX_BUCKET", "telemetry")
 
         self.catalogue_url = os.getenv("CATALOGUE_URL", "http://catalogue-service:8000")
+        # Sensor types and physical ranges from the catalogue, refreshed in the background
+        self.registry = SensorRegistry(self.catalogue_url, refresh=float(os.getenv("SENSOR_TYPES_REFRESH", "60")))
+
+        self.influx_client = InfluxDBClient(url=influx_url, token=self.influx_token, org=self.influx_org,
+                                            enable_gzip=os.getenv("INFLUX_GZIP", "1").lower() in ("1", "true", "yes"))
+        # synchronous write API; batching happens in BatchWriter, off the MQTT network thread
+        self.write_api = self.influx_client.write_api(write_options=SYNCHRONOUS)
+        # Readings are encoded straight to line protocol instead of building Point objects
+        self.encoder = LineEncoder("telemetry")
+        # narrow: one point per reading (tag sensor, field value); wide: one point per tick (field per sensor)
+        self.schema = os.getenv("INFLUX_SCHEMA", "narrow")
+        if self.schema not in ("narrow", "wide"):
+            raise ValueError(f"Unknown INFLUX_SCHEMA {self.schema!r}, expected narrow or wide")
 
-        self.influx_client = InfluxDBClient(url=influx_url, token=self.influx_token, org=self.influx_org)
-        # use synchronous write API so we can pass precision explicitly per point
-        self.write_api = self.influx_client.write_api()
+        # Storage: InfluxDB, or an embedded SQLite file for single-board deployments
+        self.backend = os.getenv("STORAGE_BACKEND", "influx")
+        self.store = None
+        if self.backend == "sqlite":
+            # Partitioned workers share the file; SQLite serializes their write transactions
+            path = os.getenv("SQLITE_PATH", "/data/telemetry.db")
+            self.store = SQLiteStore(
+                path,
+                retention_days=float(os.getenv("STORE_RETENTION_DAYS", "30")),
+                rollup_retention_days=float(os.getenv("STORE_ROLLUP_RETENTION_DAYS", "365")),
+            )
+            logging.info(f"Writing telemetry to SQLite at {path}")
+        elif self.backend != "influx":
+            raise ValueError(f"Unknown STORAGE_BACKEND {self.backend!r}, expected influx or sqlite")
 
-        self.client = mqtt.Client()
+        # Batches InfluxDB rejects (or that time out) are kept in a local WAL and replayed later
+        self.wal = None
+        self.replayer = None
+        wal_dir = os.getenv("WAL_DIR", "")
+        if wal_dir:
+            if self.partitions > 1 or self.share_group:
+                wal_dir = os.path.join(wal_dir, f"worker-{self.partition}")
+            self.wal = WriteAheadLog(
+                wal_dir,
+                max_bytes=int(os.getenv("WAL_MAX_BYTES", str(256 * 1024 * 1024))),
+                segment_bytes=int(os.getenv("WAL_SEGMENT_BYTES", str(16 * 1024 * 1024))),
+                fsync=os.getenv("WAL_FSYNC", "0").lower() in ("1", "true", "yes"),
+            )
+            self.replayer = WalReplayer(
+                self.wal, self._write_raw, self.store.ping if self.store is not None else self.influx_client.ping,
+                max_backoff=float(os.getenv("WAL_MAX_BACKOFF", "60")),
+            )
+        self.writer = BatchWriter(
+            self._write_batch,
+            batch_size=int(os.getenv("INFLUX_BATCH_SIZE", "5000")),
+            linger=float(os.getenv("INFLUX_FLUSH_INTERVAL_MS", "1000")) / 1000.0,
+            max_queue=int(os.getenv("INGEST_QUEUE_SIZE", "100000")),
+            policy=os.getenv("INGEST_QUEUE_POLICY", "block"),
+            on_failure=self._spool_batch if self.wal is not None else None,
+        )
+
+        self.client = mqtt.Client(protocol=mqtt.MQTTv5) if self.share_group else mqtt.Client()
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.client.connect(self.broker_host, self.broker_port, 60)
 
+        # Retained per-plant last-value snapshots for warm-starting subscribers
+        self.snapshots = None
+        if self.share_group and os.getenv("SNAPSHOTS", "1").lower() in ("1", "true", "yes"):
+            # A plant's messages are spread over the group, so no worker has its latest values
+            logging.warning("Snapshots are disabled with INGEST_SHARE_GROUP; use INGEST_PARTITIONS instead")
+        elif os.getenv("SNAPSHOTS", "1").lower() in ("1", "true", "yes"):
+            self.snapshots = SnapshotPublisher(self.client, interval=float(os.getenv("SNAPSHOT_INTERVAL", "5")))
+
+        # Latest value per plant and sensor, served on /latest for polling consumers
+        self.latest = None
+        if self.share_group and os.getenv("LATEST_API", "1").lower() in ("1", "true", "yes"):
+            logging.warning("The latest-value API is disabled with INGEST_SHARE_GROUP; use INGEST_PARTITIONS instead")
+        elif os.getenv("LATEST_API", "1").lower() in ("1", "true", "yes"):
+            self.latest = LatestTable()
+
+        # Exact (plant_id, sensor, ts) repeats within the window are not written again
+        self.dedup = None
+        if float(os.getenv("DEDUP_WINDOW", "300")) > 0:
+            self.dedup = DedupWindow(window=float(os.getenv("DEDUP_WINDOW", "300")),
+                                     max_keys=int(os.getenv("DEDUP_MAX_KEYS", "1000000")))
+
+        # 1-minute / 1-hour aggregates (telemetry_1m, telemetry_1h) for long-range queries
+        self.rollups = None
+        if self.share_group and os.getenv("ROLLUPS", "1").lower() in ("1", "true", "yes"):
+            logging.warning("Rollups are disabled with INGEST_SHARE_GROUP; use INGEST_PARTITIONS instead")
+        elif os.getenv("ROLLUPS", "1").lower() in ("1", "true", "yes"):
+            self.rollups = RollupAggregator(self.writer.submit, lateness=float(os.getenv("ROLLUP_LATENESS", "60")),
+                                            previous=self._load_rollups)
+
+        # HTTP surface (metrics); partitioned workers on one host listen on consecutive ports
+        self.http_port = int(os.getenv("HTTP_PORT", "8002"))
+        if self.partitions > 1 or self.share_group:
+            self.http_port += self.partition
+        self.http_app = FastAPI()
+        self._setup_routes()
+        threading.Thread(target=self._run_http_server, daemon=True).start()
+
         self.instance_id = str(uuid.uuid4())
         self.running = True
         self._register_service()
 
-        import threading
         threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        if self.stats_queue is not None:
+            threading.Thread(target=self._report_loop, daemon=True).start()
 
         signal.signal(signal.SIGINT, self._handle_signal)
         signal.signal(signal.SIGTERM, self._handle_signal)
@@ -42,11 +159,11 @@ class SensorDataService:
             "version": "1.0.0",
             "instance_id": self.instance_id,
             "host": "sensor-data-service",
-            "port": 0,
-            "health_url": "N/A",
-            "capabilities": ["influx_writer"],
-            "topics_pub": [],
-            "topics_sub": [self.topic]
+            "port": self.http_port,
+            "health_url": f"http://sensor-data-service:{self.http_port}/health",
+            "capabilities": [f"{self.backend}_writer"] + (["latest_api"] if self.latest is not None else []) + ([f"partition:{self.partition}/{self.partitions}"] if self.partitions > 1 else []),
+            "topics_pub": ["smartplant/+/snapshot"] if self.snapshots is not None else [],
+            "topics_sub": [self._sub_topic()]
         }
         url = f"{self.catalogue_url}/services/register"
         for _ in range(5):
@@ -67,55 +184,269 @@ class SensorDataService:
                 requests.post(url, json=hb, timeout=5)
             except Exception as e:
                 logging.warning(f"Heartbeat failed: {e}")
+            logging.info(f"Influx writer stats: {self.writer.stats()}")
+            if self.replayer is not None:
+                logging.info(f"WAL stats: {self.replayer.stats()}")
+            if self.rollups is not None:
+                logging.info(f"Rollup stats: {self.rollups.stats()}")
+            if self.dedup is not None:
+                logging.info(f"Dedup stats: {self.dedup.stats()}")
             time.sleep(30)
 
-    def _on_connect(self, client, userdata, flags, rc):
+    def _report_loop(self):
+        # Feeds the supervisor: throughput, ingest lag (now - reading ts) and write backlog
+        interval = float(os.getenv("INGEST_REPORT_INTERVAL", "5"))
+        while self.running:
+            time.sleep(interval)
+            stats = self.writer.stats()
+            try:
+                self.stats_queue.put_nowait({
+                    "partition": self.partition,
+                    "pid": os.getpid(),
+                    "messages": self.messages,
+                    "skipped": self.metrics.counters["messages_skipped"],
+                    "lag_s": round(self.lag, 1),
+                    "max_lag_s": round(self.max_lag, 1),
+                    "queue_depth": stats["queue_depth"],
+                    "written": stats["written"],
+                    "dropped": stats["dropped"],
+                    "failed": stats["failed"],
+                    "ts": time.time(),
+                })
+            except Exception:
+                pass
+            self.max_lag = 0.0
+
+    def _sub_topic(self):
+        return shared_topic(self.share_group, self.topic) if self.share_group else self.topic
+
+    def _owns(self, topic):
+        if self.partitions <= 1:
+            return True
+        plant_id = topic_plant_id(topic)
+        return plant_id is None or partition_of(plant_id, self.partitions) == self.partition
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
         logging.info(f"SensorDataService connected to MQTT (rc={rc})")
-        client.subscribe(self.topic)
+        client.subscribe(self._sub_topic())
+        if self.snapshots is not None or self.latest is not None:
+            # Retained snapshots arrive right away and re-seed the last-value tables after a restart
+            client.subscribe("smartplant/+/snapshot")
 
     def _on_message(self, client, userdata, msg):
+        metrics = self.metrics
+        if not self._owns(msg.topic):
+            # Another partition's plant: dropped before paying for the JSON decode
+            metrics.inc("messages_skipped")
+            return
+        metrics.inc("messages_received")
+        t0 = time.perf_counter()
         try:
-            payload = json.loads(msg.payload.decode('utf-8'))
+            payload = json.loads(msg.payload)
         except Exception as e:
+            metrics.inc("decode_errors")
             logging.error(f"Failed to parse telemetry JSON: {e}")
             return
+        if msg.topic.endswith("/snapshot"):
+            if self.snapshots is not None:
+                self.snapshots.seed(payload)
+            if self.latest is not None:
+                self._seed_latest(payload)
+            return
+        t1 = time.perf_counter()
+
+        readings = []
+        ranges = self.registry.ranges  # one consistent table for the whole message
+        for plant_id, sensor, value, ts_str in iter_readings(payload):
+            value, rejected = check_reading(sensor, value, ranges)
+            if rejected is not None:
+                metrics.inc(f"rejected_{rejected}")
+                if rejected == "value":
+                    logging.warning("Non-numeric or non-finite sensor value received, skipping")
+                continue
+            readings.append((plant_id, sensor, value, ts_str))
+        t2 = time.perf_counter()
+        if not readings:
+            metrics.stages["decode"].observe(t1 - t0)
+            metrics.stages["validate"].observe(t2 - t1)
+            return
+
+        lines = []
+        fields = []
+        # All readings of a frame share one ts, so look it up once per message
+        seconds, ts = self.encoder.timestamp(readings[0][3])
+        for plant_id, sensor, value, _ in readings:
+            if self.dedup is not None and self.dedup.seen(plant_id, sensor, seconds):
+                metrics.inc("duplicates")
+                continue
+            if self.schema == "wide":
+                fields.append((sensor, value))
+            else:
+                lines.append(self.encoder.encode(plant_id, sensor, value, seconds))
+            if self.snapshots is not None:
+                self.snapshots.update(plant_id, sensor, value, ts)
+            if self.latest is not None:
+                self.latest.update(plant_id, sensor, value, seconds)
+            if self.rollups is not None:
+                self.rollups.add(plant_id, sensor, value, seconds)
+        if fields:
+            # Readings of one tick (or legacy messages sharing a ts) merge into the same wide point in InfluxDB
+            lines.append(self.encoder.encode_wide(readings[0][0], fields, seconds))
+        t3 = time.perf_counter()
+        metrics.stages["decode"].observe(t1 - t0)
+        metrics.stages["validate"].observe(t2 - t1)
+        metrics.stages["encode"].observe(t3 - t2)
+        now = time.time()
+        metrics.last_seen[readings[0][0]] = now
+        if lines:
+            metrics.inc("points_accepted", len(lines))
+            self.messages += 1
+            self.lag = now - seconds
+            self.max_lag = max(self.max_lag, self.lag)
+            self.writer.submit(lines)
 
+    def _seed_latest(self, payload: dict):
+        # Older than what the table holds is ignored, so a snapshot never overrides live data
         plant_id = str(payload.get("plant_id", ""))
-        sensor = str(payload.get("sensor", ""))
-        value = payload.get("value", None)
+        timestamps = payload.get("timestamps") or {}
+        for sensor, value in (payload.get("readings") or {}).items():
+            value, rejected = check_reading(sensor, value, self.registry.ranges)
+            ts = timestamps.get(sensor) or payload.get("ts")
+            if rejected is None and plant_id and ts:
+                try:
+                    self.latest.update(plant_id, sensor, value, self.encoder.timestamp(ts, strict=True)[0])
+                except ValueError:
+                    pass
 
-        if sensor not in ["temperature", "humidity", "soil_moisture"]:
-            return
+    def _write_batch(self, batch):
+        started = time.perf_counter()
         try:
-            value = float(value)
-        except:
-            logging.warning("Non-numeric sensor value received, skipping")
-            return
-        if not math.isfinite(value):
-            logging.warning("Infinite/NaN value received, skipping")
+            self._write_raw("\n".join(batch).encode("utf-8"))
+        finally:
+            self.metrics.write.observe(time.perf_counter() - started)
+
+    def _write_raw(self, data: bytes):
+        if self.store is not None:
+            self.store.write_lines(data)
             return
+        self.write_api.write(bucket=self.influx_bucket, org=self.influx_org,
+                             record=data, write_precision=WritePrecision.S)
+
+    def _load_rollups(self, res, since, until=None, plant_ids=None):
+        """Rollup windows of one resolution in [since, until), optionally of some plants only (for RollupAggregator)."""
+        if self.store is not None:
+            return self.store.rollup_windows(f"telemetry_{res}", since, until, plant_ids)
+        plants = ""
+        if plant_ids is not None:
+            plants = f'|> filter(fn: (r) => contains(value: r["plant_id"], set: {json.dumps(list(plant_ids))}))'
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+        |> range(start: {since}{f", stop: {until}" if until is not None else ""})
+        |> filter(fn: (r) => r["_measurement"] == "telemetry_{res}")
+        {plants}
+        |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+        windows = []
+        for table in self.influx_client.query_api().query(query, org=self.influx_org):
+            for record in table.records:
+                windows.append((record.values.get("plant_id") or "", record.values.get("sensor") or "",
+                                int(record.get_time().timestamp()),
+                                {field: record.values.get(field) for field in ("min", "max", "mean", "count", "last")}))
+        return windows
+
+    def _spool_batch(self, batch, error):
+        if self.wal.append("\n".join(batch).encode("utf-8"), points=len(batch)):
+            logging.info(f"Spooled {len(batch)} points to the WAL for replay")
 
-        ts_str = payload.get("ts")
-        if ts_str:
+    def _setup_routes(self):
+        @self.http_app.get("/health")
+        async def health():
+            return {"status": "ok", "partition": self.partition, "partitions": self.partitions}
+
+        @self.http_app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics():
+            writer = self.writer.stats()
+            gauges = {"queue_depth": writer["queue_depth"], "lag_seconds": round(self.lag, 3)}
+            totals = {"points_written": writer["written"], "points_dropped": writer["dropped"],
+                      "points_failed": writer["failed"]}
+            if self.replayer is not None:
+                wal = self.replayer.stats()
+                gauges.update(wal_pending_bytes=wal["pending_bytes"], wal_replay_rate=wal["replay_rate"])
+                totals.update(wal_replayed_points=wal["replayed_points"], wal_quarantined_points=wal["quarantined_points"])
+            if self.dedup is not None:
+                dedup = self.dedup.stats()
+                gauges.update(dedup_hit_rate=dedup["hit_rate"], dedup_memory_bytes=dedup["memory_bytes"])
+            if self.store is not None:
+                store = self.store.stats()
+                gauges.update(store_series=store["series"], store_file_bytes=store["file_bytes"])
+                totals.update(store_points_trimmed=store["points_trimmed"])
+            if self.latest is not None:
+                latest = self.latest.stats()
+                gauges.update(latest_series=latest["series"], latest_revision=latest["revision"])
+            if self.rollups is not None:
+                gauges.update(rollup_open_windows=self.rollups.stats()["open_windows"])
+            return self.metrics.render(gauges, totals)
+
+        @self.http_app.get("/latest")
+        async def latest(plant_ids: str = "", since: int = 0):
+            """
+            Latest values of the given plants (comma-separated, default all). With since=<revision>
+            from a previous response only what changed after it is returned.
+            """
+            if self.latest is None:
+                raise HTTPException(status_code=404, detail="latest-value API disabled")
+            wanted = [p for p in plant_ids.split(",") if p] if plant_ids else None
+            return self.latest.query(wanted, since)
+
+        @self.http_app.get("/latest/{plant_id}")
+        async def latest_plant(plant_id: str):
+            sensors = self.latest.get(plant_id) if self.latest is not None else None
+            if sensors is None:
+                raise HTTPException(status_code=404, detail=f"no readings for plant {plant_id}")
+            return {"plant_id": plant_id, "sensors": sensors}
+
+        @self.http_app.post("/backfill")
+        async def backfill(request: Request, format: str = "ndjson", precision: str = "s"):
+            """
+            Bulk import of historical readings: NDJSON telemetry payloads (legacy or frame, ts
+            required) or line protocol (format=lp, precision s|ms|us|ns), optionally gzipped.
+            """
+            if format not in ("ndjson", "lp") or precision not in ("s", "ms", "us", "ns"):
+                raise HTTPException(status_code=400, detail="format must be ndjson|lp, precision s|ms|us|ns")
+            session = BackfillSession(
+                self.encoder, self._write_backfill, fmt=format, precision=precision, schema=self.schema,
+                batch_size=int(os.getenv("INFLUX_BATCH_SIZE", "5000")), dedup=self.dedup,
+                rollups=self.rollups is not None, registry=self.registry, rollup_lookup=self._load_rollups,
+            )
             try:
-                # Accepts 'YYYY-MM-DDTHH:MM:SSZ' or offset-naive; convert to UTC naive
-                dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00")).replace(tzinfo=None)
-            except Exception:
-                dt = datetime.utcnow()
-        else:
-            dt = datetime.utcnow()
-
-        point = (
-            Point("telemetry")
-            .tag("plant_id", plant_id)
-            .tag("sensor", sensor)
-            .field("value", value)
-            .time(dt, WritePrecision.S)
-        )
+                async for chunk in request.stream():
+                    # Parsing and the blocking writes run off the event loop
+                    await run_in_threadpool(session.feed, chunk)
+                result = await run_in_threadpool(session.finish)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail={"error": str(e), **session.result()})
+            except Exception as e:
+                logging.warning(f"Backfill aborted: {e}")
+                raise HTTPException(status_code=503, detail={"error": str(e), **session.result()})
+            self.metrics.inc("points_backfilled", result["points_written"])
+            logging.info(f"Backfill done: {dict(result, errors=len(result['errors']))}")
+            return result
+
+    def _write_backfill(self, lines):
+        # Synchronous so an upload is paced by InfluxDB; failures go to the WAL when there is one
+        data = "\n".join(lines).encode("utf-8")
         try:
-            self.write_api.write(bucket=self.influx_bucket, org=self.influx_org, record=point)
+            self._write_raw(data)
+        except Exception:
+            if self.wal is None or not self.wal.append(data, points=len(lines)):
+                raise
+
+    def _run_http_server(self):
+        """Run the HTTP server in a separate thread"""
+        try:
+            uvicorn.run(self.http_app, host="0.0.0.0", port=self.http_port, log_level="warning")
         except Exception as e:
-            logging.warning(f"Failed to write to InfluxDB: {e}")
+            logging.error(f"HTTP server error: {e}")
 
     def run(self):
         self.client.loop_start()
@@ -126,6 +457,8 @@ class SensorDataService:
     def _handle_signal(self, signum, frame):
         logging.info("SensorDataService shutting down")
         self.running = False
+        if self.snapshots is not None:
+            self.snapshots.stop()
         try:
             requests.delete(f"{self.catalogue_url}/services/{self.instance_id}", timeout=5)
         except Exception as e:
@@ -135,8 +468,29 @@ class SensorDataService:
             self.client.disconnect()
         except Exception:
             pass
+        if self.rollups is not None:
+            # Partial windows are written too; after a restart they are read back and merged
+            # with the new points before the window is written again
+            self.rollups.stop()
+        # No more messages can arrive: drain queued points before exiting
+        self.writer.stop(timeout=float(os.getenv("INGEST_DRAIN_TIMEOUT", "10")))
+        logging.info(f"Influx writer drained: {self.writer.stats()}")
+        if self.replayer is not None:
+            # Whatever is still spooled stays on disk and is replayed after the restart
+            self.replayer.stop()
+            self.wal.close()
+        if self.store is not None:
+            self.store.close()
+        try:
+            self.influx_client.close()
+        except Exception:
+            pass
 
 if __name__ == "__main__":
     logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
-    service = SensorDataService()
-    service.run()
+    if int(os.getenv("INGEST_WORKERS", "1")) > 1:
+        from supervisor import IngestSupervisor
+        IngestSupervisor(int(os.getenv("INGEST_WORKERS", "1"))).run()
+    else:
+        service = SensorDataService()
+        service.run()
@@ -0,0 +1,90 @@
+import bisect
+from typing import Dict, List, Optional
+
+STAGE_BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05]
+WRITE_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. observe() is a bisect and three additions with no
+    lock: every histogram has a single writer thread, readers only take snapshots.
+    """
+    def __init__(self, buckets: List[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        lines = []
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.buckets + ["+Inf"], list(self.counts)):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class IngestMetrics:
+    """
+    Counters, per-stage latency histograms (decode, validate, encode, write) and
+    per-plant last-seen times for the ingest pipeline, rendered in the Prometheus
+    text exposition format.
+    """
+    COUNTERS = {
+        "messages_received": "MQTT telemetry messages received",
+        "messages_skipped": "Messages for plants owned by another partition",
+        "decode_errors": "Payloads that were not valid JSON",
+        "rejected_sensor": "Readings for unknown sensors",
+        "rejected_value": "Readings with a non-numeric or non-finite value",
+        "rejected_range": "Readings outside the sensor type's physical range",
+        "duplicates": "Readings dropped by the dedup window",
+        "points_accepted": "Points queued for InfluxDB",
+        "points_backfilled": "Points written through the /backfill endpoint",
+    }
+    STAGES = ("decode", "validate", "encode")
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {name: 0 for name in self.COUNTERS}
+        self.stages = {stage: Histogram(STAGE_BUCKETS) for stage in self.STAGES}
+        self.write = Histogram(WRITE_BUCKETS)
+        self.last_seen: Dict[str, float] = {}
+
+    def inc(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def render(self, gauges: Optional[Dict[str, float]] = None, totals: Optional[Dict[str, float]] = None) -> str:
+        """Render everything; gauges/totals are extra values sampled from other components."""
+        lines = []
+        for name, help_text in self.COUNTERS.items():
+            lines.append(f"# HELP ingest_{name}_total {help_text}")
+            lines.append(f"# TYPE ingest_{name}_total counter")
+            lines.append(f"ingest_{name}_total {self.counters[name]}")
+        lines.append("# HELP ingest_stage_seconds Time spent per message in each _on_message stage")
+        lines.append("# TYPE ingest_stage_seconds histogram")
+        for stage, histogram in self.stages.items():
+            lines.extend(histogram.render("ingest_stage_seconds", f'stage="{stage}"'))
+        lines.append("# HELP ingest_write_seconds InfluxDB batch write latency")
+        lines.append("# TYPE ingest_write_seconds histogram")
+        lines.extend(self.write.render("ingest_write_seconds"))
+        for name, value in (totals or {}).items():
+            lines.append(f"# TYPE ingest_{name}_total counter")
+            lines.append(f"ingest_{name}_total {value}")
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE ingest_{name} gauge")
+            lines.append(f"ingest_{name} {value}")
+        lines.append("# HELP ingest_plant_last_seen_seconds Unix time of the last reading per plant")
+        lines.append("# TYPE ingest_plant_last_seen_seconds gauge")
+        for plant_id, ts in list(self.last_seen.items()):
+            plant_id = plant_id.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'ingest_plant_last_seen_seconds{{plant_id="{plant_id}"}} {ts:.0f}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,17 @@
+import zlib
+from typing import Optional
+
+
+def partition_of(plant_id: str, partitions: int) -> int:
+    """Deterministic plant -> partition mapping, stable across processes and hosts."""
+    return zlib.crc32(str(plant_id).encode("utf-8")) % partitions
+
+
+def topic_plant_id(topic: str) -> Optional[str]:
+    # smartplant/{plant_id}/telemetry|snapshot
+    parts = topic.split("/")
+    return parts[1] if len(parts) >= 3 else None
+
+
+def shared_topic(group: str, topic: str) -> str:
+    return f"$share/{group}/{topic}"
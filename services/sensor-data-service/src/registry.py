@@ -0,0 +1,56 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+
+# Used until the catalogue answers (and if it never has): the original three sensors
+DEFAULT_RANGES: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "temperature": (-40.0, 85.0),
+    "humidity": (0.0, 100.0),
+    "soil_moisture": (0.0, 1023.0),  # raw 10-bit ADC reading, not a percentage
+}
+
+
+class SensorRegistry:
+    """
+    In-process copy of the catalogue's sensor types (GET /sensor-types): name -> (min, max)
+    physical range, refreshed every `refresh` seconds.
+    - Lookups are one dict access with no lock: a refresh builds a new dict and swaps the
+      reference, so readers see either the old or the new table, never a partial one.
+    - A failed refresh keeps the last good table.
+    """
+    def __init__(self, catalogue_url: str, refresh: float = 60.0):
+        self.url = f"{catalogue_url}/sensor-types"
+        self.refresh = float(refresh)
+        self.ranges = dict(DEFAULT_RANGES)
+        self.loaded = False
+        self._stop = threading.Event()
+        self.load()
+        if self.refresh > 0:
+            threading.Thread(target=self._loop, name="sensor-registry", daemon=True).start()
+
+    def load(self) -> bool:
+        try:
+            res = requests.get(self.url, timeout=5)
+            if res.status_code != 200:
+                raise ValueError(f"HTTP {res.status_code}")
+            ranges = {t["name"]: (t.get("min_val"), t.get("max_val")) for t in res.json()}
+        except Exception as e:
+            logging.warning(f"Could not load sensor types, keeping {sorted(self.ranges)}: {e}")
+            return False
+        if ranges and ranges != self.ranges:
+            added = sorted(set(ranges) - set(self.ranges))
+            removed = sorted(set(self.ranges) - set(ranges))
+            logging.info(f"Sensor types updated (added {added}, removed {removed})")
+            self.ranges = ranges
+        self.loaded = True
+        return True
+
+    def _loop(self):
+        # Retry quickly until the catalogue has answered once (it may start after us)
+        while not self._stop.wait(self.refresh if self.loaded else min(self.refresh, 5.0)):
+            self.load()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lineproto import escape_tag_value, format_float
+
+# resolution name -> window size in seconds
+RESOLUTIONS = {"1m": 60, "1h": 3600}
+
+
+class _Window:
+    __slots__ = ("min", "max", "sum", "count", "last", "last_ts", "dirty", "emitted", "touched", "loaded")
+
+    def __init__(self):
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.sum = 0.0
+        self.count = 0
+        self.last = None
+        self.last_ts = -1
+        self.dirty = False
+        self.emitted = False
+        self.touched = 0.0
+        self.loaded = False  # values written before this process saw the window are folded in
+
+    def add(self, value: float, seconds: int, now: float):
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        self.count += 1
+        if seconds >= self.last_ts:  # an out-of-order point does not replace the latest one
+            self.last, self.last_ts = value, seconds
+        self.dirty = True
+        self.touched = now
+
+    def merge(self, fields: dict, last_ts: int):
+        # A window this process did not see from the start: fold in what was written before.
+        # The stored point has no time for its last value, the caller says where it stands.
+        self.loaded = True
+        count = int(fields.get("count") or 0)
+        if not count:
+            return
+        self.min = min(self.min, fields["min"])
+        self.max = max(self.max, fields["max"])
+        self.sum += fields["mean"] * count
+        self.count += count
+        if last_ts >= self.last_ts:
+            self.last, self.last_ts = fields["last"], last_ts
+
+
+class RollupAggregator:
+    """
+    Tumbling-window rollups (min, max, mean, count, last) per (plant_id, sensor),
+    written as telemetry_1m / telemetry_1h points stamped with the window start.
+    - Event time drives the windows: each series keeps its own watermark (newest ts seen),
+      so a plant replaying its spool hours late still rolls up correctly.
+    - A window is emitted once the watermark passes its end + lateness, or when it has
+      been idle for `idle` seconds after its end has passed on the wall clock.
+    - Emitted windows are kept for one more window; a late point re-opens and re-emits
+      the window (InfluxDB overwrites the point). Anything older is counted as too late.
+    - stop() writes the windows still open, so a shutdown leaves partial windows behind.
+      `previous(res, since)` reads back rollup points written before this process started
+      as [(plant_id, sensor, start, {min, max, mean, count, last})]; a window that gets
+      points again after a restart starts from those values instead of overwriting them.
+    - `lookup(res, since, until, plant_ids)` does the same for windows anywhere in time (a
+      backfill upload): before a window is emitted for the first time, the point already
+      stored for it is read back, one query per resolution and flush, and merged. Its
+      `last` is kept, since uploads fill in history behind what was already written.
+    """
+    def __init__(self, emit: Callable[[List[str]], None], resolutions: Optional[Dict[str, int]] = None,
+                 lateness: float = 60.0, idle: float = 30.0, tick: float = 5.0,
+                 previous: Optional[Callable[[str, int], List[Tuple[str, str, int, dict]]]] = None,
+                 lookup: Optional[Callable[[str, int, int, List[str]], List[Tuple[str, str, int, dict]]]] = None):
+        self.emit = emit
+        self.lookup = lookup
+        self.resolutions = resolutions or RESOLUTIONS
+        self.lateness = float(lateness)
+        self.idle = float(idle)
+        self.tick = float(tick)
+        self._windows: Dict[Tuple[str, str, str], Dict[int, _Window]] = {}
+        self._watermarks: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # metrics
+        self.emitted = 0
+        self.reemitted = 0
+        self.too_late = 0
+        self.merged = 0
+        self._previous: Dict[Tuple[str, str, str, int], dict] = {}
+        self._previous_until = 0.0
+        if previous is not None:
+            self._load_previous(previous)
+        if self.tick > 0:  # tick=0: flushed by the owner only (e.g. one backfill upload)
+            threading.Thread(target=self._loop, name="rollups", daemon=True).start()
+
+    def _load_previous(self, previous):
+        wall = time.time()
+        for res, size in self.resolutions.items():
+            # Only windows a point may still be added to (see the too-late check in add())
+            horizon = 2 * size + self.lateness
+            since = int(wall - horizon)
+            since -= since % size
+            try:
+                for plant_id, sensor, start, fields in previous(res, since):
+                    self._previous[(plant_id, sensor, res, start)] = fields
+            except Exception as e:
+                logging.warning(f"Could not read back telemetry_{res} rollups, windows open at the last "
+                                f"shutdown will be overwritten: {e}")
+            self._previous_until = max(self._previous_until, wall + horizon + size)
+        if self._previous:
+            logging.info(f"Read back {len(self._previous)} rollup windows written before the restart")
+
+    def add(self, plant_id: str, sensor: str, value: float, seconds: int):
+        now = time.monotonic()
+        with self._lock:
+            series = (plant_id, sensor)
+            watermark = max(self._watermarks.get(series, seconds), seconds)
+            self._watermarks[series] = watermark
+            for res, size in self.resolutions.items():
+                start = seconds - seconds % size
+                if start + 2 * size + self.lateness < watermark:
+                    self.too_late += 1  # older than the retained window, raw data only
+                    continue
+                windows = self._windows.setdefault((plant_id, sensor, res), {})
+                window = windows.get(start)
+                if window is None:
+                    window = windows[start] = _Window()
+                    if self._previous:
+                        fields = self._previous.pop((plant_id, sensor, res, start), None)
+                        if fields is not None:
+                            window.merge(fields, start)
+                            self.merged += 1
+                        window.loaded = True
+                window.add(value, seconds, now)
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            self.flush()
+
+    def flush(self, force: bool = False):
+        """Emit windows that closed since the last call (all dirty windows when force)."""
+        now = time.monotonic()
+        wall = time.time()
+        due = []
+        with self._lock:
+            if self._previous and wall > self._previous_until:
+                self._previous = {}  # every window they belong to is past the late-point horizon
+            for (plant_id, sensor, res), windows in self._windows.items():
+                size = self.resolutions[res]
+                watermark = self._watermarks[(plant_id, sensor)]
+                for start in sorted(windows):
+                    window = windows[start]
+                    end = start + size
+                    if window.dirty and (force or watermark >= end + self.lateness or
+                                         (wall >= end + self.lateness and now - window.touched >= self.idle)):
+                        due.append((res, plant_id, sensor, start, window))
+                    elif window.emitted and start + 2 * size + self.lateness < watermark:
+                        del windows[start]  # past the late-point horizon
+        if not due:
+            return
+        if self.lookup is not None:
+            self._load_existing(due)  # outside the lock, it queries the store
+        lines = []
+        with self._lock:
+            for res, plant_id, sensor, start, window in due:
+                lines.append(self._line(res, plant_id, sensor, start, window))
+                if window.emitted:
+                    self.reemitted += 1
+                window.dirty = False
+                window.emitted = True
+                self.emitted += 1
+        self.emit(lines)
+
+    def _load_existing(self, due):
+        wanted: Dict[str, Dict[Tuple[str, str, int], _Window]] = {}
+        with self._lock:
+            for res, plant_id, sensor, start, window in due:
+                if not window.loaded:
+                    window.loaded = True
+                    wanted.setdefault(res, {})[(plant_id, sensor, start)] = window
+        for res, windows in wanted.items():
+            size = self.resolutions[res]
+            starts = [start for _, _, start in windows]
+            plant_ids = sorted({plant_id for plant_id, _, _ in windows})
+            try:
+                existing = self.lookup(res, min(starts), max(starts) + size, plant_ids)
+            except Exception as e:
+                logging.warning(f"Could not read back telemetry_{res} rollups, {len(windows)} windows "
+                                f"will be overwritten: {e}")
+                continue
+            with self._lock:
+                for plant_id, sensor, start, fields in existing:
+                    window = windows.get((plant_id, sensor, start))
+                    if window is not None:
+                        window.merge(fields, start + size)  # written before: its last value stays
+                        self.merged += 1
+
+    @staticmethod
+    def _line(res: str, plant_id: str, sensor: str, start: int, window: _Window) -> str:
+        # Field order matches Point serialization (sorted by key)
+        tags = ",".join(f"{key}={escape_tag_value(value)}" for key, value in
+                        (("plant_id", plant_id), ("sensor", sensor)) if value)
+        fields = (f"count={window.count}i,last={format_float(window.last)},max={format_float(window.max)},"
+                  f"mean={format_float(window.sum / window.count)},min={format_float(window.min)}")
+        return f"telemetry_{res}{',' + tags if tags else ''} {fields} {start}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "series": len(self._watermarks),
+                "open_windows": sum(len(w) for w in self._windows.values()),
+                "emitted": self.emitted,
+                "reemitted": self.reemitted,
+                "too_late": self.too_late,
+                "merged": self.merged,
+            }
+
+    def stop(self):
+        self._stop.set()
+        self.flush(force=True)
+        logging.info(f"Rollups flushed: {self.stats()}")
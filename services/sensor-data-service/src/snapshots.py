@@ -0,0 +1,74 @@
+import json
+import logging
+import threading
+from typing import Dict, Tuple
+
+
+def snapshot_topic(plant_id: str) -> str:
+    return f"smartplant/{plant_id}/snapshot"
+
+
+class SnapshotPublisher:
+    """
+    Maintains retained per-plant snapshot topics (smartplant/{plant_id}/snapshot) holding
+    the latest value of every sensor, so subscribers warm-start from the broker.
+    - Updates are coalesced: each dirty plant is republished at most once per interval.
+    - Snapshots use the frame shape plus per-sensor timestamps:
+      {"plant_id", "ts", "readings": {sensor: value}, "timestamps": {sensor: ts}}
+    """
+    def __init__(self, client, interval: float = 5.0):
+        self.client = client
+        self.interval = float(interval)
+        self.latest: Dict[str, Dict[str, Tuple[float, str]]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.published = 0
+        threading.Thread(target=self._loop, name="snapshot-publisher", daemon=True).start()
+
+    def update(self, plant_id: str, sensor: str, value: float, ts: str):
+        with self._lock:
+            plant = self.latest.setdefault(plant_id, {})
+            prev = plant.get(sensor)
+            if prev is not None and ts < prev[1]:
+                return  # out-of-order reading, keep the newer value
+            plant[sensor] = (value, ts)
+            self._dirty.add(plant_id)
+
+    def seed(self, payload: dict):
+        """Warm-start from a retained snapshot (e.g. after a restart) without overriding newer data."""
+        plant_id = str(payload.get("plant_id", ""))
+        readings = payload.get("readings") or {}
+        timestamps = payload.get("timestamps") or {}
+        with self._lock:
+            plant = self.latest.setdefault(plant_id, {})
+            for sensor, value in readings.items():
+                if sensor not in plant:
+                    plant[sensor] = (value, timestamps.get(sensor) or payload.get("ts") or "")
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            snapshots = [(plant_id, dict(self.latest.get(plant_id, {}))) for plant_id in dirty]
+        for plant_id, sensors in snapshots:
+            if not sensors:
+                continue
+            payload = {
+                "plant_id": plant_id,
+                "ts": max(ts for _, ts in sensors.values()),
+                "readings": {sensor: value for sensor, (value, _) in sensors.items()},
+                "timestamps": {sensor: ts for sensor, (_, ts) in sensors.items()},
+            }
+            try:
+                self.client.publish(snapshot_topic(plant_id), json.dumps(payload), qos=1, retain=True)
+                self.published += 1
+            except Exception as e:
+                logging.warning(f"Failed to publish snapshot for plant {plant_id}: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,164 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from lineproto import parse_line
+
+# Raw telemetry is normalized to one series per (plant_id, sensor) whichever InfluxDB
+# schema produced the line; rollup lines keep one series per field (min, max, mean, ...).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    measurement TEXT NOT NULL,
+    plant_id TEXT NOT NULL,
+    sensor TEXT NOT NULL,
+    field TEXT NOT NULL,
+    UNIQUE (measurement, plant_id, sensor, field)
+);
+CREATE TABLE IF NOT EXISTS points (
+    series INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (series, ts)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStore:
+    """
+    Embedded time-series store for single-board deployments (STORAGE_BACKEND=sqlite),
+    taking the same line protocol batches the InfluxDB writer gets.
+    - SQLite in WAL mode: writers (ingest workers) take turns, and any number of readers in
+      other processes (analytics, dashboard) share the database file without blocking them.
+    - A batch is one transaction of INSERT OR REPLACE rows, so a re-written point
+      overwrites itself as it does in InfluxDB.
+    - (series, ts) is the clustered primary key: a range scan of one series is one
+      index walk; retention deletes per series with the same index.
+    """
+    def __init__(self, path: str, retention_days: float = 30.0, rollup_retention_days: float = 365.0,
+                 trim_interval: float = 3600.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.retention = {"telemetry": retention_days * 86400}
+        self.rollup_retention = rollup_retention_days * 86400
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")  # other ingest workers writing the same file
+        self._db.executescript(SCHEMA)
+        self._series: Dict[Tuple[str, str, str, str], int] = {
+            (m, p, s, f): i for i, m, p, s, f in self._db.execute(
+                "SELECT id, measurement, plant_id, sensor, field FROM series")
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # metrics
+        self.points_written = 0
+        self.points_trimmed = 0
+        self.last_trim_ms = 0.0
+        if trim_interval > 0:
+            threading.Thread(target=self._trim_loop, args=(trim_interval,), name="store-trim", daemon=True).start()
+
+    def _series_id(self, key: Tuple[str, str, str, str]) -> int:
+        series = self._series.get(key)
+        if series is None:
+            self._db.execute("INSERT OR IGNORE INTO series (measurement, plant_id, sensor, field) VALUES (?, ?, ?, ?)", key)
+            series = self._db.execute("SELECT id FROM series WHERE measurement=? AND plant_id=? AND sensor=? AND field=?",
+                                      key).fetchone()[0]
+            self._series[key] = series
+        return series
+
+    def write_lines(self, data: bytes):
+        """Append a batch of second-precision line protocol (one transaction)."""
+        rows = []
+        with self._lock:
+            for line in data.decode("utf-8").split("\n"):
+                if not line:
+                    continue
+                measurement, tags, fields, seconds = parse_line(line)
+                if seconds is None:
+                    seconds = int(time.time())
+                plant_id = tags.get("plant_id", "")
+                sensor = tags.get("sensor")
+                for field, value in fields.items():
+                    if measurement == "telemetry":
+                        # narrow: sensor tag + field "value"; wide: the field names the sensor
+                        key = (measurement, plant_id, sensor or field, "value")
+                    else:
+                        key = (measurement, plant_id, sensor or "", field)
+                    rows.append((self._series_id(key), seconds, value))
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO points (series, ts, value) VALUES (?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self.points_written += len(rows)
+
+    def _trim_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.trim()
+            except Exception as e:
+                logging.warning(f"Retention trim failed: {e}")
+
+    def trim(self, now: Optional[float] = None):
+        """Delete points older than the retention of their measurement, one series at a time."""
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        with self._lock:
+            series = [(series, measurement) for (measurement, _, _, _), series in self._series.items()]
+        trimmed = 0
+        for series, measurement in series:
+            cutoff = int(now - self.retention.get(measurement, self.rollup_retention))
+            with self._lock:
+                # Short transactions: the writer is never held up for a whole-table delete
+                trimmed += self._db.execute("DELETE FROM points WHERE series=? AND ts<?", (series, cutoff)).rowcount
+        self.points_trimmed += trimmed
+        self.last_trim_ms = round((time.perf_counter() - started) * 1000, 1)
+        if trimmed:
+            logging.info(f"Retention trim removed {trimmed} points in {self.last_trim_ms}ms")
+
+    def rollup_windows(self, measurement: str, since: int, until: Optional[int] = None,
+                       plant_ids: Optional[list] = None) -> list:
+        """Rollup points in [since, until) as [(plant_id, sensor, start, {field: value})]."""
+        sql = ("SELECT s.plant_id, s.sensor, p.ts, s.field, p.value FROM series s JOIN points p ON p.series = s.id "
+               "WHERE s.measurement=? AND p.ts>=?")
+        args = [measurement, since]
+        if until is not None:
+            sql += " AND p.ts<?"
+            args.append(until)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        wanted = set(plant_ids) if plant_ids is not None else None
+        windows = {}
+        for plant_id, sensor, ts, field, value in rows:
+            if wanted is not None and plant_id not in wanted:
+                continue
+            windows.setdefault((plant_id, sensor, ts), {})[field] = value
+        return [(plant_id, sensor, ts, fields) for (plant_id, sensor, ts), fields in windows.items()]
+
+    def ping(self) -> bool:
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            series = len(self._series)
+        return {
+            "series": series,
+            "points_written": self.points_written,
+            "points_trimmed": self.points_trimmed,
+            "last_trim_ms": self.last_trim_ms,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._db.close()
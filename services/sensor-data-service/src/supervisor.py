@@ -0,0 +1,109 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Dict, Optional
+
+
+def _run_worker(partition: int, partitions: int, share_group: str, stats_queue):
+    from main import SensorDataService
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"),
+                        format=f"%(levelname)s:worker-{partition}:%(message)s", force=True)
+    service = SensorDataService(partition=partition, partitions=partitions,
+                                share_group=share_group, stats_queue=stats_queue)
+    service.run()
+
+
+class IngestSupervisor:
+    """
+    Runs N ingest worker processes on this host and reports per-worker lag.
+    - Partition mode (default): worker i owns partition offset + i out of INGEST_PARTITIONS
+      (defaults to the local worker count); set INGEST_PARTITION_OFFSET per host to split
+      partitions across hosts. Each plant is written by exactly one worker, but every worker
+      subscribes to the whole telemetry stream and drops foreign plants by topic, so it
+      keeps per-plant state (snapshots, /latest, rollups) without adding ingest capacity.
+    - Shared mode (INGEST_SHARE_GROUP set): all workers join one MQTT v5 shared
+      subscription and the broker spreads messages over them. Use it for throughput.
+    - Dead workers are restarted; SIGTERM is forwarded so workers drain their queues.
+    """
+    def __init__(self, workers: int, partitions: Optional[int] = None, offset: Optional[int] = None,
+                 share_group: Optional[str] = None, report_interval: Optional[float] = None):
+        self.workers = workers
+        self.partitions = int(partitions or os.getenv("INGEST_PARTITIONS") or workers)
+        self.offset = int(offset if offset is not None else os.getenv("INGEST_PARTITION_OFFSET", "0"))
+        self.share_group = share_group if share_group is not None else os.getenv("INGEST_SHARE_GROUP", "")
+        self.report_interval = float(report_interval or os.getenv("INGEST_SUPERVISOR_REPORT", "30"))
+        if not self.share_group and self.offset + workers > self.partitions:
+            raise ValueError(f"Workers {self.offset}..{self.offset + workers - 1} exceed INGEST_PARTITIONS={self.partitions}")
+        self.stats_queue = multiprocessing.Queue()
+        self.procs: Dict[int, multiprocessing.Process] = {}
+        self.stats: Dict[int, dict] = {}
+        self.restarts: Dict[int, int] = {}
+        self.running = True
+
+    def _spawn(self, partition: int):
+        proc = multiprocessing.Process(
+            target=_run_worker, name=f"ingest-worker-{partition}",
+            args=(partition, self.partitions if not self.share_group else 1, self.share_group, self.stats_queue),
+        )
+        proc.start()
+        self.procs[partition] = proc
+        logging.info(f"Started ingest worker {partition} (pid {proc.pid})")
+
+    def run(self):
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        mode = f"shared group {self.share_group}" if self.share_group else f"{self.partitions} partitions"
+        logging.info(f"Ingest supervisor starting {self.workers} workers ({mode})")
+        if not self.share_group and self.partitions > 1:
+            logging.info("Every partition worker receives the full telemetry stream; set INGEST_SHARE_GROUP "
+                         "to spread messages across workers for throughput")
+        for partition in range(self.offset, self.offset + self.workers):
+            self._spawn(partition)
+        next_report = time.time() + self.report_interval
+        while self.running:
+            try:
+                stats = self.stats_queue.get(timeout=1)
+                self.stats[stats["partition"]] = stats
+            except queue.Empty:
+                pass
+            for partition, proc in list(self.procs.items()):
+                if self.running and not proc.is_alive():
+                    self.restarts[partition] = self.restarts.get(partition, 0) + 1
+                    logging.warning(f"Ingest worker {partition} exited (code {proc.exitcode}), restarting")
+                    self._spawn(partition)
+            if time.time() >= next_report:
+                next_report = time.time() + self.report_interval
+                self._report()
+
+    def _report(self):
+        now = time.time()
+        for partition in sorted(self.procs):
+            stats = self.stats.get(partition)
+            if stats is None:
+                logging.info(f"worker {partition}: no report yet")
+                continue
+            age = now - stats["ts"]
+            stale = " STALE" if age > 3 * float(os.getenv("INGEST_REPORT_INTERVAL", "5")) else ""
+            logging.info(
+                f"worker {partition}: lag={stats['lag_s']}s max_lag={stats['max_lag_s']}s "
+                f"queue={stats['queue_depth']} messages={stats['messages']} written={stats['written']} "
+                f"dropped={stats['dropped']} failed={stats['failed']} restarts={self.restarts.get(partition, 0)}"
+                f"{stale}"
+            )
+
+    def _handle_signal(self, signum, frame):
+        if not self.running:
+            return
+        logging.info("Ingest supervisor shutting down workers")
+        self.running = False
+        for proc in self.procs.values():
+            if proc.is_alive():
+                proc.terminate()  # SIGTERM: workers deregister and drain their write queues
+        timeout = float(os.getenv("INGEST_DRAIN_TIMEOUT", "10")) + 5
+        for proc in self.procs.values():
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.kill()
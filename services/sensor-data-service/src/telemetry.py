@@ -0,0 +1,38 @@
+import math
+
+
+def iter_readings(payload: dict):
+    """
+    Yield (plant_id, sensor, value, ts) for both telemetry payload shapes:
+    - legacy: {"plant_id", "sensor", "value", "ts"}              (one reading per message)
+    - frame:  {"plant_id", "ts", "readings": {sensor: value}}    (all readings of one tick)
+    """
+    plant_id = str(payload.get("plant_id", ""))
+    ts = payload.get("ts")
+    readings = payload.get("readings")
+    if isinstance(readings, dict):
+        for sensor, value in readings.items():
+            yield plant_id, str(sensor), value, ts
+    else:
+        yield plant_id, str(payload.get("sensor", "")), payload.get("value", None), ts
+
+
+def check_reading(sensor: str, value, ranges: dict):
+    """
+    Ingest validation rules shared by MQTT telemetry and HTTP backfill; ranges maps each
+    known sensor to its (min, max) physical range (SensorRegistry.ranges, None = open).
+    Returns (float value, None) for a valid reading, else (None, "sensor" | "value" | "range").
+    """
+    bounds = ranges.get(sensor)
+    if bounds is None:
+        return None, "sensor"
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None, "value"
+    if not math.isfinite(value):
+        return None, "value"
+    low, high = bounds
+    if (low is not None and value < low) or (high is not None and value > high):
+        return None, "range"
+    return value, None
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+# Record header: payload length + crc32 of the payload (little endian, 8 bytes)
+_HEADER = struct.Struct("<II")
+
+# 4xx answers that say nothing about the batch itself (credentials, missing bucket, rate
+# limiting): fixed on the server side, so the batch is retried rather than quarantined
+RETRYABLE_STATUS = {401, 403, 404, 408, 429}
+
+
+def is_permanent(error: Exception) -> bool:
+    """
+    True when writing the batch again cannot succeed: InfluxDB rejected its content (4xx
+    ApiException, e.g. a field type conflict or a malformed line) or, with the SQLite
+    backend, the line protocol did not parse. Connection errors and 5xx are transient.
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return 400 <= status < 500 and status not in RETRYABLE_STATUS
+    return isinstance(error, ValueError)
+
+
+class WriteAheadLog:
+    """
+    Append-only segment files (wal-<seq>.log) holding line-protocol batches that
+    could not be written to InfluxDB.
+    - Each record is one failed batch framed by length + crc32; a torn record at the
+      tail of the last segment (crash mid-append) is truncated on startup.
+    - The replay position is committed to offsets.json with an atomic replace.
+    - Total size is capped at max_bytes by evicting the oldest segments first.
+    - Batches the database rejects for good are moved to quarantine.lp (line protocol,
+      each preceded by a comment with the error) for inspection, up to max_bytes.
+    """
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024,
+                 segment_bytes: int = 16 * 1024 * 1024, fsync: bool = False):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.segment_bytes = int(segment_bytes)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # metrics
+        self.appended_records = 0
+        self.appended_points = 0
+        self.replayed_records = 0
+        self.replayed_points = 0
+        self.dropped_bytes = 0
+        self.corrupt_records = 0
+        self.quarantined_records = 0
+        self.quarantined_points = 0
+        os.makedirs(directory, exist_ok=True)
+        self._offsets_path = os.path.join(directory, "offsets.json")
+        self._quarantine_path = os.path.join(directory, "quarantine.lp")
+        seqs = self._list_seqs() or [0]
+        read_seq, read_pos = self._load_offsets()
+        if read_seq not in seqs:
+            read_seq, read_pos = seqs[0], 0
+        for seq in seqs:
+            if seq < read_seq:
+                os.remove(self._path(seq))
+        self.read_seq, self.read_pos = read_seq, read_pos
+        self.write_seq = max(seqs)
+        self.write_pos = self._recover(self.write_seq)
+        self._writer = open(self._path(self.write_seq), "ab")
+
+    # --- files ---
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"wal-{seq:010d}.log")
+
+    def _list_seqs(self) -> List[int]:
+        return sorted(int(name[4:-4]) for name in os.listdir(self.directory)
+                      if name.startswith("wal-") and name.endswith(".log"))
+
+    def _recover(self, seq: int) -> int:
+        """Walk the valid records of the last segment and cut off a torn tail."""
+        path = self._path(seq)
+        if not os.path.exists(path):
+            return 0
+        pos = 0
+        with open(path, "r+b") as f:
+            while True:
+                rec = self._read_at(f, pos)
+                if rec is None:
+                    break
+                pos = rec[1]
+            if f.seek(0, os.SEEK_END) > pos:
+                logging.warning(f"Truncating torn WAL tail in {path} at {pos}")
+                f.truncate(pos)
+        return pos
+
+    @staticmethod
+    def _read_at(f, pos: int) -> Optional[Tuple[bytes, int]]:
+        f.seek(pos)
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return None
+        length, crc = _HEADER.unpack(header)
+        data = f.read(length)
+        if length == 0 or len(data) < length or zlib.crc32(data) != crc:
+            return None
+        return data, pos + _HEADER.size + length
+
+    def _load_offsets(self) -> Tuple[int, int]:
+        try:
+            with open(self._offsets_path) as f:
+                data = json.load(f)
+            return int(data["seq"]), int(data["pos"])
+        except Exception:
+            return -1, 0
+
+    def _store_offsets(self):
+        tmp = self._offsets_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"seq": self.read_seq, "pos": self.read_pos}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._offsets_path)
+
+    def _size(self) -> int:
+        # Segments between the read and write positions, sealed ones counted at their file size
+        total = self.write_pos
+        for seq in range(self.read_seq, self.write_seq):
+            try:
+                total += os.path.getsize(self._path(seq))
+            except FileNotFoundError:
+                pass
+        return total - self.read_pos
+
+    # --- producer ---
+    def append(self, data: bytes, points: int = 0) -> bool:
+        needed = _HEADER.size + len(data)
+        if needed > self.max_bytes:
+            logging.warning(f"WAL record of {needed} bytes exceeds WAL_MAX_BYTES, dropping")
+            return False
+        with self._lock:
+            if self.write_pos and self.write_pos + needed > self.segment_bytes:
+                self._roll()
+            self._writer.write(_HEADER.pack(len(data), zlib.crc32(data)) + data)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            self.write_pos += needed
+            self.appended_records += 1
+            self.appended_points += points
+            self._evict()
+        return True
+
+    def _roll(self):
+        self._writer.close()
+        self.write_seq += 1
+        self.write_pos = 0
+        self._writer = open(self._path(self.write_seq), "ab")
+
+    def _evict(self):
+        # Oldest data goes first once over budget; the active segment is never evicted
+        while self.read_seq < self.write_seq and self._size() > self.max_bytes:
+            size = os.path.getsize(self._path(self.read_seq))
+            logging.warning(f"WAL full, evicting segment {self.read_seq}")
+            self.dropped_bytes += size - self.read_pos
+            os.remove(self._path(self.read_seq))
+            self.read_seq, self.read_pos = self.read_seq + 1, 0
+            self._store_offsets()
+
+    # --- consumer ---
+    def has_pending(self) -> bool:
+        with self._lock:
+            return (self.read_seq, self.read_pos) != (self.write_seq, self.write_pos)
+
+    def read(self, max_records: int = 10) -> Tuple[List[Tuple[bytes, Tuple[int, int]]], Tuple[int, int]]:
+        """
+        Return up to max_records (batch, offset after it) from the committed position and the
+        offset after all of them (past any corrupt data skipped on the way).
+        """
+        records = []
+        with self._lock:
+            seq, pos = self.read_seq, self.read_pos
+            while len(records) < max_records and (seq, pos) != (self.write_seq, self.write_pos):
+                end = self.write_pos if seq == self.write_seq else os.path.getsize(self._path(seq))
+                with open(self._path(seq), "rb") as f:
+                    while len(records) < max_records and pos < end:
+                        rec = self._read_at(f, pos)
+                        if rec is None:
+                            # Damaged record: the framing after it cannot be trusted, skip the rest of the segment
+                            logging.error(f"Corrupt WAL record in segment {seq} at {pos}, skipping {end - pos} bytes")
+                            self.corrupt_records += 1
+                            pos = end
+                            break
+                        data, pos = rec
+                        records.append((data, (seq, pos)))
+                if pos >= end and seq < self.write_seq:
+                    seq, pos = seq + 1, 0  # end of a sealed segment
+        return records, (seq, pos)
+
+    def commit(self, offset: Tuple[int, int], records: List[bytes]):
+        """Persist the replay position once the records up to offset were written (or quarantined)."""
+        with self._lock:
+            seq, pos = offset
+            if seq < self.read_seq:
+                return  # evicted meanwhile
+            for old in range(self.read_seq, seq):
+                try:
+                    os.remove(self._path(old))
+                except FileNotFoundError:
+                    pass
+            self.read_seq, self.read_pos = seq, pos
+            self.replayed_records += len(records)
+            self.replayed_points += sum(data.count(b"\n") + 1 for data in records)
+            self._store_offsets()
+
+    def quarantine(self, data: bytes, error: Exception):
+        """Set aside a batch the database will never accept; call before committing past it."""
+        points = data.count(b"\n") + 1
+        reason = " ".join(str(error).split())[:500]
+        with self._lock:
+            self.quarantined_records += 1
+            self.quarantined_points += points
+            try:
+                size = os.path.getsize(self._quarantine_path)
+            except FileNotFoundError:
+                size = 0
+            if size + len(data) > self.max_bytes:
+                logging.error(f"WAL quarantine full, dropping rejected batch of {points} points: {error}")
+                return
+            with open(self._quarantine_path, "ab") as f:
+                f.write(f"# {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())} {reason}\n".encode("utf-8"))
+                f.write(data.rstrip(b"\n") + b"\n")
+        logging.error(f"Quarantined WAL batch of {points} points rejected by the database: {reason}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending_bytes": self._size(),
+                "segments": self.write_seq - self.read_seq + 1,
+                "appended_records": self.appended_records,
+                "appended_points": self.appended_points,
+                "replayed_records": self.replayed_records,
+                "replayed_points": self.replayed_points,
+                "dropped_bytes": self.dropped_bytes,
+                "corrupt_records": self.corrupt_records,
+                "quarantined_records": self.quarantined_records,
+                "quarantined_points": self.quarantined_points,
+            }
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+
+class WalReplayer:
+    """
+    Drains a WriteAheadLog into InfluxDB, oldest batch first.
+    - Replay only starts once `healthy()` says InfluxDB is reachable.
+    - A failed write backs off exponentially (min_backoff doubling up to max_backoff);
+      a successful one resets the backoff. Only transient errors (connection, timeout, 5xx)
+      back off: a batch rejected for good (is_permanent) is quarantined and replay moves
+      past it, so one bad batch cannot hold up everything spooled after it.
+    """
+    def __init__(self, wal: WriteAheadLog, write_fn: Callable[[bytes], None], healthy: Callable[[], bool],
+                 batch: int = 10, min_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.wal = wal
+        self._write = write_fn
+        self._healthy = healthy
+        self.batch = int(batch)
+        self.min_backoff = float(min_backoff)
+        self.max_backoff = float(max_backoff)
+        self.backoff = self.min_backoff
+        self.replay_rate = 0.0  # points/s of the last replayed batch
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="wal-replayer", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self.wal.has_pending():
+                self._stop.wait(1.0)
+                continue
+            try:
+                healthy = self._healthy()
+            except Exception:
+                healthy = False
+            if not healthy:
+                self._wait_backoff()
+                continue
+            entries, offset = self.wal.read(self.batch)
+            if not entries:
+                self.wal.commit(offset, [])  # only skipped corrupt data
+                continue
+            started = time.monotonic()
+            records = []  # written to the database
+            done = None  # offset after the last batch written or quarantined
+            try:
+                for data, end in entries:
+                    try:
+                        self._write(data)
+                        records.append(data)
+                    except Exception as e:
+                        if not is_permanent(e):
+                            raise
+                        self.wal.quarantine(data, e)
+                    done = end
+            except Exception as e:
+                # Keep what got through (a quarantined batch must not be quarantined twice); the rest
+                # is retried, and InfluxDB overwrites identical points, so repeats are harmless
+                if done is not None:
+                    self.wal.commit(done, records)
+                logging.warning(f"WAL replay failed, retrying in {self.backoff:.0f}s: {e}")
+                self._wait_backoff()
+                continue
+            self.wal.commit(offset, records)
+            self.backoff = self.min_backoff
+            points = sum(data.count(b"\n") + 1 for data in records)
+            self.replay_rate = points / max(time.monotonic() - started, 1e-6)
+            logging.info(f"Replayed {points} points from WAL at {self.replay_rate:.0f} points/s; {self.wal.stats()}")
+
+    def _wait_backoff(self):
+        self._stop.wait(self.backoff)
+        self.backoff = min(self.max_backoff, self.backoff * 2)
+
+    def stats(self) -> dict:
+        return dict(self.wal.stats(), replay_rate=round(self.replay_rate, 1), backoff_s=self.backoff)
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        self._stop.set()
+        self._thread.join(timeout)
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+
+class BatchWriter:
+    """
+    Bounded in-memory queue feeding a background InfluxDB writer.
+    - Records are flushed when `batch_size` is reached or `linger` seconds after the
+      first record of a batch, whichever comes first.
+    - When the queue is full the policy decides: "block" (backpressure on the MQTT
+      thread for up to block_timeout, then drop the new record), "drop_oldest" or
+      "drop_newest" (load shedding).
+    - stop() drains everything still queued before returning.
+    """
+    POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, write_fn: Callable[[List], None], batch_size: int = 5000, linger: float = 1.0,
+                 max_queue: int = 100000, policy: str = "block", block_timeout: float = 1.0,
+                 on_failure: Optional[Callable[[List, Exception], None]] = None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}, expected one of {self.POLICIES}")
+        self._write = write_fn
+        self.batch_size = int(batch_size)
+        self.linger = float(linger)
+        self.policy = policy
+        self.block_timeout = float(block_timeout)
+        self.on_failure = on_failure
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # metrics
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_flush_s = 0.0
+        self.max_flush_s = 0.0
+        self._total_flush_s = 0.0
+        self._last_drop_log = 0.0
+        self._thread = threading.Thread(target=self._run, name="influx-writer", daemon=True)
+        self._thread.start()
+
+    # --- producer side (MQTT thread) ---
+    def submit(self, records: Iterable) -> int:
+        """Queue records for writing; returns how many were accepted."""
+        accepted = 0
+        dropped = 0
+        for record in records:
+            try:
+                self._queue.put_nowait(record)
+                accepted += 1
+                continue
+            except queue.Full:
+                pass
+            if self.policy == "block":
+                try:
+                    self._queue.put(record, timeout=self.block_timeout)
+                    accepted += 1
+                except queue.Full:
+                    dropped += 1
+            elif self.policy == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                    dropped += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(record)
+                    accepted += 1
+                except queue.Full:
+                    dropped += 1
+            else:  # drop_newest
+                dropped += 1
+        with self._lock:
+            self.submitted += accepted
+            self.dropped += dropped
+        if dropped and time.monotonic() - self._last_drop_log > 10:
+            # Rate-limited: under load shedding this would otherwise log per message
+            self._last_drop_log = time.monotonic()
+            logging.warning(f"Influx write queue full ({self.policy}), {self.dropped} points dropped so far")
+        return accepted
+
+    # --- consumer side (writer thread) ---
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = 0 if self._stopping.is_set() else deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List):
+        started = time.monotonic()
+        try:
+            self._write(batch)
+            ok = True
+        except Exception as e:
+            ok = False
+            logging.warning(f"Failed to write batch of {len(batch)} points to InfluxDB: {e}")
+            if self.on_failure is not None:
+                try:
+                    self.on_failure(batch, e)
+                except Exception as hook_error:
+                    logging.error(f"Write failure handler error: {hook_error}")
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            self.last_flush_s = elapsed
+            self.max_flush_s = max(self.max_flush_s, elapsed)
+            self._total_flush_s += elapsed
+            if ok:
+                self.written += len(batch)
+            else:
+                self.failed += len(batch)
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Stop accepting work and drain what is queued (up to timeout seconds)."""
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning(f"Influx writer did not drain in time, {self._queue.qsize()} points left")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "policy": self.policy,
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_batch_size": self.last_batch_size,
+                "last_flush_ms": round(self.last_flush_s * 1000, 1),
+                "max_flush_ms": round(self.max_flush_s * 1000, 1),
+                "avg_flush_ms": round(self._total_flush_s / self.batches * 1000, 1) if self.batches else 0.0,
+            }
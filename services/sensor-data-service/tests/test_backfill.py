@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from backfill import BackfillSession  # noqa: E402
+from lineproto import LineEncoder  # noqa: E402
+from rollups import RollupAggregator  # noqa: E402
+from store import SQLiteStore  # noqa: E402
+
+HOUR = 1714564800  # 2024-05-01T12:00:00Z
+
+
+def test_bad_ts_rejects_only_its_line():
+    written = []
+    session = BackfillSession(LineEncoder(), written.extend, rollups=False)
+    session.feed(b"\n".join([
+        b'{"plant_id": 1, "sensor": "temperature", "value": 21.5, "ts": 1714564800}',
+        b'{"plant_id": 1, "sensor": "temperature", "value": 21.6, "ts": []}',
+        b'{"plant_id": 1, "sensor": "temperature", "value": 21.7, "ts": {"a": 1}}',
+        b'{"plant_id": 1, "sensor": "temperature", "value": 21.8, "ts": Infinity}',
+        b'{"plant_id": 1, "sensor": "temperature", "value": 21.9, "ts": NaN}',
+        b'{"plant_id": 1, "readings": {"temperature": 22.0, "humidity": 50}, "ts": "2024-05-01T12:01:00Z"}',
+    ]))
+    result = session.finish()
+    assert (result["lines"], result["accepted"], result["rejected"]) == (6, 3, 4)
+    assert [e["line"] for e in result["errors"]] == [2, 3, 4, 5]
+    assert len(written) == 3
+
+
+def _upload(store, lines):
+    session = BackfillSession(LineEncoder(), lambda batch: store.write_lines("\n".join(batch).encode()),
+                              rollup_lookup=lambda res, since, until, plant_ids:
+                              store.rollup_windows(f"telemetry_{res}", since, until, plant_ids))
+    session.feed("\n".join(lines).encode())
+    return session.finish()
+
+
+def test_upload_merges_with_rollups_already_written(tmp_path):
+    store = SQLiteStore(str(tmp_path / "telemetry.db"), trim_interval=0)
+    live = RollupAggregator(lambda lines: store.write_lines("\n".join(lines).encode()), tick=0)
+    for value, offset in ((20.0, 1800), (22.0, 1810)):
+        live.add("1", "temperature", value, HOUR + offset)
+    live.flush(force=True)
+
+    line = '{{"plant_id": 1, "sensor": "temperature", "value": {}, "ts": {}}}'
+    _upload(store, [line.format(18.0, HOUR + 600), line.format(19.0, HOUR + 1805)])
+    _upload(store, [line.format(30.0, HOUR + 60)])  # a second upload into the same hour
+
+    hour = {ts: fields for _, _, ts, fields in store.rollup_windows("telemetry_1h", HOUR)}[HOUR]
+    assert hour == {"count": 5, "last": 22.0, "max": 30.0, "mean": 21.8, "min": 18.0}
+    minute = {ts: fields for _, _, ts, fields in store.rollup_windows("telemetry_1m", HOUR)}
+    assert minute[HOUR + 1800] == {"count": 3, "last": 22.0, "max": 22.0, "mean": 61.0 / 3, "min": 19.0}
+    assert minute[HOUR + 600]["count"] == 1
+    store.close()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from dedup import DedupWindow  # noqa: E402
+
+
+def test_repeats_are_dropped():
+    dedup = DedupWindow()
+    assert not dedup.seen("1", "temperature", 1700000000)
+    assert dedup.seen("1", "temperature", 1700000000)
+    assert not dedup.seen("1", "humidity", 1700000000)
+    assert dedup.stats()["hits"] == 1
+
+
+def test_hash_collision_is_not_a_duplicate():
+    # hash(-1) == hash(-2) in CPython, so these keys hash alike but are different readings
+    assert hash(("1", "temperature", -1)) == hash(("1", "temperature", -2))
+    dedup = DedupWindow()
+    assert not dedup.seen("1", "temperature", -1)
+    assert not dedup.seen("1", "temperature", -2)
@@ -0,0 +1,24 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from lineproto import LineEncoder  # noqa: E402
+
+
+def test_timestamp_is_parsed_and_cached():
+    encoder = LineEncoder()
+    assert encoder.timestamp("2024-05-01T12:00:00Z") == (1714564800, "2024-05-01T12:00:00Z")
+    assert encoder.timestamp("2024-05-01T12:00:00Z") is encoder.timestamp("2024-05-01T12:00:00Z")
+
+
+@pytest.mark.parametrize("ts", [[], {}, ["2024-05-01T12:00:00Z"], {"a": 1}, 12.5, None, "", "yesterday"])
+def test_bad_ts_falls_back_to_now(ts):
+    encoder = LineEncoder()
+    seconds, _ = encoder.timestamp(ts)
+    assert abs(seconds - time.time()) < 5
+    with pytest.raises(ValueError):
+        encoder.timestamp(ts, strict=True)
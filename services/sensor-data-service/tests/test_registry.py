@@ -0,0 +1,32 @@
+import os
+import sys
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "sensor-service", "src"))
+
+from fleet import FleetSimulator  # noqa: E402
+from registry import DEFAULT_RANGES  # noqa: E402
+from simulator import ComplexSimulator  # noqa: E402
+from telemetry import check_reading  # noqa: E402
+
+
+def test_complex_simulator_readings_pass_default_ranges():
+    sim = ComplexSimulator(seed=1)
+    for _ in range(50):
+        for sensor, value in (("temperature", sim.read_temperature()), ("humidity", sim.read_humidity()),
+                              ("soil_moisture", sim.read_soil_moisture())):
+            assert check_reading(sensor, value, DEFAULT_RANGES) == (value, None)
+    # Wettest soil the simulator can report, right after watering
+    sim.water(2000)
+    value = sim.read_soil_moisture()
+    assert check_reading("soil_moisture", value, DEFAULT_RANGES) == (value, None)
+
+
+def test_fleet_simulator_readings_pass_default_ranges():
+    fleet = FleetSimulator([str(i) for i in range(100)], seed=1)
+    fleet.water(None, 2000)
+    for _ in range(5):
+        for sensor, values in zip(("temperature", "humidity", "soil_moisture"), fleet.step()):
+            for value in values.tolist():
+                assert check_reading(sensor, value, DEFAULT_RANGES) == (value, None)
@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rollups import RollupAggregator  # noqa: E402
+from store import SQLiteStore  # noqa: E402
+
+
+def _write(store):
+    return lambda lines: store.write_lines("\n".join(lines).encode())
+
+
+def test_window_open_at_shutdown_is_merged_after_restart(tmp_path):
+    store = SQLiteStore(str(tmp_path / "telemetry.db"), trim_interval=0)
+    minute = int(time.time()) // 60 * 60  # recent enough for the 1m window to be read back
+    start = minute // 3600 * 3600
+    before = RollupAggregator(_write(store), tick=0, previous=lambda res, since: store.rollup_windows(f"telemetry_{res}", since))
+    for value in (10.0, 20.0):
+        before.add("1", "soil_moisture", value, minute)
+    before.stop()  # writes the partial windows
+
+    after = RollupAggregator(_write(store), tick=0, previous=lambda res, since: store.rollup_windows(f"telemetry_{res}", since))
+    after.add("1", "soil_moisture", 60.0, minute + 1)
+    after.flush(force=True)
+
+    windows = {ts: fields for _, _, ts, fields in store.rollup_windows("telemetry_1h", start)}
+    assert windows[start] == {"count": 3, "last": 60.0, "max": 60.0, "mean": 30.0, "min": 10.0}
+    assert after.stats()["merged"] == 2  # the 1m and the 1h window
+    store.close()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from wal import WalReplayer, WriteAheadLog  # noqa: E402
+
+
+class ApiError(Exception):
+    """Stands in for influxdb_client's ApiException (only .status is looked at)."""
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def _replay(wal, write, until):
+    replayer = WalReplayer(wal, write, lambda: True, min_backoff=0.01, max_backoff=0.01)
+    deadline = time.monotonic() + 5
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    replayer.stop()
+
+
+def test_rejected_batch_is_quarantined_and_replay_moves_on(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    for data in (b"telemetry value=1 1", b"telemetry value=\"x\" 2", b"telemetry value=3 3"):
+        wal.append(data, points=1)
+    written = []
+
+    def write(data):
+        if b'"x"' in data:
+            raise ApiError(400)  # field type conflict: never accepted
+        written.append(data)
+    _replay(wal, write, lambda: not wal.has_pending())
+
+    assert written == [b"telemetry value=1 1", b"telemetry value=3 3"]
+    stats = wal.stats()
+    assert (stats["replayed_records"], stats["quarantined_records"]) == (2, 1)
+    with open(tmp_path / "quarantine.lp", "rb") as f:
+        assert f.read().splitlines()[1] == b'telemetry value="x" 2'
+    wal.close()
+
+
+def test_transient_errors_are_retried(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.append(b"telemetry value=1 1", points=1)
+    attempts = []
+
+    def write(data):
+        attempts.append(data)
+        if len(attempts) < 3:
+            raise ApiError(503)
+    _replay(wal, write, lambda: not wal.has_pending())
+
+    assert len(attempts) == 3
+    assert wal.stats()["quarantined_records"] == 0
+    wal.close()
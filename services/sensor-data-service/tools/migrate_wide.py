@@ -0,0 +1,117 @@
+"""
+One-shot migration of narrow telemetry (one point per reading, tag sensor, field value)
+to the wide-row schema (one point per plant and tick, one field per sensor).
+
+Walks the range in chunks, oldest first: each chunk is streamed from InfluxDB, pivoted
+per (plant_id, time), written back as wide points in batches and, with --delete, the
+narrow points of that chunk are removed afterwards. Sensors are taken from the data
+(whatever sensor tags the chunk holds), so types added in the catalogue migrate too.
+Chunk bounds are whole seconds; the read range excludes its stop and so does the delete
+(it ends 1ns earlier), leaving points stamped at the stop for the next chunk. Re-running a chunk is harmless
+(wide points overwrite themselves), so an interrupted run resumes with --start set to
+the last chunk printed.
+
+    INFLUX_URL=... INFLUX_TOKEN=... python tools/migrate_wide.py --start 2024-01-01T00:00:00Z [--chunk 6h] [--delete]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from lineproto import LineEncoder  # noqa: E402
+
+# Columns of a pivoted row that are not sensor values
+RESERVED = {"result", "table", "_time", "plant_id"}
+UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc).replace(microsecond=0)
+
+
+def rfc3339(value: datetime, minus_ns: int = 0) -> str:
+    # Whole-second datetime as RFC3339, optionally a few nanoseconds earlier
+    if not minus_ns:
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return f"{(value - timedelta(seconds=1)).strftime('%Y-%m-%dT%H:%M:%S')}.{10 ** 9 - minus_ns:09d}Z"
+
+
+def parse_chunk(value: str) -> timedelta:
+    return timedelta(seconds=int(value[:-1]) * UNITS[value[-1]])
+
+
+def migrate_chunk(client, encoder: LineEncoder, args, start: datetime, stop: datetime) -> int:
+    query = f'''
+    from(bucket: "{args.bucket}")
+    |> range(start: {rfc3339(start)}, stop: {rfc3339(stop)})
+    |> filter(fn: (r) => r["_measurement"] == "telemetry" and r["_field"] == "value" and exists r["sensor"])
+    |> keep(columns: ["_time", "_value", "plant_id", "sensor"])
+    |> group(columns: ["plant_id"])
+    |> pivot(rowKey: ["_time"], columnKey: ["sensor"], valueColumn: "_value")
+    '''
+    write_api = client.write_api(write_options=SYNCHRONOUS)
+    batch = []
+    points = 0
+    sensors = set()
+    # query_stream yields records one by one, so memory stays flat whatever the chunk size
+    for record in client.query_api().query_stream(query, org=args.org):
+        fields = [(sensor, float(value)) for sensor, value in record.values.items()
+                  if sensor not in RESERVED and value is not None]
+        if not fields:
+            continue
+        sensors.update(sensor for sensor, _ in fields)
+        seconds = int(record.get_time().timestamp())
+        batch.append(encoder.encode_wide(str(record.values["plant_id"]), fields, seconds))
+        if len(batch) >= args.batch_size:
+            write_api.write(bucket=args.bucket, org=args.org, record="\n".join(batch), write_precision=WritePrecision.S)
+            points += len(batch)
+            batch = []
+    if batch:
+        write_api.write(bucket=args.bucket, org=args.org, record="\n".join(batch), write_precision=WritePrecision.S)
+        points += len(batch)
+    if args.delete:
+        delete_api = client.delete_api()
+        # The delete predicate includes its stop, unlike range(): end 1ns before it
+        for sensor in sorted(sensors):
+            delete_api.delete(rfc3339(start), rfc3339(stop, minus_ns=1), f'_measurement="telemetry" AND sensor="{sensor}"',
+                              bucket=args.bucket, org=args.org)
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", required=True, help="ISO time of the oldest data to migrate")
+    parser.add_argument("--stop", default=None, help="ISO time to stop at (default: now)")
+    parser.add_argument("--chunk", default="6h", help="chunk length, e.g. 30m, 6h, 1d")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--delete", action="store_true", help="delete narrow points of each migrated chunk")
+    parser.add_argument("--bucket", default=os.getenv("INFLUX_BUCKET", "telemetry"))
+    parser.add_argument("--org", default=os.getenv("INFLUX_ORG", "smartplant"))
+    args = parser.parse_args()
+
+    client = InfluxDBClient(url=os.getenv("INFLUX_URL", "http://localhost:8086"),
+                            token=os.getenv("INFLUX_TOKEN", "my-token"), org=args.org, timeout=120000)
+    encoder = LineEncoder("telemetry")
+    start = parse_time(args.start)
+    stop = parse_time(args.stop) if args.stop else datetime.now(timezone.utc).replace(microsecond=0)
+    chunk = parse_chunk(args.chunk)
+    total = 0
+    while start < stop:
+        end = min(start + chunk, stop)
+        began = time.perf_counter()
+        points = migrate_chunk(client, encoder, args, start, end)
+        total += points
+        print(f"{start.isoformat()} .. {end.isoformat()}: {points} wide points "
+              f"in {time.perf_counter() - began:.1f}s (total {total})", flush=True)
+        start = end
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: plants simulated per second per core.
+
+Steps FleetSimulator for a range of fleet sizes on a single core and compares it
+with the per-plant ComplexSimulator loop it replaces.
+
+    python bench/bench_fleet.py [--plants 100,1000,5000] [--seconds 2]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fleet import FleetSimulator  # noqa: E402
+from simulator import ComplexSimulator  # noqa: E402
+
+
+def _rate(step, plants: int, seconds: float) -> float:
+    ticks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        step()
+        ticks += 1
+    return ticks * plants / (time.perf_counter() - start)
+
+
+def bench_fleet(plants: int, seconds: float) -> float:
+    fleet = FleetSimulator([str(i) for i in range(plants)], seed=0)
+
+    def step():
+        temps, hums, soils = fleet.step()
+        temps.tolist(); hums.tolist(); soils.tolist()
+    return _rate(step, plants, seconds)
+
+
+def bench_scalar(plants: int, seconds: float) -> float:
+    sims = [ComplexSimulator(plant_id=str(i)) for i in range(plants)]
+
+    def step():
+        for sim in sims:
+            sim.read_temperature(); sim.read_humidity(); sim.read_soil_moisture()
+    return _rate(step, plants, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plants", default="100,1000,5000,50000")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    print(f"{'plants':>8} {'fleet plants/s/core':>22} {'scalar plants/s/core':>22} {'speedup':>8}")
+    for n in (int(x) for x in args.plants.split(",")):
+        fleet = bench_fleet(n, args.seconds)
+        scalar = bench_scalar(n, args.seconds)
+        print(f"{n:>8} {fleet:>22,.0f} {scalar:>22,.0f} {fleet / scalar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
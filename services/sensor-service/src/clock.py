@@ -0,0 +1,42 @@
+import threading
+import time
+from typing import Optional
+
+
+class SystemClock:
+    """Wall clock; the default for live deployments."""
+    def time(self) -> float:
+        return time.time()
+
+    def wait(self, event: threading.Event, delay: float):
+        if delay > 0:
+            event.wait(delay)
+
+
+class VirtualClock:
+    """
+    Simulated clock for reproducible, time-accelerated runs.
+    - speed > 0: virtual time runs `speed` times faster than real time.
+    - speed == 0: as fast as possible; time only moves when wait() skips ahead to a deadline.
+    """
+    def __init__(self, speed: float = 1.0, start: Optional[float] = None):
+        self.speed = float(speed)
+        self._start = time.time() if start is None else float(start)
+        self._origin = time.monotonic()
+        self._offset = 0.0
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        if self.speed > 0:
+            return self._start + (time.monotonic() - self._origin) * self.speed
+        with self._lock:
+            return self._start + self._offset
+
+    def wait(self, event: threading.Event, delay: float):
+        if delay <= 0:
+            return
+        if self.speed > 0:
+            event.wait(delay / self.speed)
+        elif not event.is_set():
+            with self._lock:
+                self._offset += delay
@@ -0,0 +1,72 @@
+from typing import Dict, Optional, Tuple
+
+
+def parse_bands(spec: str) -> Dict[str, float]:
+    """
+    Parse a band spec: "temperature=0.5,humidity=1" per sensor, or a bare "2" applying
+    to every sensor (stored under "*").
+    """
+    bands = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            sensor, value = part.split("=", 1)
+            bands[sensor.strip()] = float(value)
+        else:
+            bands["*"] = float(part)
+    return bands
+
+
+class DeadbandFilter:
+    """
+    Report-by-exception filter applied before publishing.
+    - A reading is published when it moves more than the sensor's band away from the
+      last published value; band = max(absolute band, percent band * |last value|).
+    - Every `keyframe_every` ticks a reading is sent regardless, so consumers can tell
+      "unchanged" from "sensor dead".
+    - Keeps sent/suppressed counters per sensor.
+    """
+    def __init__(self, abs_bands: Optional[Dict[str, float]] = None,
+                 pct_bands: Optional[Dict[str, float]] = None, keyframe_every: int = 12):
+        self.abs_bands = abs_bands or {}
+        self.pct_bands = pct_bands or {}
+        self.keyframe_every = max(1, int(keyframe_every))
+        self._last: Dict[Tuple[str, str], Tuple[float, int]] = {}  # -> (last sent value, ticks since sent)
+        self.sent: Dict[str, int] = {}
+        self.suppressed: Dict[str, int] = {}
+
+    def _band(self, sensor: str, last: float) -> float:
+        abs_band = self.abs_bands.get(sensor, self.abs_bands.get("*", 0.0))
+        pct_band = self.pct_bands.get(sensor, self.pct_bands.get("*", 0.0))
+        return max(abs_band, pct_band / 100.0 * abs(last))
+
+    def filter(self, plant_id: str, values: dict) -> dict:
+        """Return the subset of {sensor: value} that should be published this tick."""
+        out = {}
+        for sensor, value in values.items():
+            if value is None:
+                continue
+            key = (plant_id, sensor)
+            prev = self._last.get(key)
+            if prev is not None:
+                last, ticks = prev
+                if ticks + 1 < self.keyframe_every and abs(value - last) <= self._band(sensor, last):
+                    self._last[key] = (last, ticks + 1)
+                    self.suppressed[sensor] = self.suppressed.get(sensor, 0) + 1
+                    continue
+            self._last[key] = (value, 0)
+            self.sent[sensor] = self.sent.get(sensor, 0) + 1
+            out[sensor] = value
+        return out
+
+    def stats(self) -> dict:
+        sent = sum(self.sent.values())
+        suppressed = sum(self.suppressed.values())
+        total = sent + suppressed
+        return {
+            "sent": dict(self.sent),
+            "suppressed": dict(self.suppressed),
+            "suppression_ratio": round(suppressed / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,82 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import requests
+
+
+class EdgeRules:
+    """
+    In-process soil-moisture low rule, so watering does not need analytics-service
+    and catalogue-service to be reachable.
+    - Effective thresholds for the hosted plants are cached from catalogue-service and
+      refreshed in the background; the last known values are kept when catalogue is down.
+    - Hysteresis follows analytics RulesEngine.evaluate: the low state latches when the
+      value drops below min_val and re-arms once it rises above min_val + hysteresis.
+    """
+    SENSOR = "soil_moisture"
+
+    def __init__(self, catalogue_url: str, plant_ids: List[str], refresh_interval: float = 60.0):
+        self.catalogue_url = catalogue_url
+        self.plant_ids = set(plant_ids)
+        self.refresh_interval = float(refresh_interval)
+        self.thresholds: Dict[str, List[dict]] = {}
+        self.states: Dict[str, Dict[str, bool]] = {}
+        self._stop = threading.Event()
+        self.refresh()
+        threading.Thread(target=self._refresh_loop, name="edge-thresholds", daemon=True).start()
+
+    def refresh(self) -> bool:
+        # One request covers a whole fleet; a single plant asks for its own thresholds only
+        url = f"{self.catalogue_url}/thresholds"
+        if len(self.plant_ids) == 1:
+            url += f"?plant_id={next(iter(self.plant_ids))}"
+        try:
+            res = requests.get(url, timeout=5)
+            if res.status_code != 200:
+                return False
+            thresholds: Dict[str, List[dict]] = {}
+            for t in res.json():
+                plant_id = str(t.get("plant_id"))
+                if plant_id in self.plant_ids and t.get("sensor") == self.SENSOR:
+                    thresholds.setdefault(plant_id, []).append(t)
+            self.thresholds = thresholds
+            return True
+        except Exception as e:
+            logging.warning(f"Could not refresh edge thresholds (keeping last known): {e}")
+            return False
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def evaluate(self, plant_id: str, value: Optional[float]) -> Optional[dict]:
+        """Return the triggering threshold when the low rule fires for this reading, else None."""
+        if value is None:
+            return None
+        thresholds = self.thresholds.get(plant_id)
+        if not thresholds:
+            return None
+        state = self.states.setdefault(plant_id, {"low": False, "high": False})
+        for t in thresholds:
+            min_val = t.get("min_val")
+            max_val = t.get("max_val")
+            hyst = t.get("hysteresis") or 0.0
+            if min_val is not None:
+                if value < min_val and not state["low"]:
+                    state["low"] = True
+                    state["high"] = False
+                    return t
+                if state["low"] and value > (min_val + hyst):
+                    state["low"] = False
+            if max_val is not None:
+                if value > max_val and not state["high"]:
+                    state["high"] = True
+                    state["low"] = False
+                    return None  # high alerts stay with analytics-service
+                if state["high"] and value < (max_val - hyst):
+                    state["high"] = False
+        return None
+
+    def stop(self):
+        self._stop.set()
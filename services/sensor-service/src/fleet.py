@@ -0,0 +1,119 @@
+import math
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from clock import SystemClock
+from simulator import SCENARIO_CONDITIONS
+
+SENSORS = ("temperature", "humidity", "soil_moisture")
+
+
+def parse_plant_ids(spec: str) -> List[str]:
+    """
+    Parse a PLANT_IDS spec into a list of plant ids.
+    Accepts comma separated ids and inclusive numeric ranges, e.g. "1-5000" or "1,2,10-12".
+    """
+    ids = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            ids.extend(str(i) for i in range(int(lo), int(hi) + 1))
+        else:
+            ids.append(part)
+    # keep first occurrence order, drop duplicates
+    return list(dict.fromkeys(ids))
+
+
+class FleetSimulator:
+    """
+    Vectorized counterpart of ComplexSimulator hosting many plants in one process.
+    - One NumPy array slot per plant; step() advances every plant in a single call.
+    - Same dynamics as ComplexSimulator: daily temperature sine + noise, humidity
+      inversely correlated with temperature, soil moisture decaying between waterings.
+    - Scenario conditions are per-plant arrays; dropped-out sensors read as NaN.
+    """
+    def __init__(self, plant_ids: Iterable[str], seed: Optional[int] = None, clock=None):
+        self.plant_ids = [str(p) for p in plant_ids]
+        self.slots = {pid: i for i, pid in enumerate(self.plant_ids)}
+        n = len(self.plant_ids)
+        self.clock = clock or SystemClock()
+        self._rng = np.random.default_rng(seed)
+        self._start = self.clock.time()
+        self._lock = threading.Lock()  # water() arrives on the MQTT thread
+        self.soil = np.full(n, 600.0)  # initial soil moisture (0-1023 scale)
+        # scenario-controlled conditions
+        self.temp_offset = np.zeros(n)
+        self.humidity_offset = np.zeros(n)
+        self.decay_scale = np.ones(n)
+        self.pump_ok = np.ones(n, dtype=bool)
+        self.dropout = {sensor: np.zeros(n, dtype=bool) for sensor in SENSORS}
+
+    def __len__(self) -> int:
+        return len(self.plant_ids)
+
+    # --- internal helpers ---
+    def _day_fraction(self) -> float:
+        return ((self.clock.time() - self._start) % 86400) / 86400.0
+
+    def _select(self, plant_id: Optional[str]):
+        if plant_id in (None, "*"):
+            return slice(None)
+        return self.slots.get(str(plant_id))
+
+    # --- sensor simulation ---
+    def step(self, slots=None):
+        """
+        Advance all plants (or only the plants at index array `slots`) by one tick; returns
+        (temperature, humidity, soil_moisture) arrays in the same order, with NaN for
+        sensors in dropout.
+        """
+        sel = slice(None) if slots is None else slots
+        n = len(self.plant_ids) if slots is None else len(slots)
+        rng = self._rng
+        base = 24 + 6 * math.sin(2 * math.pi * self._day_fraction())
+        temp = np.round(base + self.temp_offset[sel] + rng.uniform(-0.7, 0.7, n), 1)
+        base_hum = np.maximum(30.0, 80 - (temp - 20)) + self.humidity_offset[sel]
+        hum = np.round(np.clip(base_hum + rng.uniform(-1.0, 1.0, n), 0.0, 100.0), 1)
+        decay = rng.uniform(0.5, 1.2, n) * self.decay_scale[sel]
+        bump = rng.random(n) < 0.02  # occasional slight increase due to environment
+        gain = rng.uniform(5, 20, n)
+        with self._lock:
+            soil = np.maximum(150.0, self.soil[sel] - decay)
+            soil = np.where(bump, np.minimum(950.0, soil + gain), soil)
+            self.soil[sel] = soil
+        soil = np.round(soil, 0)
+        for sensor, values in (("temperature", temp), ("humidity", hum), ("soil_moisture", soil)):
+            mask = self.dropout[sensor][sel]
+            if mask.any():
+                values[mask] = np.nan
+        return temp, hum, soil
+
+    def water(self, plant_id: Optional[str], amount: float = 200.0) -> bool:
+        """
+        Simulate a watering event for one plant (or all with None / "*"); returns False if
+        the plant is not hosted here or its pump has failed.
+        """
+        slot = self._select(plant_id)
+        if slot is None:
+            return False
+        with self._lock:
+            gain = np.where(self.pump_ok[slot], amount, 0.0)
+            self.soil[slot] = np.minimum(950.0, self.soil[slot] + gain)
+        return bool(np.all(self.pump_ok[slot]))
+
+    def set_conditions(self, plant_id: Optional[str] = None, dropout: Optional[dict] = None, **conditions):
+        """Apply scenario conditions (temp_offset, humidity_offset, decay_scale, pump_ok, dropout)."""
+        slot = self._select(plant_id)
+        if slot is None:
+            return
+        for name, value in conditions.items():
+            if name not in SCENARIO_CONDITIONS:
+                raise ValueError(f"Unknown simulator condition: {name}")
+            getattr(self, name)[slot] = value
+        for sensor, on in (dropout or {}).items():
+            self.dropout[sensor][slot] = bool(on)
@@ -1,18 +1,47 @@
 import os, json, time, signal, logging, uuid
-import paho.mqtt.client as mqtt
+from datetime import datetime
+import numpy as np
 import requests
-from sensors import MQTTPublisher, RealSensorReader
+from sensors import MQTTPublisher, RealSensorReader, FakeDHTDriver
 from simulator import ComplexSimulator
+from fleet import FleetSimulator, parse_plant_ids
+from spool import TelemetrySpool
+from scheduler import SamplingScheduler, phase_offset
+from deadband import DeadbandFilter, parse_bands
+from clock import SystemClock, VirtualClock
+from scenario import Scenario
+from edge_rules import EdgeRules
 
 class SensorService:
     def __init__(self):
         # Config from env
         self.plant_id = os.getenv("PLANT_ID", "1")
+        # PLANT_IDS hosts several plant channels in one process, e.g. "1-5000" or "1,2,7"
+        self.plant_ids = parse_plant_ids(os.getenv("PLANT_IDS", "")) or [self.plant_id]
+        self.plant_id = self.plant_ids[0]
         self.mode = os.getenv("MODE", "auto").lower()
         self.interval = int(os.getenv("INTERVAL", "5"))
+        # TELEMETRY_FORMAT: "legacy" = one message per sensor (default), "frame" = one message per tick
+        self.telemetry_format = os.getenv("TELEMETRY_FORMAT", "legacy").lower()
+        # SCHEDULE_MODE: "fixed" = one tick per INTERVAL, "adaptive" = faster while soil moisture moves
+        self.schedule_mode = os.getenv("SCHEDULE_MODE", "fixed").lower()
         mqtt_host = os.getenv("MQTT_HOST", "mqtt-broker")
         mqtt_port = int(os.getenv("MQTT_PORT", "1883"))
         self.catalogue_url = os.getenv("CATALOGUE_URL", "http://catalogue-service:8000")
+        # Reproducible / accelerated simulation: SCENARIO file, SIM_SEED, SIM_SPEED (0 = as fast as possible)
+        scenario_path = os.getenv("SCENARIO")
+        self.scenario = Scenario.load(scenario_path) if scenario_path else None
+        seed = os.getenv("SIM_SEED")
+        seed = int(seed) if seed else (self.scenario.seed if self.scenario else None)
+        speed = os.getenv("SIM_SPEED")
+        if speed is None and self.scenario is not None:
+            speed = self.scenario.speed
+        if speed is not None and speed != "":
+            sim_start = os.getenv("SIM_START")
+            start = datetime.fromisoformat(sim_start.replace("Z", "+00:00")).timestamp() if sim_start else None
+            self.clock = VirtualClock(speed=float(speed), start=start)
+        else:
+            self.clock = SystemClock()
         # Determine mode (auto -> use real if possible, else simulate)
         dht_pin = os.getenv("DHT_PIN")
         dht_model = os.getenv("DHT_MODEL", "DHT22")
@@ -32,26 +61,83 @@ class SensorService:
                 pin = int(dht_pin) if dht_pin else None
             except:
                 pin = None
-            self.reader = RealSensorReader(plant_id=self.plant_id, dht_pin=pin, dht_model=dht_model)
+            if len(self.plant_ids) > 1:
+                logging.warning("REAL mode drives a single sensor; hosting plant %s only", self.plant_id)
+                self.plant_ids = [self.plant_id]
+            # DHT_DRIVER=fake exercises the real-mode pipeline off-device
+            driver = FakeDHTDriver() if os.getenv("DHT_DRIVER", "").lower() == "fake" else None
+            self.reader = RealSensorReader(plant_id=self.plant_id, dht_pin=pin, dht_model=dht_model,
+                                           driver=driver, sample_interval=self.interval)
             self.mode = "real"
             logging.info("SensorService in REAL mode")
+        elif len(self.plant_ids) > 1:
+            self.reader = FleetSimulator(self.plant_ids, seed=seed, clock=self.clock)
+            self.mode = "simulate"
+            logging.info(f"SensorService in SIMULATE mode hosting {len(self.plant_ids)} plants")
         else:
-            self.reader = ComplexSimulator(plant_id=self.plant_id)
+            self.reader = ComplexSimulator(plant_id=self.plant_id, seed=seed, clock=self.clock)
             self.mode = "simulate"
             logging.info("SensorService in SIMULATE mode")
-        # MQTT publisher for telemetry
-        self.publisher = MQTTPublisher(mqtt_host, mqtt_port)
-        self.publisher.connect()
-        # MQTT subscriber for actuator commands
-        self.cmd_client = mqtt.Client()
+        # Report-by-exception: DEADBAND_ABS / DEADBAND_PCT ("2" or "temperature=0.5,soil_moisture=5")
+        abs_bands = parse_bands(os.getenv("DEADBAND_ABS", ""))
+        pct_bands = parse_bands(os.getenv("DEADBAND_PCT", ""))
+        self.deadband = None
+        if abs_bands or pct_bands:
+            self.deadband = DeadbandFilter(abs_bands, pct_bands,
+                                           keyframe_every=int(os.getenv("KEYFRAME_EVERY", "12")))
+        # A fleet is split into PHASE_BUCKETS groups by plant id phase, each sampled in its own
+        # slot of the interval, so the plants of one process do not all report in one burst
+        self.buckets = [self.plant_ids]
+        self._bucket_slots = None
+        if isinstance(self.reader, FleetSimulator):
+            count = max(1, min(int(os.getenv("PHASE_BUCKETS", "10")), len(self.plant_ids)))
+            self.buckets = [[] for _ in range(count)]
+            for pid in self.plant_ids:
+                self.buckets[int(phase_offset(pid, count))].append(pid)
+            self._bucket_slots = [np.array([self.reader.slots[pid] for pid in bucket], dtype=int)
+                                  for bucket in self.buckets]
+            if self.schedule_mode == "adaptive":
+                # The rate would follow the fastest-changing plant and drag the whole fleet along
+                logging.warning("SCHEDULE_MODE=adaptive is per process and only used with a single plant; "
+                                f"sampling {len(self.plant_ids)} plants at the fixed INTERVAL")
+                self.schedule_mode = "fixed"
+        self._bucket = 0
+        # Deadline-based sampling clock, phase-spread by plant id (one tick per bucket)
+        self.scheduler = SamplingScheduler(
+            self.interval / len(self.buckets),
+            key=self.plant_id,
+            adaptive=self.schedule_mode == "adaptive",
+            min_interval=float(os.getenv("MIN_INTERVAL", "0")) or None,
+            max_interval=float(os.getenv("MAX_INTERVAL", "0")) or None,
+            clock=self.clock,
+        )
+        # One shared MQTT connection publishes telemetry and receives actuator commands
+        # SPOOL_DIR enables store-and-forward of readings while the broker is unreachable
+        spool_dir = os.getenv("SPOOL_DIR")
+        spool = None
+        if spool_dir:
+            spool = TelemetrySpool(
+                spool_dir,
+                max_bytes=int(os.getenv("SPOOL_MAX_BYTES", str(64 * 1024 * 1024))),
+                segment_bytes=int(os.getenv("SPOOL_SEGMENT_BYTES", str(1024 * 1024))),
+            )
+        self.publisher = MQTTPublisher(mqtt_host, mqtt_port, spool=spool,
+                                       replay_rate=float(os.getenv("SPOOL_REPLAY_RATE", "50")))
+        self.cmd_client = self.publisher.client
         self.cmd_client.on_connect = self._on_connect
         self.cmd_client.on_message = self._on_message
-        self.cmd_client.connect(mqtt_host, mqtt_port, 60)
+        self.publisher.connect()
         # Service registry info
         self.instance_id = str(uuid.uuid4())
         self.running = True
         # Register service with catalogue
         self._register_service()
+        # EDGE_RULES=1 waters locally on the soil-moisture low rule instead of waiting for analytics
+        self.edge = None
+        self.edge_water_amount = float(os.getenv("EDGE_WATER_AMOUNT", "200"))
+        if os.getenv("EDGE_RULES", "0").lower() in ("1", "true", "yes"):
+            self.edge = EdgeRules(self.catalogue_url, self.plant_ids,
+                                  refresh_interval=float(os.getenv("THRESHOLD_REFRESH", "60")))
         # Start heartbeat thread
         import threading
         threading.Thread(target=self._heartbeat_loop, daemon=True).start()
@@ -59,6 +145,11 @@ class SensorService:
         signal.signal(signal.SIGINT, self._handle_signal)
         signal.signal(signal.SIGTERM, self._handle_signal)
 
+    def _topic(self, suffix: str) -> str:
+        # A single-plant instance keeps its narrow topics; a fleet uses the wildcard
+        plant = self.plant_id if len(self.plant_ids) == 1 else "+"
+        return f"smartplant/{plant}/{suffix}"
+
     def _register_service(self):
         data = {
             "name": "sensor-service",
@@ -68,8 +159,8 @@ class SensorService:
             "port": 0,
             "health_url": "N/A",
             "capabilities": ["sensing", "publishing_telemetry", "receiving_commands"],
-            "topics_pub": [f"smartplant/{self.plant_id}/telemetry"],
-            "topics_sub": [f"smartplant/{self.plant_id}/actuators/+/set"]
+            "topics_pub": [self._topic("telemetry"), self._topic("events")],
+            "topics_sub": [self._topic("actuators/+/set")]
         }
         url = f"{self.catalogue_url}/services/register"
         for _ in range(5):
@@ -90,13 +181,16 @@ class SensorService:
                 requests.post(url, json=hb, timeout=5)
             except Exception as e:
                 logging.warning(f"Heartbeat failed: {e}")
+            if hasattr(self.reader, "stats"):
+                logging.info(f"Sensor sampler stats: {self.reader.stats()}")
+            if self.deadband is not None:
+                logging.info(f"Deadband stats: {self.deadband.stats()}")
             time.sleep(30)
 
     def _on_connect(self, client, userdata, flags, rc):
         logging.info(f"Command MQTT connected (rc={rc})")
-        # Subscribe to actuator command topic for this plant
-        cmd_topic = f"smartplant/{self.plant_id}/actuators/+/set"
-        client.subscribe(cmd_topic)
+        # Subscribe to actuator command topic for the hosted plant(s)
+        client.subscribe(self._topic("actuators/+/set"))
 
     def _on_message(self, client, userdata, msg):
         try:
@@ -106,44 +200,117 @@ class SensorService:
             return
         device = payload.get("device")
         amount = payload.get("amount")
-        logging.info(f"Received command for device {device}: {payload}")
+        topic_parts = msg.topic.split('/')
+        plant_id = topic_parts[1] if len(topic_parts) >= 2 else self.plant_id
+        logging.info(f"Received command for plant {plant_id} device {device}: {payload}")
         # Only handle watering commands in simulate mode
         if self.mode != "real" and device == "water":
             try:
                 amt = float(amount) if amount is not None else 0.0
             except:
                 amt = 0.0
-            if hasattr(self.reader, 'water'):
+            if isinstance(self.reader, FleetSimulator):
+                # Route the command to the plant's array slot; ignore plants hosted elsewhere
+                if self.reader.water(plant_id, amt):
+                    logging.info(f"Applying water: {amt}ml to simulated soil of plant {plant_id}")
+            elif plant_id == self.plant_id and hasattr(self.reader, 'water'):
                 logging.info(f"Applying water: {amt}ml to simulated soil")
                 self.reader.water(amt)
+            self.scheduler.kick()
         # (Real mode: no action or hardware integration could be added here)
 
+    def _sample(self) -> dict:
+        """Read the plant channels due this tick; returns {plant_id: {sensor: value}}."""
+        if isinstance(self.reader, FleetSimulator):
+            # One phase bucket per tick, in turn; NaN marks a sensor in dropout
+            bucket = self._bucket
+            self._bucket = (bucket + 1) % len(self.buckets)
+            if not self.buckets[bucket]:
+                return {}
+            arrays = self.reader.step(self._bucket_slots[bucket])
+            temps, hums, soils = ([None if v != v else v for v in a.tolist()] for a in arrays)
+            return {
+                pid: {"temperature": t, "humidity": h, "soil_moisture": s}
+                for pid, t, h, s in zip(self.buckets[bucket], temps, hums, soils)
+            }
+        if self.mode == "simulate":
+            temp = self.reader.read_temperature()
+            hum = self.reader.read_humidity()
+            soil = self.reader.read_soil_moisture()
+        else:  # real
+            temp = getattr(self.reader, "read_temperature", lambda: None)()
+            hum = getattr(self.reader, "read_humidity", lambda: None)()
+            soil = getattr(self.reader, "read_soil_moisture", lambda: None)()
+        return {self.plant_id: {"temperature": temp, "humidity": hum, "soil_moisture": soil}}
+
+    def _publish(self, plant_id: str, values: dict, ts: str):
+        telemetry_topic = f"smartplant/{plant_id}/telemetry"
+        if self.deadband is not None:
+            values = self.deadband.filter(plant_id, values)
+        else:
+            values = {sensor: value for sensor, value in values.items() if value is not None}
+        if not values:
+            return
+        if self.telemetry_format == "frame":
+            # All readings of one tick share a single message, plant_id and ts
+            data = {"plant_id": plant_id, "ts": ts, "readings": values}
+            self.publisher.publish(telemetry_topic, data)
+            return
+        for sensor, value in values.items():
+            data = {"plant_id": plant_id, "sensor": sensor, "value": value, "ts": ts}
+            self.publisher.publish(telemetry_topic, data)
+
+    def _edge_water(self, plant_id: str, value: float, threshold: dict, ts: str):
+        amount = self.edge_water_amount
+        if self.mode == "simulate":
+            # Apply locally, as if the command had come back over MQTT
+            if isinstance(self.reader, FleetSimulator):
+                self.reader.water(plant_id, amount)
+            else:
+                self.reader.water(amount)
+            self.scheduler.kick()
+        else:
+            cmd = {"device": "water", "amount": amount, "note": "edge"}
+            self.publisher.client.publish(f"smartplant/{plant_id}/actuators/water/set", json.dumps(cmd))
+        # Tell analytics-service about the local decision so it can reconcile
+        event = {
+            "type": "edge_water",
+            "plant_id": plant_id,
+            "sensor": "soil_moisture",
+            "value": value,
+            "min_val": threshold.get("min_val"),
+            "amount": amount,
+            "ts": ts,
+            "instance_id": self.instance_id,
+        }
+        self.publisher.client.publish(f"smartplant/{plant_id}/events", json.dumps(event))
+        logging.info(f"Edge rule watered plant {plant_id} ({value} < {threshold.get('min_val')})")
+
     def run(self):
-        # Start command subscriber loop
+        # Start the shared MQTT network loop (publishing + command subscription)
         self.cmd_client.loop_start()
-        telemetry_topic = f"smartplant/{self.plant_id}/telemetry"
+        sim_start = self.clock.time()
         try:
-            while self.running:
+            while self.running and self.scheduler.wait():
+                if self.scenario is not None and self.mode == "simulate":
+                    elapsed = self.clock.time() - sim_start
+                    for event in self.scenario.due(elapsed):
+                        logging.info(f"Scenario {self.scenario.name} at {elapsed:.0f}s: {event}")
+                        Scenario.apply(self.reader, event)
+                    if self.scenario.finished(elapsed):
+                        logging.info(f"Scenario {self.scenario.name} finished")
+                        break
                 # Read sensor values and publish
-                if self.mode == "simulate":
-                    temp = self.reader.read_temperature()
-                    hum = self.reader.read_humidity()
-                    soil = self.reader.read_soil_moisture()
-                else:  # real
-                    temp = getattr(self.reader, "read_temperature", lambda: None)()
-                    hum = getattr(self.reader, "read_humidity", lambda: None)()
-                    soil = getattr(self.reader, "read_soil_moisture", lambda: None)()
-                ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
-                if temp is not None:
-                    data = {"plant_id": self.plant_id, "sensor": "temperature", "value": temp, "ts": ts}
-                    self.publisher.client.publish(telemetry_topic, json.dumps(data))
-                if hum is not None:
-                    data = {"plant_id": self.plant_id, "sensor": "humidity", "value": hum, "ts": ts}
-                    self.publisher.client.publish(telemetry_topic, json.dumps(data))
-                if soil is not None:
-                    data = {"plant_id": self.plant_id, "sensor": "soil_moisture", "value": soil, "ts": ts}
-                    self.publisher.client.publish(telemetry_topic, json.dumps(data))
-                time.sleep(self.interval)
+                readings = self._sample()
+                ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.clock.time()))
+                if self.edge is not None:
+                    for plant_id, values in readings.items():
+                        threshold = self.edge.evaluate(plant_id, values.get("soil_moisture"))
+                        if threshold is not None:
+                            self._edge_water(plant_id, values["soil_moisture"], threshold, ts)
+                for plant_id, values in readings.items():
+                    self._publish(plant_id, values, ts)
+                self.scheduler.observe({pid: v.get("soil_moisture") for pid, v in readings.items()})
         finally:
             # Graceful shutdown if loop exits
             self._shutdown()
@@ -151,6 +318,7 @@ class SensorService:
     def _handle_signal(self, signum, frame):
         logging.info("Shutdown signal received")
         self.running = False
+        self.scheduler.stop()
 
     def _shutdown(self):
         # Deregister service
@@ -158,16 +326,17 @@ class SensorService:
             requests.delete(f"{self.catalogue_url}/services/{self.instance_id}", timeout=5)
         except Exception as e:
             logging.warning(f"Service deregistration failed: {e}")
-        # Stop MQTT clients
+        if self.edge is not None:
+            self.edge.stop()
+        if hasattr(self.reader, "close"):
+            self.reader.close()
+        # Stop the shared MQTT client
         try:
             self.cmd_client.loop_stop()
             self.cmd_client.disconnect()
         except Exception:
             pass
-        try:
-            self.publisher.client.disconnect()
-        except Exception:
-            pass
+        self.publisher.close()
         logging.info("SensorService shut down")
 
 if __name__ == "__main__":
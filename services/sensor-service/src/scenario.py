@@ -0,0 +1,84 @@
+import json
+import logging
+import re
+from typing import List, Optional
+
+from simulator import SCENARIO_CONDITIONS
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)([smhdw])")
+
+
+def parse_duration(value) -> float:
+    """Seconds from a number or a string like "90s", "15m", "6h", "2d12h", "1w"."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    parts = _DURATION.findall(text)
+    if parts and "".join(n + u for n, u in parts) == text:
+        return sum(float(n) * _UNITS[u] for n, u in parts)
+    return float(text)
+
+
+class Scenario:
+    """
+    Scripted simulation run loaded from a JSON scenario file:
+
+        {
+          "name": "heatwave", "seed": 42, "speed": 0, "duration": "7d",
+          "events": [
+            {"at": "1d", "action": "set", "temp_offset": 8, "decay_scale": 1.8},
+            {"at": "2d", "action": "water", "amount": 300, "plant_id": "1"},
+            {"at": "3d", "action": "pump", "ok": false},
+            {"at": "4d", "action": "dropout", "sensors": ["humidity"], "on": true}
+          ]
+        }
+
+    `at` is relative to the start of the run (virtual time); `plant_id` defaults to every
+    plant. `speed` is the virtual clock multiple (0 = as fast as possible).
+    """
+    def __init__(self, data: dict):
+        self.name = data.get("name", "scenario")
+        self.seed = data.get("seed")
+        self.speed = data.get("speed")
+        self.duration = parse_duration(data["duration"]) if data.get("duration") is not None else None
+        self.events = sorted(data.get("events", []), key=lambda e: parse_duration(e.get("at", 0)))
+        self._times = [parse_duration(e.get("at", 0)) for e in self.events]
+        self._next = 0
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def due(self, elapsed: float) -> List[dict]:
+        """Events whose time has come since the previous call, in order."""
+        events = []
+        while self._next < len(self.events) and self._times[self._next] <= elapsed:
+            events.append(self.events[self._next])
+            self._next += 1
+        return events
+
+    def finished(self, elapsed: float) -> bool:
+        return self.duration is not None and elapsed >= self.duration
+
+    @staticmethod
+    def apply(sim, event: dict):
+        """Apply one event to a ComplexSimulator or FleetSimulator."""
+        action = event.get("action")
+        plant_id: Optional[str] = event.get("plant_id")
+        if action == "set":
+            sim.set_conditions(plant_id, **{k: v for k, v in event.items() if k in SCENARIO_CONDITIONS})
+        elif action == "water":
+            amount = float(event.get("amount", 200.0))
+            if hasattr(sim, "plant_ids"):
+                sim.water(plant_id, amount)
+            elif plant_id in (None, "*") or str(plant_id) == str(sim.plant_id):
+                sim.water(amount)
+        elif action == "pump":
+            sim.set_conditions(plant_id, pump_ok=bool(event.get("ok", True)))
+        elif action == "dropout":
+            on = bool(event.get("on", True))
+            sim.set_conditions(plant_id, dropout={s: on for s in event.get("sensors", [])})
+        else:
+            logging.warning(f"Unknown scenario action: {action}")
@@ -0,0 +1,107 @@
+import math
+import threading
+import zlib
+from typing import Dict, Optional
+
+from clock import SystemClock
+
+
+def phase_offset(key: str, interval: float) -> float:
+    """Deterministic offset in [0, interval) derived from a plant id, so instances do not fire in lockstep."""
+    return (zlib.crc32(str(key).encode("utf-8")) % 10000) / 10000.0 * interval
+
+
+class SamplingScheduler:
+    """
+    Deadline-based sampling clock.
+    - Ticks fire on wall-clock slots `k * interval + phase`, so work time never stretches
+      the period and overruns skip missed slots instead of bursting to catch up.
+    - phase comes from the plant id, spreading single-plant instances across the interval.
+      A fleet instance (PLANT_IDS) runs one scheduler at interval / PHASE_BUCKETS and
+      samples one bucket of plants per tick, bucketed by the same phase_offset().
+    - Adaptive mode samples at min_interval while soil moisture changes quickly (or right
+      after kick(), e.g. a water() command) and backs off towards max_interval when flat.
+      The rate is per process, so it is only used by single-plant instances.
+    """
+    def __init__(self, interval: float, key: str = "", adaptive: bool = False,
+                 min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 fast_rate: float = 2.0, flat_rate: float = 0.5, clock=None):
+        self.clock = clock or SystemClock()
+        self.interval = float(interval)
+        self.adaptive = adaptive
+        self.min_interval = float(min_interval) if min_interval else max(1.0, self.interval / 5)
+        self.max_interval = float(max_interval) if max_interval else self.interval * 6
+        self.fast_rate = fast_rate  # soil moisture units per second considered "changing quickly"
+        self.flat_rate = flat_rate  # below this the readings are considered flat
+        self.phase = phase_offset(key, self.interval)
+        self.current_interval = self.interval
+        self._wake = threading.Event()
+        self._lock = threading.Lock()  # kick() arrives on the MQTT thread
+        self._stopped = False
+        self._last: Dict[str, float] = {}
+        self._last_ts: Optional[float] = None
+        now = self.clock.time()
+        self._next = (math.floor((now - self.phase) / self.interval) + 1) * self.interval + self.phase
+
+    def wait(self) -> bool:
+        """Sleep until the next deadline; returns False once stopped."""
+        while not self._stopped:
+            delay = self._next - self.clock.time()
+            if delay <= 0:
+                break
+            self.clock.wait(self._wake, delay)
+            self._wake.clear()
+        if self._stopped:
+            return False
+        with self._lock:
+            now = self.clock.time()
+            self._next += self.current_interval
+            if self._next <= now:
+                # Overran one or more slots: skip to the next future one
+                missed = math.ceil((now - self._next) / self.current_interval)
+                self._next += max(1, missed) * self.current_interval
+        return True
+
+    def observe(self, soil: Dict[str, float]):
+        """Feed the latest soil moisture per plant; adapts the interval in adaptive mode."""
+        if not self.adaptive:
+            return
+        now = self.clock.time()
+        rate = 0.0
+        if self._last_ts is not None and now > self._last_ts:
+            elapsed = now - self._last_ts
+            for plant_id, value in soil.items():
+                prev = self._last.get(plant_id)
+                if prev is not None and value is not None:
+                    rate = max(rate, abs(value - prev) / elapsed)
+        self._last = {k: v for k, v in soil.items() if v is not None}
+        self._last_ts = now
+        if rate >= self.fast_rate:
+            self._set_interval(self.min_interval)
+        elif rate <= self.flat_rate:
+            self._set_interval(min(self.max_interval, self.current_interval * 2))
+        elif self.current_interval < self.interval:
+            # Moderate change: drift back to the base interval
+            self._set_interval(min(self.interval, self.current_interval * 2))
+        elif self.current_interval > self.interval:
+            self._set_interval(max(self.interval, self.current_interval / 2))
+
+    def kick(self):
+        """An event (e.g. watering) is expected to move readings: sample soon at the fast rate."""
+        if self.adaptive:
+            self._set_interval(self.min_interval)
+            self._wake.set()
+
+    def _set_interval(self, interval: float):
+        interval = max(self.min_interval, min(self.max_interval, interval))
+        with self._lock:
+            if interval < self.current_interval:
+                # Pull the pending deadline in when speeding up
+                self._next = min(self._next, self.clock.time() + interval)
+            else:
+                self._next += interval - self.current_interval
+            self.current_interval = interval
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
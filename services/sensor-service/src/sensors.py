@@ -1,9 +1,15 @@
 import json
+import logging
 import os
+import random
+import threading
+import time
 from typing import Optional
 
 import paho.mqtt.client as mqtt
 
+from spool import SpoolReplayer
+
 # Try to import hardware sensor libraries (for real mode)
 try:
     import Adafruit_DHT  # for DHT11/DHT22 sensors (temp/humidity)
@@ -16,42 +22,212 @@ except Exception:
     GPIO = None
 
 class MQTTPublisher:
-    """Handles MQTT connection and publishing JSON payloads."""
-    def __init__(self, broker_host="mqtt-broker", broker_port=1883, client_id=None):
+    """
+    Handles MQTT connection and publishing JSON payloads.
+    With a TelemetrySpool attached, readings that cannot be published (broker down,
+    or an older backlog still draining) are spooled to disk and replayed in order.
+    """
+    def __init__(self, broker_host="mqtt-broker", broker_port=1883, client_id=None,
+                 spool=None, replay_rate: float = 50.0):
         self.client = mqtt.Client(client_id=client_id)
         self.broker_host = broker_host
         self.broker_port = int(broker_port)
+        self.spool = spool
+        self.replayer = SpoolReplayer(spool, self.client, rate=replay_rate) if spool is not None else None
 
     def connect(self):
-        self.client.connect(self.broker_host, self.broker_port, 60)
+        if self.spool is None:
+            self.client.connect(self.broker_host, self.broker_port, 60)
+            return
+        # Connect from the network loop so startup (and reconnects) survive a broker outage
+        self.client.connect_async(self.broker_host, self.broker_port, 60)
+        self.replayer.start()
 
     def publish(self, topic: str, payload: dict):
-        self.client.publish(topic, json.dumps(payload))
+        message = json.dumps(payload)
+        if self.spool is None:
+            self.client.publish(topic, message)
+            return
+        # New readings queue behind an existing backlog so replay stays in order
+        if self.client.is_connected() and not self.spool.has_pending():
+            if self.client.publish(topic, message).rc == mqtt.MQTT_ERR_SUCCESS:
+                return
+        self.spool.append(topic, message)
+
+    def close(self):
+        if self.replayer is not None:
+            self.replayer.stop(timeout=2)
+            self.spool.close()
+
+
+class FakeDHTDriver:
+    """
+    Off-device stand-in for the Adafruit_DHT module (same read()/read_retry() surface).
+    - Returns plausible (humidity, temperature) pairs around the given base values.
+    - fail_rate makes a fraction of reads return (None, None) like a flaky DHT line.
+    - latency simulates the blocking bit-banged read.
+    """
+    DHT11 = 11
+    DHT22 = 22
+
+    def __init__(self, humidity: float = 55.0, temperature: float = 23.0,
+                 fail_rate: float = 0.0, latency: float = 0.0, seed: Optional[int] = None):
+        self.humidity = humidity
+        self.temperature = temperature
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def read(self, sensor, pin):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self._rng.random() < self.fail_rate:
+            return None, None
+        return (self.humidity + self._rng.uniform(-1.0, 1.0),
+                self.temperature + self._rng.uniform(-0.3, 0.3))
+
+    def read_retry(self, sensor, pin, retries=15, delay_seconds=2):
+        for _ in range(retries):
+            humidity, temperature = self.read(sensor, pin)
+            if humidity is not None and temperature is not None:
+                return humidity, temperature
+            time.sleep(delay_seconds)
+        return None, None
+
+
+class DHTSampler:
+    """
+    Background thread reading a DHT sensor once per interval.
+    - Caches the latest (humidity, temperature) pair with its acquisition timestamp,
+      so the publish loop never blocks on sensor I/O.
+    - Tracks read latency, retry counts and failures for observability.
+    """
+    def __init__(self, driver, sensor, pin: int, interval: float = 5.0,
+                 retries: int = 15, retry_delay: float = 2.0):
+        self.driver = driver
+        self.sensor = sensor
+        self.pin = pin
+        self.interval = float(interval)
+        self.retries = int(retries)
+        self.retry_delay = float(retry_delay)
+        self._lock = threading.Lock()
+        self._sample = (None, None, None)  # (humidity, temperature, acquired_at)
+        self._stop = threading.Event()
+        self._thread = None
+        self.reads = 0
+        self.failures = 0
+        self.retry_count = 0
+        self.last_latency = None
+        self.max_latency = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="dht-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sample_once(self) -> bool:
+        """Read the sensor (with retries) and update the cache; returns True on success."""
+        started = time.monotonic()
+        humidity = temperature = None
+        attempts = 0
+        while attempts < self.retries and not self._stop.is_set():
+            attempts += 1
+            humidity, temperature = self.driver.read(self.sensor, self.pin)
+            if humidity is not None and temperature is not None:
+                break
+            if attempts < self.retries:
+                self._stop.wait(self.retry_delay)
+        latency = time.monotonic() - started
+        ok = humidity is not None and temperature is not None
+        with self._lock:
+            self.reads += 1
+            self.retry_count += max(0, attempts - 1)
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            if ok:
+                self._sample = (humidity, temperature, time.time())
+            else:
+                self.failures += 1
+        if not ok:
+            logging.warning(f"DHT read failed after {attempts} attempts ({latency:.2f}s)")
+        return ok
+
+    def _loop(self):
+        # Deadline-based so the read latency does not stretch the sampling period
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            self.sample_once()
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                next_at = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def latest(self):
+        """Return the cached (humidity, temperature, acquired_at); values are None before the first good read."""
+        with self._lock:
+            return self._sample
+
+    def age(self) -> Optional[float]:
+        acquired_at = self.latest()[2]
+        return None if acquired_at is None else max(0.0, time.time() - acquired_at)
+
+    def stats(self) -> dict:
+        age = self.age()
+        with self._lock:
+            return {
+                "reads": self.reads,
+                "failures": self.failures,
+                "retries": self.retry_count,
+                "last_latency_s": None if self.last_latency is None else round(self.last_latency, 3),
+                "max_latency_s": round(self.max_latency, 3),
+                "sample_age_s": None if age is None else round(age, 1),
+            }
+
 
 class RealSensorReader:
     """
     Real sensor reader for hardware (if connected).
-    - Supports DHT temperature/humidity on a GPIO pin.
+    - Supports DHT temperature/humidity on a GPIO pin, sampled once per interval by a
+      background DHTSampler; read_temperature()/read_humidity() only read its cache.
     - Hook for soil moisture via ADC (to be implemented for actual hardware).
     """
-    def __init__(self, plant_id: str = "1", dht_pin: Optional[int] = None, dht_model: str = "DHT22", soil_channel: Optional[int] = None):
+    def __init__(self, plant_id: str = "1", dht_pin: Optional[int] = None, dht_model: str = "DHT22",
+                 soil_channel: Optional[int] = None, driver=None, sample_interval: float = 5.0,
+                 max_age: Optional[float] = None):
         self.plant_id = plant_id
         self.dht_pin = dht_pin
         self.dht_model = dht_model
+        self.driver = driver if driver is not None else Adafruit_DHT
+        # Samples older than max_age are reported as missing rather than republished forever
+        self.max_age = max_age if max_age is not None else 3 * float(sample_interval)
+        self.sampler = None
+        if self.driver and self.dht_pin is not None:
+            sensor = self.driver.DHT22 if self.dht_model.upper() == "DHT22" else self.driver.DHT11
+            self.sampler = DHTSampler(self.driver, sensor, self.dht_pin, interval=sample_interval).start()
+
+    def _cached(self, index: int) -> Optional[float]:
+        if self.sampler is None:
+            return None
+        sample = self.sampler.latest()
+        if sample[index] is None or sample[2] is None or time.time() - sample[2] > self.max_age:
+            return None
+        return round(sample[index], 1)
 
     def read_temperature(self) -> Optional[float]:
-        if Adafruit_DHT and self.dht_pin is not None:
-            sensor = Adafruit_DHT.DHT22 if self.dht_model.upper() == "DHT22" else Adafruit_DHT.DHT11
-            humidity, temperature = Adafruit_DHT.read_retry(sensor, self.dht_pin)
-            return round(temperature, 1) if temperature is not None else None
-        return None
+        return self._cached(1)
 
     def read_humidity(self) -> Optional[float]:
-        if Adafruit_DHT and self.dht_pin is not None:
-            sensor = Adafruit_DHT.DHT22 if self.dht_model.upper() == "DHT22" else Adafruit_DHT.DHT11
-            humidity, temperature = Adafruit_DHT.read_retry(sensor, self.dht_pin)
-            return round(humidity, 1) if humidity is not None else None
-        return None
+        return self._cached(0)
 
     def read_soil_moisture(self) -> Optional[float]:
         """
@@ -60,3 +236,10 @@ class RealSensorReader:
         """
         # Not implemented: return None or integrate hardware ADC reading here.
         return None
+
+    def stats(self) -> dict:
+        return self.sampler.stats() if self.sampler else {}
+
+    def close(self):
+        if self.sampler:
+            self.sampler.stop(timeout=1)
@@ -1,6 +1,11 @@
 import math
 import random
-import time
+from typing import Optional
+
+from clock import SystemClock
+
+# Conditions a scenario may change on a simulator (besides per-sensor dropout)
+SCENARIO_CONDITIONS = ("temp_offset", "humidity_offset", "decay_scale", "pump_ok")
 
 class ComplexSimulator:
     """
@@ -8,40 +13,72 @@ class ComplexSimulator:
     - Temperature follows a daily sine wave + noise.
     - Humidity inversely correlates with temp + random drift.
     - Soil moisture decays over time, increases on 'watering' events.
+    A seed makes runs reproducible and a VirtualClock lets a simulated day pass faster
+    than a real one; scenario events adjust conditions through set_conditions().
     """
-    def __init__(self, plant_id: str = "1"):
+    def __init__(self, plant_id: str = "1", seed: Optional[int] = None, clock=None):
         self.plant_id = plant_id
-        self._start = time.time()
+        self.clock = clock or SystemClock()
+        self._rng = random.Random(seed)
+        self._start = self.clock.time()
         self.soil = 600.0  # initial soil moisture (0-1023 scale)
         self.last_water_ts = 0.0
+        # scenario-controlled conditions
+        self.temp_offset = 0.0
+        self.humidity_offset = 0.0
+        self.decay_scale = 1.0
+        self.pump_ok = True
+        self.dropouts = set()
 
     # --- internal helpers ---
     def _day_fraction(self) -> float:
         # Fraction of day (0.0 to 1.0) based on elapsed time
-        return ((time.time() - self._start) % 86400) / 86400.0
+        return ((self.clock.time() - self._start) % 86400) / 86400.0
 
-    # --- sensor simulation ---
-    def read_temperature(self) -> float:
+    def _temperature(self) -> float:
         frac = self._day_fraction()
-        base = 24 + 6 * math.sin(2 * math.pi * frac)  # ~18°C to 30°C daily cycle
-        noise = random.uniform(-0.7, 0.7)
+        base = 24 + 6 * math.sin(2 * math.pi * frac) + self.temp_offset  # ~18°C to 30°C daily cycle
+        noise = self._rng.uniform(-0.7, 0.7)
         return round(base + noise, 1)
 
-    def read_humidity(self) -> float:
+    # --- sensor simulation ---
+    def read_temperature(self) -> Optional[float]:
+        temp = self._temperature()
+        return None if "temperature" in self.dropouts else temp
+
+    def read_humidity(self) -> Optional[float]:
         # Humidity inversely related to temperature plus some random variation
-        temp = self.read_temperature()
-        base_hum = max(30.0, 80 - (temp - 20))  # humidity % inversely proportional to temp
-        drift = random.uniform(-1.0, 1.0)
-        return round(min(100.0, base_hum + drift), 1)
+        temp = self._temperature()
+        base_hum = max(30.0, 80 - (temp - 20)) + self.humidity_offset  # humidity % inversely proportional to temp
+        drift = self._rng.uniform(-1.0, 1.0)
+        hum = round(max(0.0, min(100.0, base_hum + drift)), 1)
+        return None if "humidity" in self.dropouts else hum
 
-    def read_soil_moisture(self) -> float:
+    def read_soil_moisture(self) -> Optional[float]:
         # Soil moisture decays gradually over time, with occasional small increases (condensation)
-        decay = random.uniform(0.5, 1.2)
+        decay = self._rng.uniform(0.5, 1.2) * self.decay_scale
         self.soil = max(150.0, self.soil - decay)  # moisture cannot drop below ~150 (very dry)
-        if random.random() < 0.02:  # occasional slight increase due to environment
-            self.soil = min(950.0, self.soil + random.uniform(5, 20))
-        return round(self.soil, 0)
+        if self._rng.random() < 0.02:  # occasional slight increase due to environment
+            self.soil = min(950.0, self.soil + self._rng.uniform(5, 20))
+        return None if "soil_moisture" in self.dropouts else round(self.soil, 0)
 
     def water(self, amount: float = 200.0):
-        """Simulate a watering event raising soil moisture."""
+        """Simulate a watering event raising soil moisture (no effect while the pump has failed)."""
+        if not self.pump_ok:
+            return
         self.soil = min(950.0, self.soil + amount)
+        self.last_water_ts = self.clock.time()
+
+    def set_conditions(self, plant_id: Optional[str] = None, dropout: Optional[dict] = None, **conditions):
+        """Apply scenario conditions (temp_offset, humidity_offset, decay_scale, pump_ok, dropout)."""
+        if plant_id not in (None, "*") and str(plant_id) != str(self.plant_id):
+            return
+        for name, value in conditions.items():
+            if name not in SCENARIO_CONDITIONS:
+                raise ValueError(f"Unknown simulator condition: {name}")
+            setattr(self, name, bool(value) if name == "pump_ok" else float(value))
+        for sensor, on in (dropout or {}).items():
+            if on:
+                self.dropouts.add(sensor)
+            else:
+                self.dropouts.discard(sensor)
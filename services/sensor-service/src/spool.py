@@ -0,0 +1,269 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+# Record header: payload length + crc32 of the payload (little endian, 8 bytes)
+_HEADER = struct.Struct("<II")
+
+
+class _Segment:
+    """One preallocated, memory-mapped spool segment file."""
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.seq = int(os.path.basename(path).split("-")[1].split(".")[0])
+        new = not os.path.exists(path)
+        self._file = open(path, "r+b" if not new else "w+b")
+        if new or os.path.getsize(path) < size:
+            self._file.truncate(size)
+        self.size = os.path.getsize(path)
+        self.mm = mmap.mmap(self._file.fileno(), self.size)
+
+    def record_at(self, pos: int) -> Optional[Tuple[bytes, int]]:
+        """Return (payload, next_pos) for a valid record at pos, or None at end of data / torn write."""
+        if pos + _HEADER.size > self.size:
+            return None
+        length, crc = _HEADER.unpack_from(self.mm, pos)
+        end = pos + _HEADER.size + length
+        if length == 0 or end > self.size:
+            return None
+        data = self.mm[pos + _HEADER.size:end]
+        if zlib.crc32(data) != crc:
+            return None
+        return data, end
+
+    def scan_end(self) -> int:
+        """Find the write position by walking valid records from the start."""
+        pos = 0
+        while True:
+            rec = self.record_at(pos)
+            if rec is None:
+                return pos
+            pos = rec[1]
+
+    def write(self, pos: int, data: bytes) -> int:
+        end = pos + _HEADER.size + len(data)
+        self.mm[pos + _HEADER.size:end] = data
+        # Header last, so a crash mid-write leaves an invalid (ignored) record
+        self.mm[pos:pos + _HEADER.size] = _HEADER.pack(len(data), zlib.crc32(data))
+        return end
+
+    def close(self):
+        try:
+            self.mm.flush()
+            self.mm.close()
+        finally:
+            self._file.close()
+
+
+class TelemetrySpool:
+    """
+    Bounded, append-only on-disk ring of telemetry messages.
+    - Records live in fixed-size memory-mapped segment files (seg-<seq>.spool), each
+      record framed by length + crc32 so torn writes are detected on restart.
+    - The consumer position is committed to offsets.json with an atomic replace, so a
+      crash replays at most the last uncommitted batch.
+    - When the segments exceed max_bytes the oldest segment is evicted (oldest data first).
+    """
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, segment_bytes: int = 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = int(segment_bytes)
+        self.max_segments = max(2, int(max_bytes) // self.segment_bytes)
+        self._lock = threading.Lock()
+        self.appended = 0
+        self.replayed = 0
+        self.dropped_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._offsets_path = os.path.join(directory, "offsets.json")
+        self._segments = {}  # seq -> _Segment (opened lazily for reading)
+        seqs = self._list_seqs()
+        read_seq, read_pos = self._load_offsets()
+        if not seqs:
+            seqs = [0]
+        if read_seq not in seqs:
+            # The committed segment was evicted or never existed: resume at the oldest one
+            read_seq, read_pos = seqs[0], 0
+        for seq in seqs:
+            if seq < read_seq:
+                os.remove(self._path(seq))
+        self.read_seq, self.read_pos = read_seq, read_pos
+        self.write_seq = max(seqs)
+        self._writer = self._open(self.write_seq)
+        self.write_pos = self._writer.scan_end()
+
+    # --- files ---
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"seg-{seq:010d}.spool")
+
+    def _list_seqs(self) -> List[int]:
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith("seg-") and name.endswith(".spool"):
+                seqs.append(int(name[4:-6]))
+        return sorted(seqs)
+
+    def _open(self, seq: int) -> _Segment:
+        seg = self._segments.get(seq)
+        if seg is None:
+            seg = self._segments[seq] = _Segment(self._path(seq), self.segment_bytes)
+        return seg
+
+    def _drop(self, seq: int):
+        seg = self._segments.pop(seq, None)
+        if seg is not None:
+            seg.close()
+        try:
+            os.remove(self._path(seq))
+        except FileNotFoundError:
+            pass
+
+    def _load_offsets(self) -> Tuple[int, int]:
+        try:
+            with open(self._offsets_path) as f:
+                data = json.load(f)
+            return int(data["seq"]), int(data["pos"])
+        except Exception:
+            return -1, 0
+
+    def _store_offsets(self):
+        tmp = self._offsets_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"seq": self.read_seq, "pos": self.read_pos}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._offsets_path)
+
+    # --- producer ---
+    def append(self, topic: str, payload: str) -> bool:
+        data = topic.encode("utf-8") + b"\0" + payload.encode("utf-8")
+        needed = _HEADER.size + len(data)
+        if needed > self.segment_bytes:
+            logging.warning(f"Spool record of {needed} bytes exceeds segment size, dropping")
+            return False
+        with self._lock:
+            if self.write_pos + needed > self.segment_bytes:
+                self._roll()
+            self.write_pos = self._writer.write(self.write_pos, data)
+            self.appended += 1
+        return True
+
+    def _roll(self):
+        self._writer.mm.flush()
+        self.write_seq += 1
+        self._writer = self._open(self.write_seq)
+        self.write_pos = 0
+        # Evict oldest segments first once over budget
+        while self.write_seq - self.read_seq + 1 > self.max_segments:
+            logging.warning(f"Spool full, evicting segment {self.read_seq}")
+            self.dropped_bytes += self.segment_bytes - self.read_pos
+            self._drop(self.read_seq)
+            self.read_seq, self.read_pos = self.read_seq + 1, 0
+            self._store_offsets()
+
+    # --- consumer ---
+    def has_pending(self) -> bool:
+        with self._lock:
+            return (self.read_seq, self.read_pos) != (self.write_seq, self.write_pos)
+
+    def read_batch(self, max_records: int = 100) -> Tuple[List[Tuple[str, str]], Tuple[int, int]]:
+        """Return up to max_records (topic, payload) pairs from the committed position and the offset after them."""
+        records = []
+        with self._lock:
+            seq, pos = self.read_seq, self.read_pos
+            while len(records) < max_records and (seq, pos) != (self.write_seq, self.write_pos):
+                rec = self._open(seq).record_at(pos)
+                if rec is None:
+                    if seq >= self.write_seq:
+                        break
+                    seq, pos = seq + 1, 0  # end of a sealed segment
+                    continue
+                data, pos = rec
+                topic, _, payload = data.partition(b"\0")
+                records.append((topic.decode("utf-8"), payload.decode("utf-8")))
+        return records, (seq, pos)
+
+    def commit(self, offset: Tuple[int, int], count: int = 0):
+        """Persist the consumer position after records up to offset were delivered."""
+        with self._lock:
+            seq, pos = offset
+            if seq < self.read_seq:
+                return  # those segments were evicted meanwhile
+            for old in range(self.read_seq, seq):
+                self._drop(old)
+            self.read_seq, self.read_pos = seq, pos
+            self.replayed += count
+            self._store_offsets()
+
+    def stats(self) -> dict:
+        with self._lock:
+            segments = self.write_seq - self.read_seq + 1
+            return {
+                "segments": segments,
+                "pending_bytes": (segments - 1) * self.segment_bytes + self.write_pos - self.read_pos,
+                "appended": self.appended,
+                "replayed": self.replayed,
+                "dropped_bytes": self.dropped_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            for seg in self._segments.values():
+                seg.close()
+            self._segments.clear()
+
+
+class SpoolReplayer:
+    """
+    Drains a TelemetrySpool through an MQTT client once the broker is reachable again.
+    Messages are republished in order at no more than `rate` messages per second.
+    """
+    def __init__(self, spool: TelemetrySpool, client, rate: float = 50.0, batch: int = 50):
+        self.spool = spool
+        self.client = client
+        self.rate = float(rate)
+        self.batch = int(batch)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="spool-replayer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        while not self._stop.is_set():
+            if not self.client.is_connected() or not self.spool.has_pending():
+                self._stop.wait(1.0)
+                continue
+            records, offset = self.spool.read_batch(self.batch)
+            sent = 0
+            next_at = time.monotonic()
+            for topic, payload in records:
+                if self._stop.is_set() or not self.client.is_connected():
+                    break
+                info = self.client.publish(topic, payload)
+                if info.rc != 0:
+                    break
+                sent += 1
+                next_at += interval
+                self._stop.wait(max(0.0, next_at - time.monotonic()))
+            if sent == len(records):
+                self.spool.commit(offset, sent)
+                if sent:
+                    logging.info(f"Replayed {sent} spooled messages; {self.spool.stats()}")
+            elif sent:
+                # Partial batch: commit exactly what went out by re-reading that many records
+                _, partial = self.spool.read_batch(sent)
+                self.spool.commit(partial, sent)
@@ -18,6 +18,9 @@ class TelegramService:
         mqtt_port = int(os.getenv("MQTT_PORT", "1883"))
         # Latest sensor readings
         self.latest = {}  # {plant_id: {sensor: {"value": ..., "ts": ...}}}
+        # Poll sensor-data-service /latest (one URL per ingest worker) instead of subscribing to all telemetry
+        self.latest_urls = [u.strip().rstrip("/") for u in os.getenv("LATEST_URLS", "").split(",") if u.strip()]
+        self.latest_poll_interval = float(os.getenv("LATEST_POLL_INTERVAL", "2"))
         # Load plant info
         self.plant_names = {}
         try:
@@ -48,6 +51,8 @@ class TelegramService:
         self.running = True
         self._register_service()
         threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        for url in self.latest_urls:
+            threading.Thread(target=self._latest_poll_loop, args=(url,), daemon=True).start()
         
         # Webhook server for receiving notifications
         self.webhook_app = FastAPI()
@@ -73,7 +78,7 @@ class TelegramService:
             "health_url": "N/A",
             "capabilities": ["telegram_bot", "notify_alerts", "publish_commands"],
             "topics_pub": [f"smartplant/1/actuators/water/set"],
-            "topics_sub": [f"smartplant/+/telemetry"]
+            "topics_sub": [] if self.latest_urls else [f"smartplant/+/telemetry", f"smartplant/+/snapshot"]
         }
         url = f"{self.catalogue_url}/services/register"
         for _ in range(5):
@@ -98,7 +103,11 @@ class TelegramService:
 
     def _on_connect(self, client, userdata, flags, rc):
         logging.info("TelegramService MQTT connected")
+        if self.latest_urls:
+            return  # latest values come from _latest_poll_loop
         client.subscribe("smartplant/+/telemetry")
+        # Retained last-value snapshots seed self.latest right after (re)start
+        client.subscribe("smartplant/+/snapshot")
 
     def _on_message(self, client, userdata, msg):
         try:
@@ -106,8 +115,6 @@ class TelegramService:
         except Exception:
             return
         plant_id = str(payload.get("plant_id", ""))
-        sensor = payload.get("sensor")
-        value = payload.get("value")
         ts = payload.get("ts")
         if plant_id not in self.latest:
             self.latest[plant_id] = {}
@@ -115,7 +122,38 @@ class TelegramService:
         if not ts:
             from datetime import datetime
             ts = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-        self.latest[plant_id][sensor] = {"value": value, "ts": ts}
+        # A combined frame carries every sensor of one tick; legacy messages carry one
+        readings = payload.get("readings")
+        if not isinstance(readings, dict):
+            readings = {payload.get("sensor"): payload.get("value")}
+        if msg.topic.endswith("/snapshot"):
+            # Never let a snapshot override a live reading already received
+            timestamps = payload.get("timestamps") or {}
+            for sensor, value in readings.items():
+                self.latest[plant_id].setdefault(sensor, {"value": value, "ts": timestamps.get(sensor, ts)})
+            return
+        for sensor, value in readings.items():
+            self.latest[plant_id][sensor] = {"value": value, "ts": ts}
+
+    def _latest_poll_loop(self, url):
+        """Keep self.latest current from one sensor-data-service, fetching only changes"""
+        epoch, revision = None, 0
+        while self.running:
+            try:
+                res = requests.get(f"{url}/latest", params={"since": revision}, timeout=5)
+                if res.status_code == 200:
+                    data = res.json()
+                    if data["epoch"] != epoch and not data["full"]:
+                        # Restarted service: its revisions started over, take a full copy
+                        epoch, revision = data["epoch"], 0
+                        continue
+                    epoch = data["epoch"]
+                    for plant_id, sensors in data["plants"].items():
+                        self.latest.setdefault(plant_id, {}).update(sensors)
+                    revision = data["revision"]
+            except Exception as e:
+                logging.warning(f"Polling latest values from {url} failed: {e}")
+            time.sleep(self.latest_poll_interval)
 
     def _setup_webhook_routes(self):
         """Setup webhook routes for receiving notifications"""